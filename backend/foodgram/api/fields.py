@@ -0,0 +1,52 @@
+from core.images import fallback_urls, rendition_urls, submit_upload
+from rest_framework import serializers
+
+
+class ContentAddressedImageField(serializers.Field):
+    """Картинка в base64, которая сохраняется под именем по хэшу.
+
+    Картинка декодируется и проверяется в пуле uploads, пока сериализатор
+    проверяет остальные поля: to_internal_value возвращает Future, его
+    результат (ContentFile) забирает validate() сериализатора, а в
+    хранилище записывают create() и update() через save_upload.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            raise serializers.ValidationError(
+                    'Ожидается картинка в формате base64.')
+        return submit_upload(data)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        if request is None:
+            return value.url
+        return request.build_absolute_uri(value.url)
+
+
+class RenditionsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии: {размер: {формат: url}}.
+
+    Источник - сам рецепт (source='*'): пока копии не построены
+    (renditions_ready), для всех размеров отдается исходная картинка.
+    """
+
+    def to_representation(self, recipe):
+        if not recipe.picture:
+            return None
+        if recipe.renditions_ready:
+            urls = rendition_urls(recipe.picture.name)
+        else:
+            urls = fallback_urls(recipe.picture.name)
+        request = self.context.get('request')
+        if request is None:
+            return urls
+        return {
+                rendition: {
+                        file_format: request.build_absolute_uri(url)
+                        for file_format, url in formats.items()
+                }
+                for rendition, formats in urls.items()
+        }
@@ -0,0 +1,65 @@
+from django.db.models import Exists, OuterRef
+from django_filters import rest_framework as filters
+from django_filters.widgets import BooleanWidget
+from food_recipies.models import Favorites, RecipeTags, Recipies, ShoppingCart
+from food_recipies.search import recipe_search
+
+# Порядки совпадают с индексами Recipies, id - для однозначности.
+ORDERINGS = {
+        '-pub_date': ('-pub_date', '-id'),
+        '-favorites_count': ('-favorites_count', '-pub_date', '-id'),
+}
+
+
+class RecipeFilter(filters.FilterSet):
+    """Фильтры ленты рецептов.
+
+    Теги передаются несколькими параметрами tags и объединяются по ИЛИ.
+    Все условия на связанные таблицы - подзапросы EXISTS, поэтому рецепт
+    с несколькими подходящими тегами не дублируется и DISTINCT не нужен.
+    ordering=-favorites_count сортирует по популярности. search ищет по
+    названию, описанию и ингредиентам и сортирует по релевантности,
+    если явно не задан ordering.
+    """
+    tags = filters.CharFilter(method='filter_tags')
+    author = filters.NumberFilter(field_name='author')
+    is_favorited = filters.BooleanFilter(method='filter_is_favorited',
+                                         widget=BooleanWidget())
+    is_in_shopping_cart = filters.BooleanFilter(
+            method='filter_is_in_shopping_cart', widget=BooleanWidget())
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(
+            choices=[(key, key) for key in ORDERINGS],
+            method='filter_ordering')
+
+    class Meta:
+        model = Recipies
+        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+                  'search', 'ordering']
+
+    def filter_search(self, queryset, name, value):
+        return recipe_search.search(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*ORDERINGS[value])
+
+    def filter_tags(self, queryset, name, value):
+        slugs = self.request.query_params.getlist('tags')
+        return queryset.filter(Exists(RecipeTags.objects.filter(
+                recipie=OuterRef('pk'), tag__slug__in=slugs)))
+
+    def filter_is_favorited(self, queryset, name, value):
+        return self.filter_user_relation(queryset, Favorites, value)
+
+    def filter_is_in_shopping_cart(self, queryset, name, value):
+        return self.filter_user_relation(queryset, ShoppingCart, value)
+
+    def filter_user_relation(self, queryset, model, value):
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.none() if value else queryset
+        related = Exists(model.objects.filter(user=user,
+                                              recipie=OuterRef('pk')))
+        if value:
+            return queryset.filter(related)
+        return queryset.filter(~related)
@@ -0,0 +1,80 @@
+import json
+import time
+
+from core import compression
+from core.renderers import FastJSONRenderer, orjson
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from foodgram.profiling import percentile
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время рендера страницы рецептов JSONRenderer и '
+            'FastJSONRenderer и размер ответа без сжатия, в gzip и Brotli.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+                '--limit', type=int, default=100,
+                help='Рецептов на странице, не больше 100.')
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть больше нуля.')
+        user = User.objects.order_by('pk').first()
+        if user is None:
+            raise CommandError('База пуста, запустите seed_data.')
+        client = APIClient()
+        client.force_authenticate(user)
+        url = f'/api/recipes/?limit={options["limit"]}'
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            response = client.get(url, HTTP_ACCEPT='application/json')
+            if response.status_code != 200:
+                raise CommandError(f'{url}: статус {response.status_code}')
+            data = response.data
+            self.stdout.write(
+                    f'{url}: рецептов {len(data["results"])}, orjson '
+                    f'{"есть" if orjson else "не установлен"}')
+            rendered = {}
+            for renderer in (JSONRenderer(), FastJSONRenderer()):
+                name = type(renderer).__name__
+                rendered[name], latencies = self.measure(
+                        lambda: renderer.render(data, 'application/json'),
+                        options['repeat'])
+                self.stdout.write(
+                        f'{name}: p50 {percentile(latencies, 50):.3f} мс, '
+                        f'p95 {percentile(latencies, 95):.3f} мс')
+            if len({json.dumps(json.loads(content), sort_keys=True)
+                    for content in rendered.values()}) != 1:
+                raise CommandError('Рендереры вернули разный JSON.')
+            content = rendered['FastJSONRenderer']
+            self.stdout.write(f'identity: {len(content)} байт')
+            for encoding in ('gzip', 'br'):
+                if encoding == 'br' and compression.brotli is None:
+                    self.stdout.write('br: пакет brotli не установлен')
+                    continue
+                compressed, latencies = self.measure(
+                        lambda: compression.compress(content, encoding),
+                        options['repeat'])
+                wire = client.get(url, HTTP_ACCEPT='application/json',
+                                  HTTP_ACCEPT_ENCODING=encoding)
+                self.stdout.write(
+                        f'{encoding}: {len(compressed)} байт '
+                        f'({len(compressed) / len(content):.1%}), сжатие '
+                        f'p50 {percentile(latencies, 50):.3f} мс; через '
+                        f'API Content-Encoding '
+                        f'{wire.get("Content-Encoding", "нет")}, '
+                        f'{len(wire.content)} байт')
+
+    @staticmethod
+    def measure(method, repeat):
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = method()
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        return result, latencies
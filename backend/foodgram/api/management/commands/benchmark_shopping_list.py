@@ -0,0 +1,108 @@
+import time
+from collections import defaultdict
+
+from core.shopping_list import shopping_list_rows
+from core.units import CONVERSIONS, display_amount
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from food_recipies.models import (IngredientAndItsQuantity, Recipies,
+                                  ShoppingCart)
+from foodgram.profiling import percentile
+from users.models import User
+
+
+def python_rows(user):
+    """Та же сводка, но перевод единиц в Python по каждой строке корзины."""
+    totals = defaultdict(int)
+    rows = (IngredientAndItsQuantity.objects
+            .filter(recipies__shopping_list_recipes__user=user)
+            .values_list('ingredient__name', 'ingredient__measurement_unit',
+                         'quantity'))
+    for name, unit, quantity in rows.iterator():
+        base, factor = CONVERSIONS.get(unit, (unit, 1))
+        totals[name, base] += quantity * factor
+    result = []
+    for (name, base), total in sorted(totals.items()):
+        amount, unit = display_amount(total, base)
+        result.append({'ingredient__name': name,
+                       'ingredient__measurement_unit': unit,
+                       'amount': amount})
+    return result
+
+
+class Command(BaseCommand):
+    help = ('Замеряет сборку списка покупок для корзины из тысяч строк: '
+            'сведение единиц в БД против перевода в Python. Корзина '
+            'создается во временной транзакции и откатывается.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+                '--lines', type=int, default=5000,
+                help='Сколько строк ингредиентов должно быть в корзине.')
+        parser.add_argument(
+                '--repeat', type=int, default=20,
+                help='Замеров на способ.')
+
+    def handle(self, *args, **options):
+        if options['lines'] < 1 or options['repeat'] < 1:
+            raise CommandError('--lines и --repeat должны быть больше нуля.')
+        with transaction.atomic():
+            user = User.objects.create(username='benchmark_shopping_list',
+                                       email='benchmark@example.com')
+            lines = self.fill_cart(user, options['lines'])
+            methods = {
+                    'database': lambda: list(shopping_list_rows(user)),
+                    'python': lambda: python_rows(user),
+            }
+            outputs = {}
+            for name, method in methods.items():
+                outputs[name], result = self.measure(method,
+                                                     options['repeat'])
+                self.stdout.write(
+                        f'{name}: строк в корзине {lines}, в списке '
+                        f'{len(outputs[name])}, p50 {result["p50_ms"]} мс, '
+                        f'p95 {result["p95_ms"]} мс, SQL {result["queries"]}')
+            transaction.set_rollback(True)
+        if self.as_dict(outputs['database']) != self.as_dict(
+                outputs['python']):
+            raise CommandError('Результаты способов не совпадают.')
+
+    @staticmethod
+    def fill_cart(user, lines):
+        recipes = (Recipies.objects.annotate(lines=Count('ingredients'))
+                   .order_by('pk').values_list('pk', 'lines'))
+        cart = []
+        total = 0
+        for recipe_id, count in recipes.iterator():
+            if total >= lines:
+                break
+            cart.append(ShoppingCart(user=user, recipie_id=recipe_id))
+            total += count
+        if total < lines:
+            raise CommandError(f'В базе только {total} строк ингредиентов '
+                               f'в рецептах, запустите seed_data.')
+        ShoppingCart.objects.bulk_create(cart, batch_size=1000)
+        return total
+
+    @staticmethod
+    def measure(method, repeat):
+        latencies = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                output = method()
+                latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        return output, {
+                'p50_ms': round(percentile(latencies, 50), 2),
+                'p95_ms': round(percentile(latencies, 95), 2),
+                'queries': len(context),
+        }
+
+    @staticmethod
+    def as_dict(rows):
+        return {(row['ingredient__name'],
+                 row['ingredient__measurement_unit']): row['amount']
+                for row in rows}
@@ -0,0 +1,102 @@
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+from core.throttling import ScopedBucketThrottle
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.throttling import ScopedRateThrottle
+
+SCOPE = 'benchmark'
+CACHE_METHODS = ('get', 'set', 'add', 'incr', 'get_many', 'delete')
+
+
+class Command(BaseCommand):
+    help = ('Микробенчмарк проверки лимита: накладные расходы на запрос '
+            'и число обращений к кэшу у ScopedRateThrottle из DRF и '
+            'ScopedBucketThrottle без общего кэша и с ним.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100000)
+        parser.add_argument(
+                '--clients', type=int, default=100,
+                help='Сколько разных пользователей шлют запросы. '
+                     'LocMemCache хранит 300 ключей, при большем числе '
+                     'счетчики вытесняются и обращений к кэшу больше.')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        if iterations < 1 or options['clients'] < 1:
+            raise CommandError(
+                    '--iterations и --clients должны быть больше нуля.')
+        requests = [
+                SimpleNamespace(user=SimpleNamespace(is_authenticated=True,
+                                                     pk=number), META={})
+                for number in range(options['clients'])
+        ]
+        single = requests[:1]
+        cases = (
+                ('allowed', requests, f'{iterations * 10}/min'),
+                ('rejected', single, '10/min'),
+        )
+        for case, case_requests, rate in cases:
+            drf_rates = {'THROTTLE_RATES': {f'{SCOPE}_{case}_drf': rate}}
+            throttles = {
+                    'drf': (type('Throttle', (ScopedRateThrottle,), drf_rates),
+                            False),
+                    'local': (ScopedBucketThrottle, False),
+                    'shared': (ScopedBucketThrottle, True),
+            }
+            for name, (throttle_class, shared) in throttles.items():
+                # Свой scope на прогон, чтобы ведра прошлых прогонов
+                # в памяти процесса не влияли на результат.
+                view = SimpleNamespace(throttle_scope=f'{SCOPE}_{case}_{name}')
+                rest_framework = {
+                        **settings.REST_FRAMEWORK,
+                        'DEFAULT_THROTTLE_RATES': {view.throttle_scope: rate},
+                }
+                caches['default'].clear()
+                with override_settings(REST_FRAMEWORK=rest_framework,
+                                       THROTTLE_SHARED_CACHE=shared):
+                    result = self.measure(throttle_class, view,
+                                          case_requests, iterations)
+                self.stdout.write(
+                        f'{case} {name}: {result["us"]:.2f} мкс/запрос, '
+                        f'кэш {result["cache_calls"]:.2f} обращ./запрос, '
+                        f'отклонено {result["rejected"]}')
+
+    @staticmethod
+    def measure(throttle_class, view, requests, iterations):
+        backend = caches['default']
+        calls = Counter()
+
+        def counted(method):
+            original = getattr(backend, method)
+
+            def wrapper(*args, **kwargs):
+                calls[method] += 1
+                return original(*args, **kwargs)
+            return wrapper
+
+        for method in CACHE_METHODS:
+            setattr(backend, method, counted(method))
+        rejected = 0
+        try:
+            start = time.perf_counter()
+            for number in range(iterations):
+                throttle = throttle_class()
+                if not throttle.allow_request(
+                        requests[number % len(requests)], view):
+                    throttle.wait()
+                    rejected += 1
+            elapsed = time.perf_counter() - start
+        finally:
+            for method in CACHE_METHODS:
+                delattr(backend, method)
+        return {
+                'us': elapsed / iterations * 1_000_000,
+                'cache_calls': sum(calls.values()) / iterations,
+                'rejected': rejected,
+        }
@@ -0,0 +1,90 @@
+import json
+import os
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from foodgram.profiling import percentile
+
+
+class Command(BaseCommand):
+    help = 'Сводка журнала профилирования по действиям вьюсетов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+                '--path', default=str(settings.PROFILING_LOG),
+                help='Журнал JSONL, ротированные копии читаются тоже.')
+        parser.add_argument(
+                '--top', type=int, default=5,
+                help='Сколько повторяющихся запросов показать.')
+        parser.add_argument(
+                '--json', action='store_true',
+                help='Вывести отчет в JSON.')
+
+    def handle(self, *args, **options):
+        records = list(self.read_records(options['path']))
+        if not records:
+            raise CommandError(f'В {options["path"]} нет записей.')
+        grouped = defaultdict(list)
+        for record in records:
+            grouped[record['endpoint']].append(record)
+        report = [self.summarize(endpoint, items, options['top'])
+                  for endpoint, items in grouped.items()]
+        report.sort(key=lambda item: item['p95_ms'], reverse=True)
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False,
+                                         indent=2))
+            return
+        for item in report:
+            self.stdout.write(
+                    f'{item["endpoint"]}: {item["requests"]} запросов, '
+                    f'p50 {item["p50_ms"]:.1f} мс, '
+                    f'p95 {item["p95_ms"]:.1f} мс, '
+                    f'p99 {item["p99_ms"]:.1f} мс, '
+                    f'SQL {item["avg_queries"]:.1f} шт./'
+                    f'{item["avg_sql_ms"]:.1f} мс')
+            for duplicate in item['duplicates']:
+                self.stdout.write(
+                        f'    x{duplicate["count"]} '
+                        f'({duplicate["requests"]} запр.): '
+                        f'{duplicate["sql"][:200]}')
+
+    def read_records(self, path):
+        paths = [path]
+        paths.extend(f'{path}.{number}' for number in range(1, 100)
+                     if os.path.exists(f'{path}.{number}'))
+        for file_path in paths:
+            if not os.path.exists(file_path):
+                continue
+            with open(file_path, encoding='utf-8') as file:
+                for line in file:
+                    if line.strip():
+                        yield json.loads(line)
+
+    @staticmethod
+    def summarize(endpoint, records, top):
+        totals = sorted(record['total_ms'] for record in records)
+        queries = Counter()
+        requests = Counter()
+        for record in records:
+            for duplicate in record['duplicates']:
+                queries[duplicate['sql']] += duplicate['count']
+                requests[duplicate['sql']] += 1
+        return {
+                'endpoint': endpoint,
+                'requests': len(records),
+                'p50_ms': percentile(totals, 50),
+                'p95_ms': percentile(totals, 95),
+                'p99_ms': percentile(totals, 99),
+                'avg_queries': sum(
+                        record['queries'] for record in records
+                ) / len(records),
+                'avg_sql_ms': sum(
+                        record['sql_ms'] for record in records
+                ) / len(records),
+                'duplicates': [
+                        {'sql': sql, 'count': count,
+                         'requests': requests[sql]}
+                        for sql, count in queries.most_common(top)
+                ],
+        }
@@ -1,7 +1,22 @@
+import hashlib
+import json
+import time
+
+from core.cache import (AUTHOR_VERSION, RECIPE_DETAILS_VERSION, get_version,
+                        local_version, single_flight)
+from core.membership import get_membership
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import prefetch_related_objects
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from food_recipies.models import Favorites, ShoppingCart
 from rest_framework import filters, mixins, viewsets
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
+from users.models import Followers
 
 from .permissions import ReadOnly, UserIsAdmin
 
@@ -56,3 +71,99 @@ class CommonViewSet(
     )
 
     lookup_field = 'slug'
+
+
+class VersionedCacheMixin:
+    """Кэш ответов list/retrieve для справочников.
+
+    Ключ включает версию cache_version_name, которая меняется сигналами
+    при сохранении и удалении объектов, поэтому старые записи просто
+    перестают читаться (без общего кэша - еще и раз в LOCAL_DATA_TTL
+    секунд). ETag - хэш содержимого, Last-Modified - время построения
+    записи, поэтому новые данные всегда получают новый ETag, даже если
+    версию сменил другой процесс. По ним клиент получает 304.
+    """
+    cache_version_name = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve,
+                                    *args, **kwargs)
+
+    def cached_response(self, request, view, *args, **kwargs):
+        version = local_version(self.cache_version_name)
+        renderer_format = request.accepted_renderer.format
+        key = (f'response:{self.cache_version_name}:{version}:'
+               f'{renderer_format}:{request.get_full_path()}')
+        entry = cache.get(key)
+        if entry is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            entry = (response.data,
+                     self.content_etag(response.data, renderer_format),
+                     int(time.time()))
+            cache.set(key, entry, settings.REFERENCE_CACHE_TIMEOUT)
+        data, etag, last_modified = entry
+        not_modified = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return self.add_cache_headers(not_modified, etag, last_modified)
+        return self.add_cache_headers(Response(data), etag, last_modified)
+
+    @staticmethod
+    def content_etag(data, renderer_format):
+        content = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+        digest = hashlib.sha256(content.encode()).hexdigest()[:32]
+        return quote_etag(f'{digest}-{renderer_format}')
+
+    @staticmethod
+    def add_cache_headers(response, etag, last_modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, public=True,
+                            max_age=settings.REFERENCE_CACHE_MAX_AGE)
+        return response
+
+
+class RecipeDetailCacheMixin:
+    """Кэш retrieve рецепта без данных пользователя.
+
+    Общая часть ответа хранится по id рецепта, его pub_date, которая
+    меняется при каждом сохранении, готовности уменьшенных копий картинки,
+    версии RECIPE_DETAILS_VERSION
+    (ингредиенты, теги) и версии профиля автора. Флаги пользователя и
+    favorites_count подставляются при ответе по одному запросу к базе.
+    При промахе ответ строит один запрос, остальные ждут его.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        instance = get_object_or_404(
+                self.queryset.only('author_id', 'pub_date', 'favorites_count',
+                                   'renditions_ready'),
+                **{self.lookup_field: kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(request, instance)
+        # Ссылки на картинки абсолютные, поэтому хост входит в ключ.
+        key = (f'recipe_detail:{instance.pk}:'
+               f'{instance.pub_date.timestamp()}:'
+               f'{instance.renditions_ready:d}:'
+               f'{get_version(RECIPE_DETAILS_VERSION)}:'
+               f'{get_version(AUTHOR_VERSION.format(instance.author_id))}:'
+               f'{request.build_absolute_uri("/")}')
+        data = single_flight(
+                key, lambda: dict(self.get_serializer(self.get_object()).data),
+                settings.RECIPE_DETAIL_CACHE_TIMEOUT)
+        membership = get_membership(request)
+        author = {**data['author'], 'is_subscribed': membership.contains(
+                Followers, instance.author_id)}
+        return Response({
+                **data,
+                'author': author,
+                'is_favorited': membership.contains(Favorites, instance.pk),
+                'is_in_shopping_cart': membership.contains(ShoppingCart,
+                                                           instance.pk),
+                'favorites_count': instance.favorites_count,
+        })
@@ -0,0 +1,26 @@
+from core.offload import async_read_view
+from django.conf import settings
+from django.urls import URLPattern
+from rest_framework.routers import DefaultRouter
+
+
+class AsyncReadRouter(DefaultRouter):
+    """Роутер, который при ASYNC_READ_VIEWS делает асинхронными
+    маршруты с действиями из async_read_actions вьюсета.
+    """
+
+    def get_urls(self):
+        urls = super().get_urls()
+        if not settings.ASYNC_READ_VIEWS:
+            return urls
+        return [self.wrap(url) for url in urls]
+
+    @staticmethod
+    def wrap(url):
+        view = url.callback
+        actions = getattr(getattr(view, 'cls', None),
+                          'async_read_actions', ())
+        if getattr(view, 'actions', {}).get('get') not in actions:
+            return url
+        return URLPattern(url.pattern, async_read_view(view),
+                          url.default_args, url.name)
@@ -1,12 +1,23 @@
+from core.db import bulk_create_with_pk
+from core.images import InvalidImage, save_upload
+from core.membership import get_membership
+from core.models import Task
+from core.shopping_list import SHOPPING_LIST_RENDERERS
 from django.contrib.auth import get_user_model
-from drf_extra_fields.fields import Base64ImageField
+from django.db import transaction
+from django.db.models import (OuterRef, Prefetch, Subquery,
+                              prefetch_related_objects)
+from food_recipies.models import (Favorites, IngredientAndItsQuantity,
+                                  Ingredients, RecipeTags, Recipies,
+                                  ShoppingCart, Tags)
+from food_recipies.search import recipe_search
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework.reverse import reverse
 from rest_framework.validators import UniqueValidator
+from users.models import Followers
 
-from ..food_recipies.models import (IngredientAndItsQuantity, Ingredients,
-                                    Recipies, Tags)
-from ..users.models import Followers
+from .fields import ContentAddressedImageField, RenditionsField
 
 User = get_user_model()
 
@@ -22,11 +33,18 @@ class UserSerializer(serializers.ModelSerializer):
             max_length=254,
             required=True,
             validators=[UniqueValidator(User.objects.all())])
+    is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
         model = User
-        fields = ['username', 'email', 'first_name', 'last_name', 'bio',
-                  'role']
+        fields = ['id', 'username', 'email', 'first_name', 'last_name',
+                  'bio', 'role', 'is_subscribed']
+
+    def get_is_subscribed(self, obj):
+        request = self.context.get('request')
+        if request is None:
+            return False
+        return get_membership(request).contains(Followers, obj.id)
 
     def validate_username(self, username):
         if username == 'me':
@@ -42,19 +60,17 @@ class IngredientsSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'measurement_unit']
 
 
-class AddIngredientsSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredients.objects.all())
-    amount = serializers.IntegerField()
-
-    class Meta:
-        model = IngredientAndItsQuantity
-        fields = ['id', 'amount']
+class AddIngredientsSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    amount = serializers.IntegerField(min_value=1)
 
 
 class IngredientsAndItsQuantitySerializer(serializers.ModelSerializer):
-    id = serializers.ReadOnlyField()
-    name = serializers.ReadOnlyField()
-    measurement_unit = serializers.ReadOnlyField()
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+            source='ingredient.measurement_unit')
+    amount = serializers.ReadOnlyField(source='quantity')
 
     class Meta:
         model = IngredientAndItsQuantity
@@ -62,81 +78,225 @@ class IngredientsAndItsQuantitySerializer(serializers.ModelSerializer):
 
 
 class RecipiesSerializer(serializers.ModelSerializer):
+    """Чтение рецепта.
+
+    Флаги is_favorited и is_in_shopping_cart берутся из наборов id
+    пользователя (core.membership), а не запросом на каждый рецепт.
+    """
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
-    image = Base64ImageField()
+    image = ContentAddressedImageField(source='picture', read_only=True)
+    images = RenditionsField(source='*')
     author = UserSerializer(read_only=True)
-    tags = TagsSerializer(read_only=True, many=True)
+    tags = TagsSerializer(source='tag', read_only=True, many=True)
     ingredients = IngredientsAndItsQuantitySerializer(read_only=True,
                                                       many=True)
+    text = serializers.CharField(source='description')
+    cooking_time = serializers.IntegerField(source='timing')
 
     class Meta:
         model = Recipies
         fields = ['id', 'tags', 'author', 'ingredients', 'is_favorited',
-                  'is_in_shopping_cart', 'name',
-                  'image', 'text', 'cooking_time']
+                  'is_in_shopping_cart', 'favorites_count', 'name',
+                  'image', 'images', 'text', 'cooking_time']
+        read_only_fields = ['favorites_count']
 
     def get_is_favorited(self, obj):
-        if (self.context['request'].user.is_authenticated
-                and obj.favorite_recipes.filter(
-                        user=self.context['request'].user).exists()):
-            return True
-        return False
+        return get_membership(self.context['request']).contains(Favorites,
+                                                                obj.id)
 
     def get_is_in_shopping_cart(self, obj):
-        if (self.context['request'].user.is_authenticated
-                and obj.shopping_list_recipes.filter(
-                        user=self.context['request'].user).exists()):
-            return True
-        return False
+        return get_membership(self.context['request']).contains(
+                ShoppingCart, obj.id)
 
 
 class AddRecipiesSerializer(serializers.ModelSerializer):
-    image = Base64ImageField(max_length=None, use_url=True)
+    """Создание и изменение рецепта за постоянное число запросов.
+
+    Ингредиенты и теги проверяются одним запросом каждые, пока картинка
+    проверяется в пуле uploads (поэтому image идет первой),
+    строки количества и связи M2M пишутся через bulk_create.
+    """
+    image = ContentAddressedImageField(source='picture')
     author = UserSerializer(read_only=True)
-    ingredients = AddIngredientsSerializer()
-    tags = serializers.PrimaryKeyRelatedField(
-            queryset=Tags.objects.all(),
-            many=True
-    )
+    ingredients = AddIngredientsSerializer(many=True, allow_empty=False)
+    tags = serializers.ListField(child=serializers.IntegerField(),
+                                 source='tag', allow_empty=False)
+    text = serializers.CharField(source='description')
+    cooking_time = serializers.IntegerField(source='timing', min_value=1)
 
     class Meta:
         model = Recipies
-        fields = ['id', 'tags', 'author', 'ingredients', 'name', 'image',
+        fields = ['image', 'id', 'tags', 'author', 'ingredients', 'name',
                   'text', 'cooking_time']
 
+    def validate(self, attrs):
+        if 'picture' in attrs:
+            try:
+                attrs['picture'] = attrs['picture'].result()
+            except InvalidImage as error:
+                raise ValidationError({'image': [str(error)]})
+        return attrs
+
+    def validate_ingredients(self, ingredients):
+        ids = [ingredient['id'] for ingredient in ingredients]
+        if len(set(ids)) != len(ids):
+            raise ValidationError('Ингредиенты не должны повторяться.')
+        missing = set(ids) - set(
+                Ingredients.objects.filter(id__in=ids)
+                .values_list('id', flat=True))
+        if missing:
+            raise ValidationError(
+                    f'Ингредиенты не найдены: {sorted(missing)}.')
+        return ingredients
+
+    def validate_tags(self, tags):
+        found = Tags.objects.in_bulk(set(tags))
+        missing = set(tags) - found.keys()
+        if missing:
+            raise ValidationError(f'Теги не найдены: {sorted(missing)}.')
+        return list(found.values())
+
+    @staticmethod
+    def save_picture(validated_data):
+        if 'picture' in validated_data:
+            validated_data['picture'] = save_upload(validated_data['picture'])
+
+    @transaction.atomic
     def create(self, validated_data):
-        image = validated_data.pop('image')
-        ingredients = validated_data.pop('ingredient')
+        ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tag')
-        recipie = Recipies.objects.create(image=image, **validated_data)
-        recipie.tag.set(tags)
-        for ingredient in ingredients:
-            add_ingredient = IngredientAndItsQuantity.objects.create(
-                    ingredient=ingredient['id'],
-                    amount=ingredient['amount'])
-            recipie.ingredient.add(add_ingredient)
+        self.save_picture(validated_data)
+        recipie = Recipies.objects.create(**validated_data)
+        RecipeTags.objects.bulk_create([
+                RecipeTags(recipie=recipie, tag=tag) for tag in tags
+        ])
+        self.add_ingredients(recipie, ingredients)
+        recipe_search.update([recipie.pk])
         return recipie
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredient')
-        tags = validated_data.pop('tag')
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tag', None)
+        self.save_picture(validated_data)
         super().update(instance, validated_data)
-        IngredientAndItsQuantity.objects.filter(recipes=instance).delete()
-        recipie = instance
-        for ingredient in ingredients:
-            object = IngredientAndItsQuantity.objects.create(
-                    ingredient=ingredient['id'],
-                    amount=ingredient['amount'])
-            recipie.ingredient.add(object)
-        instance.tag.set(tags)
-        return recipie
+        if tags is not None:
+            instance.tag.set(tags)
+        if ingredients is not None:
+            self.update_ingredients(instance, ingredients)
+        recipe_search.update([instance.pk])
+        return instance
+
+    @staticmethod
+    def add_ingredients(recipie, ingredients):
+        quantities = bulk_create_with_pk(IngredientAndItsQuantity, [
+                IngredientAndItsQuantity(ingredient_id=ingredient['id'],
+                                         quantity=ingredient['amount'])
+                for ingredient in ingredients
+        ])
+        through = Recipies.ingredients.through
+        through.objects.bulk_create([
+                through(recipies=recipie, ingredientanditsquantity=quantity)
+                for quantity in quantities
+        ])
+
+    def update_ingredients(self, recipie, ingredients):
+        current = {
+                quantity.ingredient_id: quantity
+                for quantity in recipie.ingredients.all()
+        }
+        amounts = {
+                ingredient['id']: ingredient['amount']
+                for ingredient in ingredients
+        }
+        removed = [
+                quantity.id for ingredient_id, quantity in current.items()
+                if ingredient_id not in amounts
+        ]
+        if removed:
+            IngredientAndItsQuantity.objects.filter(id__in=removed).delete()
+        changed = []
+        for ingredient_id, amount in amounts.items():
+            quantity = current.get(ingredient_id)
+            if quantity is not None and quantity.quantity != amount:
+                quantity.quantity = amount
+                changed.append(quantity)
+        if changed:
+            IngredientAndItsQuantity.objects.bulk_update(changed,
+                                                         ['quantity'])
+        self.add_ingredients(recipie, [
+                ingredient for ingredient in ingredients
+                if ingredient['id'] not in current
+        ])
+
+    def to_representation(self, instance):
+        # Те же prefetch, что у RecipeViewSet.get_queryset: без них ответ
+        # читает каждый ингредиент отдельным запросом.
+        instance._prefetched_objects_cache = {}
+        prefetch_related_objects([instance], 'tag', Prefetch(
+                'ingredients', queryset=IngredientAndItsQuantity.objects
+                .select_related('ingredient')))
+        return RecipiesSerializer(instance, context=self.context).data
+
+
+class PantrySerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+            child=serializers.IntegerField(min_value=1), allow_empty=False,
+            max_length=500)
+    max_missing = serializers.IntegerField(min_value=0, required=False,
+                                           allow_null=True)
+
+
+class PantryRecipeSerializer(RecipiesSerializer):
+    """Рецепт с оценкой: coverage - доля ингредиентов рецепта, которые
+    есть у пользователя, missing - сколько ингредиентов не хватает."""
+    coverage = serializers.FloatField(read_only=True)
+    missing = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipiesSerializer.Meta):
+        fields = RecipiesSerializer.Meta.fields + ['coverage', 'missing']
+
+
+class ShoppingListItemSerializer(serializers.Serializer):
+    name = serializers.CharField(source='ingredient__name')
+    measurement_unit = serializers.CharField(
+            source='ingredient__measurement_unit')
+    amount = serializers.ReadOnlyField()
+
+
+class ShoppingListExportSerializer(serializers.Serializer):
+    format = serializers.ChoiceField(
+            choices=[renderer.format for renderer in SHOPPING_LIST_RENDERERS],
+            default='pdf')
+
+
+class TaskSerializer(serializers.ModelSerializer):
+    url = serializers.HyperlinkedIdentityField(view_name='tasks-detail')
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Task
+        fields = ['id', 'status', 'attempts', 'created', 'finished', 'url',
+                  'download_url']
+
+    def get_download_url(self, obj):
+        if obj.status != Task.DONE or not isinstance(obj.result, dict):
+            return None
+        if 'file' not in obj.result:
+            return None
+        return reverse('tasks-download', args=[obj.pk],
+                       request=self.context['request'])
 
 
 class RecipeSerializer(serializers.ModelSerializer):
+    image = ContentAddressedImageField(source='picture', read_only=True)
+    images = RenditionsField(source='*')
+    cooking_time = serializers.IntegerField(source='timing', read_only=True)
+
     class Meta:
         model = Recipies
-        fields = ['id', 'name', 'image', 'cooking_time']
+        fields = ['id', 'name', 'image', 'images', 'cooking_time']
 
 
 # class IngredientsSerializer(serializers.ModelSerializer):
@@ -156,7 +316,47 @@ class PasswordSerializer(serializers.Serializer):
 #         fields = ['id', 'name', 'image', 'cooking_time']
 
 
+def get_recipes_limit(request):
+    try:
+        return max(int(request.query_params['recipes_limit']), 0)
+    except (KeyError, ValueError):
+        return None
+
+
+class SubscriptionsListSerializer(serializers.ListSerializer):
+    """Загружает превью рецептов всех авторов страницы одним запросом.
+
+    Для каждого автора берутся recipes_limit последних рецептов:
+    id IN (SELECT id ... WHERE author_id = автор ORDER BY ... LIMIT n),
+    коррелированный подзапрос по индексу рецептов автора.
+    """
+
+    def to_representation(self, data):
+        authors = list(data.all() if hasattr(data, 'all') else data)
+        self.recipes_by_author = self.latest_recipes(
+                [author.id for author in authors],
+                get_recipes_limit(self.context['request']))
+        return super().to_representation(authors)
+
+    @staticmethod
+    def latest_recipes(author_ids, limit):
+        recipes = Recipies.objects.filter(author__in=author_ids).only(
+                'id', 'name', 'picture', 'timing', 'author_id', 'pub_date',
+                'renditions_ready',
+        ).order_by('-pub_date', '-id')
+        if limit is not None:
+            latest = Recipies.objects.filter(
+                    author_id=OuterRef('author_id'),
+            ).order_by('-pub_date', '-id').values('pk')[:limit]
+            recipes = recipes.filter(pk__in=Subquery(latest))
+        recipes_by_author = {author_id: [] for author_id in author_ids}
+        for recipie in recipes:
+            recipes_by_author[recipie.author_id].append(recipie)
+        return recipes_by_author
+
+
 class SubscriptionsSerializer(serializers.ModelSerializer):
+    is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
     recipes_count = serializers.SerializerMethodField()
 
@@ -164,50 +364,49 @@ class SubscriptionsSerializer(serializers.ModelSerializer):
         model = User
         fields = ['email', 'id', 'username', 'first_name', 'last_name',
                   'is_subscribed', 'recipes', 'recipes_count']
+        list_serializer_class = SubscriptionsListSerializer
+
+    def get_is_subscribed(self, obj):
+        return get_membership(self.context['request']).contains(Followers,
+                                                                obj.id)
 
-        def get_recipes(self, obj):
-            limits = (
-                    self.context['request'].query_params.get('recipes_limit'))
-            recipie = obj.recipes.all()
-            if limits is not None:
-                limit = int(limits)
-                serializer = RecipiesSerializer(
-                        recipie[:limit],
-                        many=True
-                )
-            else:
-                serializer = RecipiesSerializer(
-                        recipie,
-                        many=True
-                )
-            return serializer.data
-
-        def get_recipes_count(self, obj):
-            return Recipies.objects.filter(author=obj.author).count()
-
-    class SubscribeSerializer(serializers.ModelSerializer):
-        class Meta:
-            model = Followers
-            fields = ['user', 'author']
-
-        def validate(self, data):
-            user = data.get('user')
-            author = data.get('author')
-            if user == author:
-                raise serializers.ValidationError(
-                        'You cant follow user.'
-                )
-            if Followers.objects.filter(user=user, author=author).exists():
-                raise serializers.ValidationError(
-                        'This author is followed.'
-                )
-            return data
-
-        def to_representation(self, instance):
-            request = self.context.get('request')
-            contexts = {'Request': request}
-            serializer = SubscriptionsSerializer(
-                    instance,
-                    context=contexts
+    def get_recipes(self, obj):
+        recipes_by_author = getattr(self.parent, 'recipes_by_author', None)
+        if recipes_by_author is not None:
+            recipes = recipes_by_author[obj.id]
+        else:
+            recipes = obj.recipes.defer('search_vector')
+            limit = get_recipes_limit(self.context['request'])
+            if limit is not None:
+                recipes = recipes[:limit]
+        return RecipeSerializer(recipes, many=True,
+                                context=self.context).data
+
+    def get_recipes_count(self, obj):
+        return obj.recipes_count
+
+
+class SubscribeSerializer(serializers.ModelSerializer):
+    already_followed = 'This author is followed.'
+
+    class Meta:
+        model = Followers
+        fields = ['follower', 'followed']
+
+    def validate(self, data):
+        user = data.get('follower')
+        author = data.get('followed')
+        if user == author:
+            raise serializers.ValidationError(
+                    'You cant follow user.'
             )
-            return serializer.data
+        if Followers.objects.filter(follower=user, followed=author).exists():
+            raise serializers.ValidationError(self.already_followed)
+        return data
+
+    def to_representation(self, instance):
+        serializer = SubscriptionsSerializer(
+                instance.followed,
+                context=self.context
+        )
+        return serializer.data
@@ -1,27 +1,28 @@
 from django.urls import include, path
 from djoser.views import TokenCreateView, TokenDestroyView
-from rest_framework.routers import DefaultRouter
-from views import (FollowingView, IngredientsSerializer, RecipeViewSet,
-                   TagsSerializer, UserViewSet)
 
-router_v1_user = DefaultRouter()
+from .routers import AsyncReadRouter
+from .views import (FollowingView, IngredientViewSet, RecipeViewSet,
+                    TagViewSet, TaskViewSet, TokenCacheStatsView, UserViewSet)
+
+router_v1_user = AsyncReadRouter()
 
 router_v1_user.register('users', UserViewSet, basename='users')
 
-router_v1_user.register('ingredients', IngredientsSerializer,
+router_v1_user.register('ingredients', IngredientViewSet,
                         basename='ingredients')
-router_v1_user.register('recipies', RecipeViewSet, basename='recipies')
-router_v1_user.register('tags', TagsSerializer, basename='tags')
+router_v1_user.register('recipes', RecipeViewSet, basename='recipes')
+router_v1_user.register('tags', TagViewSet, basename='tags')
+router_v1_user.register('tasks', TaskViewSet, basename='tasks')
 
 auth_urls = [
     path('token/login/', TokenCreateView.as_view(), name='login'),
-    path('token/logout/', TokenDestroyView.as_view(), name='signup')]
+    path('token/logout/', TokenDestroyView.as_view(), name='signup'),
+    path('token/stats/', TokenCacheStatsView.as_view(),
+         name='token_stats')]
 
 urlpatterns = [
-    path('users/subscriptions/', UserViewSet.as_view()),
     path('users/<int:pk>/subscribe/', FollowingView.as_view()),
-    path('', include(router_v1_user.urls)),
     path('auth/', include(auth_urls)),
     path('', include(router_v1_user.urls)),
-
 ]
@@ -1,102 +1,263 @@
-from core.pagination import CustomPagination
-from core.pdf_download import getpdf
+from functools import partial
+
+from core.authentication import token_cache
+from core.cache import INGREDIENTS_VERSION, TAGS_VERSION
+from core.membership import get_membership
+from core.models import Task
+from core.pagination import CustomPagination, FeedPagination, RecipePagination
+from core.shopping_list import (SHOPPING_LIST_RENDERERS, export_shopping_list,
+                                shopping_list_response, shopping_list_rows)
+from core.tasks import defer, enqueue
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from food_recipie.models import Followers, Ingredients, Tags
-from food_recipies.models import (Favorite, IngredientAndItsQuantity, Recipies,
-                                  ShoppingCart)
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from django.http import FileResponse
+from django_filters.rest_framework import DjangoFilterBackend
+from food_recipies.counters import RECIPE_COUNTERS, change_counter
+from food_recipies.feed import (fan_out_recipe, feed_ids, follow_author,
+                                unfollow_author)
+from food_recipies.models import (Favorites, IngredientAndItsQuantity,
+                                  Ingredients, Recipies, ShoppingCart, Tags)
+from food_recipies.pantry import pantry_index
+from food_recipies.search import ingredient_index
 from rest_framework import filters, status, views, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from serializers import (AddRecipiesSerializer, RecipeSerializer,
-                         RecipiesSerializer)
+from rest_framework.settings import api_settings
+from users.models import Followers
 
-from ..permissions import IsOwnerOrReadOnly
-from .mixins import NoPUTViewSet, PatchViewSet
-from .permissions import UserIsAdmin
-from .serializers import (IngredientsSerializer, PasswordSerializer,
-                          SubscribeSerializer, SubscriptionsSerializer,
-                          TagsSerializer, UserSerializer)
+from .filters import RecipeFilter
+from .mixins import (NoPUTViewSet, PatchViewSet, RecipeDetailCacheMixin,
+                     VersionedCacheMixin)
+from .permissions import IsOwnerOrReadOnly, UserIsAdmin
+from .serializers import (AddRecipiesSerializer, IngredientsSerializer,
+                          PantryRecipeSerializer, PantrySerializer,
+                          PasswordSerializer, RecipeSerializer,
+                          RecipiesSerializer, ShoppingListExportSerializer,
+                          ShoppingListItemSerializer, SubscribeSerializer,
+                          SubscriptionsSerializer, TagsSerializer,
+                          TaskSerializer, UserSerializer)
 
 User = get_user_model()
 
+OBJECT_EXISTS = 'Object exists.'
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
-    class CustomSearchFilter(filters.SearchFilter):
-        search_param = 'name'
 
+class IngredientViewSet(VersionedCacheMixin, viewsets.ReadOnlyModelViewSet):
+    async_read_actions = ('list', 'retrieve')
     queryset = Ingredients.objects.all()
     serializer_class = IngredientsSerializer
-    filter_backends = [CustomSearchFilter]
-    search_fields = ('^name',)
+    cache_version_name = INGREDIENTS_VERSION
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name is None:
+            return super().list(request, *args, **kwargs)
+        return Response(ingredient_index.search(name))
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(RecipeDetailCacheMixin, viewsets.ModelViewSet):
+    async_read_actions = ('list', 'retrieve')
     queryset = Recipies.objects.all()
     permission_classes = (IsOwnerOrReadOnly,)
-    pagination_class = CustomPagination
+    pagination_class = RecipePagination
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = RecipeFilter
+    # Задается в @action для отдельных действий.
+    throttle_scope = None
+
+    def get_queryset(self):
+        # search_vector нужен только в WHERE поиска, в ответ он не попадает.
+        return Recipies.objects.select_related('author').prefetch_related(
+                'tag',
+                Prefetch('ingredients',
+                         queryset=IngredientAndItsQuantity.objects
+                         .select_related('ingredient')),
+        ).defer('search_vector')
 
     def get_serializer_class(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'feed']:
             return RecipiesSerializer
         return AddRecipiesSerializer
 
+    @transaction.atomic
     def perform_create(self, serializer):
         user = self.request.user
-        serializer.save(author=user)
+        recipie = serializer.save(author=user)
+        change_counter(User, user.pk, 'recipes_count', 1)
+        defer(fan_out_recipe, [recipie.pk])
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        author_id = instance.author_id
+        instance.delete()
+        change_counter(User, author_id, 'recipes_count', -1)
 
     @action(detail=True, methods=['POST', 'DELETE'],
-            permission_classes=[IsAuthenticated, ])
+            permission_classes=[IsAuthenticated, ], throttle_scope='favorite')
     def favorite(self, request, pk=None):
         if request.method == 'POST':
-            return self.add_recipe(Favorite, request, pk)
+            return self.add_recipe(Favorites, request, pk)
 
-        return self.delete_recipe(Favorite, request, pk)
+        return self.delete_recipe(Favorites, request, pk)
 
     @action(detail=True, methods=['POST', 'DELETE'],
-            permission_classes=[IsAuthenticated, ])
+            permission_classes=[IsAuthenticated, ],
+            throttle_scope='shopping_cart')
     def shopping_cart(self, request, pk):
         if request.method == 'POST':
             return self.add_recipe(ShoppingCart, request, pk)
 
         return self.delete_recipe(ShoppingCart, request, pk)
 
-    @action(detail=False, permission_classes=[IsAuthenticated, ])
+    @action(detail=False, permission_classes=[IsAuthenticated, ],
+            renderer_classes=SHOPPING_LIST_RENDERERS,
+            throttle_scope='shopping_list')
     def download_shopping_cart(self, request):
-        ingredients = IngredientAndItsQuantity.objects.filter(
-                recipe__carts__user=request.user).values(
-                'ingredient__name', 'ingredient__measurement_unit').annotate(
-                ingredient_amount=Sum('amount'))
-        return getpdf(ingredients)
+        return shopping_list_response(request.user,
+                                      request.accepted_renderer)
+
+    @action(detail=False, permission_classes=[IsAuthenticated, ],
+            throttle_scope='shopping_list')
+    def shopping_list(self, request):
+        """Список покупок в JSON, количества сведены к общим единицам."""
+        return Response(ShoppingListItemSerializer(
+                shopping_list_rows(request.user), many=True).data)
 
-    def add_recipe(self, model, pk):
+    @action(detail=False, methods=['POST'],
+            permission_classes=[IsAuthenticated, ],
+            throttle_scope='shopping_list_export')
+    def export_shopping_cart(self, request):
+        """Ставит выгрузку списка покупок в очередь фоновых задач.
+
+        Отвечает 202 с задачей: url - для опроса статуса, download_url
+        появляется, когда файл готов. Повторный запрос, пока такая же
+        выгрузка не закончилась, возвращает ту же задачу. Без
+        TASK_QUEUE_ENABLED файл строится в этом запросе (core.W001).
+        """
+        serializer = ShoppingListExportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        args = [request.user.pk, serializer.validated_data['format']]
+        queued = Task.objects.filter(
+                user=request.user, name=export_shopping_list.task_name,
+                args=args, status__in=(Task.QUEUED, Task.RUNNING)).first()
+        if queued is None:
+            queued = enqueue(export_shopping_list, args, user=request.user)
+            # Без воркера задача уже выполнилась после коммита.
+            queued.refresh_from_db()
+        data = TaskSerializer(queued, context={'request': request}).data
+        return Response(data, status=status.HTTP_202_ACCEPTED,
+                        headers={'Location': data['url']})
+
+    @action(detail=False, pagination_class=FeedPagination,
+            permission_classes=[IsAuthenticated, ])
+    def feed(self, request):
+        """Новые рецепты авторов, на которых подписан пользователь."""
+        user = request.user
+        ids = self.paginator.paginate_ids(
+                partial(feed_ids, user), request)
+        recipes = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer(
+                [recipes[pk] for pk in ids if pk in recipes], many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, pagination_class=CustomPagination)
+    def pantry(self, request):
+        """Рецепты, которые можно приготовить из продуктов пользователя.
+
+        Продукты передаются несколькими параметрами ingredients (id),
+        max_missing ограничивает число недостающих ингредиентов.
+        """
+        serializer = PantrySerializer(data={
+                'ingredients': request.query_params.getlist('ingredients'),
+                'max_missing': request.query_params.get('max_missing'),
+        })
+        serializer.is_valid(raise_exception=True)
+        scored = pantry_index.recommend(
+                serializer.validated_data['ingredients'],
+                serializer.validated_data.get('max_missing'))
+        page = self.paginate_queryset(scored)
+        recipes = self.get_queryset().in_bulk(
+                [recipe_id for _, _, recipe_id in page])
+        results = []
+        for coverage, missing, recipe_id in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                recipe.coverage = round(coverage, 4)
+                recipe.missing = missing
+                results.append(recipe)
+        return self.get_paginated_response(PantryRecipeSerializer(
+                results, many=True, context=self.get_serializer_context(),
+        ).data)
+
+    def add_recipe(self, model, request, pk):
         recipie = get_object_or_404(Recipies, pk=pk)
-        user = self.request.user
-        if model.objects.filter(recipe=recipie, user=user).exists():
-            raise ValidationError('Object exists.')
-        model.objects.create(recipe=recipie, user=user)
+        user = request.user
+        if model.objects.filter(recipie=recipie, user=user).exists():
+            raise ValidationError(OBJECT_EXISTS)
+        with transaction.atomic():
+            try:
+                # Savepoint: параллельный такой же запрос мог успеть
+                # вставить строку после проверки выше.
+                with transaction.atomic():
+                    model.objects.create(recipie=recipie, user=user)
+            except IntegrityError:
+                raise ValidationError(OBJECT_EXISTS)
+            change_counter(Recipies, recipie.id, RECIPE_COUNTERS[model], 1)
+            get_membership(request).add(model, recipie.id)
         serializer = RecipeSerializer(recipie)
         return Response(data=serializer.data, status=status.HTTP_201_CREATED)
 
-    def delete_recipe(self, model, pk):
+    def delete_recipe(self, model, request, pk):
         recipie = get_object_or_404(Recipies, pk=pk)
-        user = self.request.user
-        obj = get_object_or_404(model, recipe=recipie, user=user)
-        obj.delete()
+        user = request.user
+        obj = get_object_or_404(model, recipie=recipie, user=user)
+        with transaction.atomic():
+            obj.delete()
+            change_counter(Recipies, recipie.id, RECIPE_COUNTERS[model], -1)
+            get_membership(request).discard(model, recipie.id)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TaskViewSet(viewsets.ReadOnlyModelViewSet):
+    """Фоновые задачи пользователя: статус и готовый файл."""
+    serializer_class = TaskSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = CustomPagination
+
+    def get_queryset(self):
+        return Task.objects.filter(user=self.request.user).order_by('-pk')
+
+    @action(detail=True)
+    def download(self, request, pk=None):
+        result = self.get_object().result
+        if not isinstance(result, dict) or 'file' not in result:
+            return Response({'errors': 'Файл еще не готов.'},
+                            status=status.HTTP_409_CONFLICT)
+        if not default_storage.exists(result['file']):
+            return Response({'errors': 'Файл уже удален.'},
+                            status=status.HTTP_410_GONE)
+        return FileResponse(default_storage.open(result['file']),
+                            as_attachment=True,
+                            filename=result['filename'],
+                            content_type=result['content_type'])
+
+
+class TagViewSet(VersionedCacheMixin, viewsets.ReadOnlyModelViewSet):
+    async_read_actions = ('list', 'retrieve')
     queryset = Tags.objects.all()
     serializer_class = TagsSerializer
+    cache_version_name = TAGS_VERSION
 
 
 class UserViewSet(NoPUTViewSet, PatchViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    pagination_class = CustomPagination
     lookup_field = 'username'
     permission_classes = (UserIsAdmin,)
     filter_backends = (filters.SearchFilter,)
@@ -140,12 +301,12 @@ class UserViewSet(NoPUTViewSet, PatchViewSet):
     @action(detail=False, methods=['GET'],
             permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
-        queryset = self.request.user.follower.all()
-        if not queryset.exists():
-            return Response('None', status=status.HTTP_400_BAD_REQUEST)
+        queryset = User.objects.filter(
+                followed__follower=request.user
+        ).order_by('-followed__id')
 
         page = self.paginate_queryset(queryset)
-        if page:
+        if page is not None:
             serializer = SubscriptionsSerializer(
                     page,
                     many=True,
@@ -161,24 +322,47 @@ class UserViewSet(NoPUTViewSet, PatchViewSet):
 class FollowingView(views.APIView):
     pagination_class = CustomPagination
     permission_classes = (IsAuthenticated,)
+    throttle_scope = 'subscribe'
 
     def post(self, request, pk):
         author = get_object_or_404(User, pk=pk)
         user = self.request.user
-        data = {'author': author.id, 'user': user.id}
+        data = {'followed': author.id, 'follower': user.id}
         serializer = SubscribeSerializer(
                 data=data, context={'request': request}
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    serializer.save()
+            except IntegrityError:
+                raise ValidationError(
+                        {api_settings.NON_FIELD_ERRORS_KEY: [
+                                SubscribeSerializer.already_followed]})
+            change_counter(User, author.id, 'followers_count', 1)
+            follow_author(user.id, author.id, author.followers_count + 1)
+            get_membership(request).add(Followers, author.id)
         return Response(data=serializer.data,
                         status=status.HTTP_201_CREATED)
 
-    def delete(self, pk):
+    def delete(self, request, pk):
         author = get_object_or_404(User, pk=pk)
         user = self.request.user
         following = get_object_or_404(
-                Followers, user=user, author=author
+                Followers, follower=user, followed=author
         )
-        following.delete()
+        with transaction.atomic():
+            following.delete()
+            change_counter(User, author.id, 'followers_count', -1)
+            unfollow_author(user.id, author.id)
+            get_membership(request).discard(Followers, author.id)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class TokenCacheStatsView(views.APIView):
+    """Попадания и промахи кэша токенов для мониторинга."""
+    permission_classes = (UserIsAdmin,)
+
+    def get(self, request):
+        return Response(token_cache.stats())
@@ -0,0 +1,98 @@
+"""Бенчмарки API на синтетических данных в тестовой базе.
+
+Запуск из backend/foodgram: python -m pytest benchmarks
+--benchmark-json=report.json. Набор данных создает seed_data один раз
+на сессию, отчеты разных версий можно сравнивать diff'ом.
+"""
+import json
+import platform
+from datetime import datetime, timezone
+from io import StringIO
+
+import django
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import override_settings
+from food_recipies.models import (Favorites, Ingredients, Recipies,
+                                  ShoppingCart, Tags)
+from rest_framework.authtoken.models import Token
+from users.models import Followers, User
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmark', 'бенчмарки API')
+    group.addoption('--benchmark-requests', type=int, default=50,
+                    help='Замеряемых запросов на сценарий.')
+    group.addoption('--benchmark-warmup', type=int, default=5,
+                    help='Запросов на прогрев перед замером.')
+    group.addoption('--benchmark-concurrency', type=int, default=0,
+                    help='Дополнительно прогнать сценарии через ASGI '
+                         'с таким числом одновременных запросов.')
+    group.addoption('--benchmark-json', help='Файл для отчета в JSON.')
+    group.addoption('--seed-users', type=int, default=100)
+    group.addoption('--seed-recipes', type=int, default=1000)
+
+
+@pytest.fixture(scope='session', autouse=True)
+def media_root(tmp_path_factory):
+    with override_settings(MEDIA_ROOT=tmp_path_factory.mktemp('media')):
+        yield
+
+
+@pytest.fixture(scope='session', autouse=True)
+def no_throttling():
+    """Сценарий делает сотни запросов от одного пользователя, а лимиты
+    throttle_scope (shopping_list - 20/min) ответили бы на них 429.
+    ScopedBucketThrottle пропускает scope без лимита."""
+    with override_settings(REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}):
+        yield
+
+
+@pytest.fixture(scope='session')
+def dataset(request, media_root, django_db_setup, django_db_blocker):
+    """Синтетические данные seed_data и токен самого активного читателя."""
+    options = request.config.option
+    with django_db_blocker.unblock():
+        call_command('seed_data', users=options.seed_users,
+                     recipes=options.seed_recipes, seed=0,
+                     stdout=StringIO())
+        author = User.objects.order_by('-followers_count', 'pk').first()
+        follower = (Followers.objects.filter(followed=author)
+                    .values_list('follower', flat=True).first())
+        user = User.objects.get(pk=follower) if follower else author
+        token, _ = Token.objects.get_or_create(user=user)
+        sizes = {model.__name__: model.objects.count()
+                 for model in (User, Recipies, Ingredients, Tags,
+                               Followers, Favorites, ShoppingCart)}
+    return {'user': user, 'token': token.key, 'sizes': sizes}
+
+
+@pytest.fixture(scope='session')
+def report(request, dataset):
+    """Результаты сценариев, в конце сессии - в --benchmark-json."""
+    results = {}
+    yield results
+    path = request.config.option.benchmark_json
+    if not path:
+        return
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({
+                'time': datetime.now(timezone.utc).isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'user': dataset['user'].username,
+                'dataset': dataset['sizes'],
+                'scenarios': results,
+        }, file, ensure_ascii=False, indent=2)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    lines = getattr(config, 'benchmark_lines', [])
+    if lines:
+        terminalreporter.section('бенчмарки API')
+        for line in lines:
+            terminalreporter.write_line(line)
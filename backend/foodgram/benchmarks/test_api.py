@@ -0,0 +1,166 @@
+import asyncio
+import importlib
+import time
+from contextlib import contextmanager
+
+import pytest
+from asgiref.sync import sync_to_async
+from core.db import capture_queries
+from django.test import AsyncClient
+from django.test.utils import override_settings
+from django.urls import clear_url_caches
+from food_recipies.models import Ingredients, Recipies, Tags
+from foodgram.profiling import QueryRecorder, percentile
+from rest_framework.test import APIClient
+
+SCENARIOS = ('recipe_feed', 'recipe_feed_cursor', 'popular_feed',
+             'filtered_feed', 'recipe_detail', 'ingredient_search',
+             'subscriptions', 'shopping_list')
+
+
+def scenario_url(name):
+    tag = Tags.objects.order_by('pk').values_list('slug', flat=True).first()
+    ingredient = Ingredients.objects.order_by('pk').values_list(
+            'name', flat=True).first() or ''
+    recipe = Recipies.objects.order_by('pk').values_list(
+            'pk', flat=True).first()
+    return {
+            'recipe_feed': '/api/recipes/',
+            'recipe_feed_cursor': '/api/recipes/?cursor=',
+            'popular_feed': '/api/recipes/?ordering=-favorites_count',
+            'filtered_feed': f'/api/recipes/?tags={tag}&is_favorited=1',
+            'recipe_detail': f'/api/recipes/{recipe}/',
+            'ingredient_search': f'/api/ingredients/?name={ingredient[:3]}',
+            'subscriptions': '/api/users/subscriptions/?recipes_limit=3',
+            'shopping_list': '/api/recipes/download_shopping_cart/',
+    }[name]
+
+
+def measure(client, url, warmup, requests):
+    for _ in range(warmup):
+        client.get(url)
+    latencies = []
+    queries = []
+    statuses = set()
+    started = time.perf_counter()
+    for _ in range(requests):
+        with capture_queries(QueryRecorder()) as recorder:
+            start = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(recorder.count)
+        statuses.add(response.status_code)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+            'url': url,
+            'status': sorted(statuses),
+            'requests': requests,
+            'rps': round(requests / elapsed, 1) if elapsed else None,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'queries_min': min(queries),
+            'queries_max': max(queries),
+    }
+
+
+def reload_urls():
+    """AsyncReadRouter читает ASYNC_READ_VIEWS при импорте URLconf."""
+    for module in ('api.urls', 'foodgram.urls'):
+        importlib.reload(importlib.import_module(module))
+    clear_url_caches()
+
+
+@contextmanager
+def async_read_views():
+    try:
+        with override_settings(ASYNC_READ_VIEWS=True):
+            reload_urls()
+            yield
+    finally:
+        reload_urls()
+
+
+async def measure_asgi(token, url, requests, concurrency):
+    """Те же запросы через ASGI-приложение, concurrency одновременно,
+    с ASYNC_READ_VIEWS.
+
+    Синхронный воркер WSGI обслуживает запросы по одному, поэтому
+    его пропускная способность - это результат measure. Запросы к БД
+    считаются и в потоках пула представлений.
+    """
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    queries = []
+    statuses = set()
+
+    async def request():
+        async with semaphore:
+            # Каждый запрос - своя задача со своим контекстом и счетчиком.
+            with capture_queries(QueryRecorder()) as recorder:
+                start = time.perf_counter()
+                # AsyncClient передает extra как заголовки без HTTP_.
+                response = await client.get(
+                        url, authorization=f'Token {token}')
+                if response.streaming:
+                    await sync_to_async(b''.join)(response.streaming_content)
+                latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(recorder.count)
+            statuses.add(response.status_code)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+            'concurrency': concurrency,
+            'status': sorted(statuses),
+            'rps': round(requests / elapsed, 1) if elapsed else None,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'queries_min': min(queries),
+            'queries_max': max(queries),
+    }
+
+
+def summary(name, result):
+    queries = result['queries_min']
+    if result['queries_max'] != queries:
+        queries = f'{queries}-{result["queries_max"]}'
+    line = (f'{name}: {result["rps"]} запр./с, '
+            f'p50 {result["p50_ms"]} мс, p95 {result["p95_ms"]} мс, '
+            f'p99 {result["p99_ms"]} мс, SQL {queries}')
+    if 'asgi' in result:
+        asgi = result['asgi']
+        line += (f'; ASGI x{asgi["concurrency"]}: {asgi["rps"]} запр./с, '
+                 f'p50 {asgi["p50_ms"]} мс, p95 {asgi["p95_ms"]} мс, '
+                 f'SQL {asgi["queries_min"]}-{asgi["queries_max"]}')
+    return line
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', SCENARIOS)
+def test_endpoint(request, settings, dataset, report, name):
+    settings.ALLOWED_HOSTS = ['testserver']
+    options = request.config.option
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {dataset["token"]}')
+    url = scenario_url(name)
+    result = measure(client, url, options.benchmark_warmup,
+                     options.benchmark_requests)
+    assert result['status'] == [200], result
+    if options.benchmark_concurrency > 0:
+        with async_read_views():
+            result['asgi'] = asyncio.run(measure_asgi(
+                    dataset['token'], url, options.benchmark_requests,
+                    options.benchmark_concurrency))
+        assert result['asgi']['status'] == [200], result['asgi']
+    report[name] = result
+    request.config.benchmark_lines = [
+            *getattr(request.config, 'benchmark_lines', []),
+            summary(name, result)]
@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
+        from .db import check_connections, install_query_recorder
+
+        request_started.connect(check_connections)
+        connection_created.connect(install_query_recorder)
@@ -0,0 +1,150 @@
+import copy
+import hashlib
+import time
+from collections import Counter, OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .cache import is_shared_cache
+
+TOKEN_KEY = 'auth_token:{}'
+STATS_KEY = 'auth_token_stats:{}'
+STATS = ('local_hits', 'cache_hits', 'misses', 'invalidations')
+
+
+class TokenCache:
+    """Токены с пользователями: LRU процесса поверх общего кэша.
+
+    Запись в LRU живет AUTH_TOKEN_LOCAL_TTL секунд, в общем кэше -
+    AUTH_TOKEN_CACHE_TIMEOUT. invalidate() удаляет запись из общего
+    кэша и из LRU своего процесса, остальные процессы перестанут
+    узнавать токен не позже чем через AUTH_TOKEN_LOCAL_TTL.
+    Кэш процесса (LocMem) invalidate() других процессов не очистит,
+    поэтому с ним второй уровень не используется.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self._stats = Counter()
+        self._flushed_at = time.monotonic()
+
+    @staticmethod
+    def _digest(key):
+        # В ключах общего кэша не должно быть самих токенов.
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        digest = self._digest(key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(digest)
+                flush = self._count('local_hits', now)
+                token = clone(entry[0])
+            else:
+                self._entries.pop(digest, None)
+                token = None
+        if token is None:
+            if is_shared_cache():
+                token = cache.get(TOKEN_KEY.format(digest))
+            with self._lock:
+                flush = self._count(
+                        'misses' if token is None else 'cache_hits', now)
+                if token is not None:
+                    self._remember(digest, token, now)
+        self._flush(flush)
+        return token
+
+    def set(self, token):
+        digest = self._digest(token.key)
+        if is_shared_cache():
+            cache.set(TOKEN_KEY.format(digest), token,
+                      settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        with self._lock:
+            self._remember(digest, token, time.monotonic())
+
+    def invalidate(self, key):
+        digest = self._digest(key)
+        if is_shared_cache():
+            cache.delete(TOKEN_KEY.format(digest))
+        with self._lock:
+            self._entries.pop(digest, None)
+            flush = self._count('invalidations', time.monotonic())
+        self._flush(flush)
+
+    def invalidate_user(self, user_id):
+        for key in Token.objects.filter(user_id=user_id).values_list(
+                'key', flat=True):
+            self.invalidate(key)
+
+    def stats(self):
+        """Счетчики всех процессов, которые уже сброшены в общий кэш,
+        плюс еще не сброшенные счетчики этого процесса."""
+        with self._lock:
+            local = dict(self._stats)
+            size = len(self._entries)
+        shared = cache.get_many([STATS_KEY.format(name) for name in STATS])
+        result = {
+                name: shared.get(STATS_KEY.format(name), 0)
+                + local.get(name, 0)
+                for name in STATS
+        }
+        lookups = sum(result[name] for name in STATS[:3])
+        result['hit_ratio'] = round(
+                (lookups - result['misses']) / lookups, 4) if lookups else None
+        result['local_size'] = size
+        return result
+
+    def _remember(self, digest, token, now):
+        # Запросы меняют request.user, поэтому в LRU хранится копия.
+        self._entries[digest] = (clone(token),
+                                 now + settings.AUTH_TOKEN_LOCAL_TTL)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > settings.AUTH_TOKEN_LOCAL_SIZE:
+            self._entries.popitem(last=False)
+
+    def _count(self, name, now):
+        """Считает в памяти процесса, раз в AUTH_TOKEN_STATS_INTERVAL
+        секунд отдает накопленное для переноса в общий кэш."""
+        self._stats[name] += 1
+        if now - self._flushed_at < settings.AUTH_TOKEN_STATS_INTERVAL:
+            return None
+        self._flushed_at = now
+        try:
+            return self._stats
+        finally:
+            self._stats = Counter()
+
+    @staticmethod
+    def _flush(stats):
+        for name, value in (stats or {}).items():
+            key = STATS_KEY.format(name)
+            cache.add(key, 0, None)
+            cache.incr(key, value)
+
+
+def clone(token):
+    token = copy.copy(token)
+    token.user = copy.copy(token.user)
+    return token
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к Token и User на каждый вызов."""
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is not None and token.user.is_active:
+            return token.user, token
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(token)
+        return user, token
@@ -0,0 +1,93 @@
+import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+VERSION_KEY = 'version:{}'
+
+INGREDIENTS_VERSION = 'ingredients'
+RECIPE_LIST_VERSION = 'recipe_list'
+# Общая часть карточек рецептов: ингредиенты и теги.
+RECIPE_DETAILS_VERSION = 'recipe_details'
+# Профиль автора в карточках его рецептов, по id автора.
+AUTHOR_VERSION = 'author:{}'
+# Меняется только при сохранении и удалении самих рецептов.
+RECIPES_VERSION = 'recipes'
+TAGS_VERSION = 'tags'
+
+
+def is_shared_cache(alias='default'):
+    """Общий ли кэш у всех воркеров.
+
+    LocMemCache и DummyCache у каждого процесса свои: то, что один
+    воркер удалил из такого кэша, остается в кэше остальных.
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+def get_version(name):
+    """Текущая версия набора данных name.
+
+    Версия хранится в общем кэше, поэтому ее смена видна всем воркерам,
+    если CACHES настроен на общий бэкенд. Значение версии - время
+    изменения в наносекундах.
+    """
+    key = VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        return cache.get(key)
+    return version
+
+
+def local_version(name):
+    """Версия для данных, которые процесс держит в своей памяти.
+
+    С общим кэшем это get_version(name). Кэш в памяти процесса не видит
+    bump_version() из других воркеров и manage.py, поэтому к версии
+    добавляется номер интервала LOCAL_DATA_TTL: такие данные обновляются
+    не реже раза в LOCAL_DATA_TTL секунд.
+    """
+    version = get_version(name)
+    if is_shared_cache():
+        return version
+    return f'{version}-{int(time.time() // settings.LOCAL_DATA_TTL)}'
+
+
+def bump_version(name):
+    cache.set(VERSION_KEY.format(name), time.time_ns(), None)
+
+
+def single_flight(key, build, timeout):
+    """Значение из кэша, при промахе его строит только один воркер.
+
+    Строящий держит блокировку lock:key, остальные ждут, пока значение
+    появится в кэше. Если строящий упал, блокировку забирает следующий;
+    дольше SINGLE_FLIGHT_WAIT секунд никто не ждет и строит сам.
+    """
+    lock_key = f'lock:{key}'
+    token = uuid4().hex
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT
+    delay = 0.005
+    while True:
+        value = cache.get(key)
+        if value is not None:
+            return value
+        locked = cache.add(lock_key, token,
+                           settings.SINGLE_FLIGHT_LOCK_TIMEOUT)
+        if locked or time.monotonic() >= deadline:
+            break
+        time.sleep(delay)
+        delay = min(delay * 2, 0.1)
+    try:
+        value = build()
+        cache.set(key, value, timeout)
+    finally:
+        # Если build() шел дольше SINGLE_FLIGHT_LOCK_TIMEOUT, блокировка
+        # уже может принадлежать другому воркеру: ее не трогаем.
+        if locked and cache.get(lock_key) == token:
+            cache.delete(lock_key)
+    return value
@@ -0,0 +1,50 @@
+import os
+
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+from .cache import is_shared_cache
+
+
+@register()
+def shopping_list_font(app_configs, **kwargs):
+    """Без шрифта с кириллицей PDF со списком покупок не строится."""
+    if os.path.isfile(settings.SHOPPING_LIST_FONT):
+        return []
+    error = Error(
+            f'Файл шрифта {settings.SHOPPING_LIST_FONT} не найден.',
+            hint='Укажите в SHOPPING_LIST_FONT путь к TTF с кириллицей, '
+                 'например DejaVuSans.ttf.',
+            id='core.E001')
+    return [error]
+
+
+@register()
+def throttle_shared_cache(app_configs, **kwargs):
+    """С общим кэшем лимиты без THROTTLE_SHARED_CACHE считаются в каждом
+    воркере отдельно, и N воркеров пропускают N лимитов."""
+    if settings.THROTTLE_SHARED_CACHE or not is_shared_cache():
+        return []
+    error = Error(
+            'Кэш общий для воркеров, но THROTTLE_SHARED_CACHE выключен.',
+            hint='Включите THROTTLE_SHARED_CACHE или добавьте core.E002 '
+                 'в SILENCED_SYSTEM_CHECKS, если лимит на воркер '
+                 'задуман.',
+            id='core.E002')
+    return [error]
+
+
+@register()
+def task_queue(app_configs, **kwargs):
+    """Без очереди тяжелые задачи выполняются в воркере gunicorn."""
+    if settings.TASK_QUEUE_ENABLED:
+        return []
+    warning = Warning(
+            'TASK_QUEUE_ENABLED выключен: выгрузки списка покупок и '
+            'уменьшенные копии картинок строятся в процессе запроса.',
+            hint='Включите TASK_QUEUE_ENABLED и запустите manage.py '
+                 'run_worker или добавьте core.W001 в '
+                 'SILENCED_SYSTEM_CHECKS, если выполнение в запросе '
+                 'задумано.',
+            id='core.W001')
+    return [warning]
@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+from .middleware import AsyncCapableMiddleware
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript',
+                      'application/xml', 'image/svg+xml')
+
+
+def accepted_encodings(header):
+    """'gzip, br;q=0.8' -> {'gzip': 1.0, 'br': 0.8}."""
+    encodings = {}
+    for part in header.split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        key, _, value = params.partition('=')
+        if key.strip().lower() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        encodings[name] = quality
+    return encodings
+
+
+def choose_encoding(header):
+    """Кодировка с наибольшим q у клиента, при равных - br."""
+    accepted = accepted_encodings(header)
+    available = ('br', 'gzip') if brotli is not None else ('gzip',)
+    chosen = None
+    best = 0.0
+    for encoding in available:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best:
+            chosen, best = encoding, quality
+    return chosen
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, mode=brotli.MODE_TEXT,
+                               quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return compress_string(content)
+
+
+class CompressionMiddleware(AsyncCapableMiddleware):
+    """Сжимает ответы API в Brotli или gzip по Accept-Encoding.
+
+    Сжимаются текстовые ответы от COMPRESSION_MIN_SIZE байт. Brotli
+    используется, если установлен пакет brotli. Потоковые ответы
+    (выгрузки списка покупок, файлы) отдаются как есть.
+    """
+
+    def sync_call(self, request):
+        return self.compress_response(request, self.get_response(request))
+
+    async def async_call(self, request):
+        return self.compress_response(request,
+                                      await self.get_response(request))
+
+    @staticmethod
+    def compress_response(request, response):
+        if (response.streaming
+                or response.has_header('Content-Encoding')
+                or len(response.content) < settings.COMPRESSION_MIN_SIZE
+                or not response.get('Content-Type', '').startswith(
+                        COMPRESSIBLE_TYPES)):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+                request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # Как в GZipMiddleware: у сжатого ответа ETag становится слабым.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+        return response
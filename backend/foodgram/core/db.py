@@ -0,0 +1,108 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.db import connection, connections, migrations
+
+# Счетчики запросов к БД в текущем контексте, см. capture_queries.
+_query_recorders = ContextVar('query_recorders', default=())
+
+
+def bulk_create_with_pk(model, objects):
+    """bulk_create, после которого у всех объектов заполнен pk.
+
+    Если база не возвращает id из INSERT (SQLite на Django 3.2), id
+    читаются после вставки: в транзакции SQLite держит блокировку
+    записи, поэтому последние len(objects) строк - наши. Вне транзакции
+    объекты сохраняются по одному.
+    """
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objects)
+    if connection.vendor == 'sqlite' and connection.in_atomic_block:
+        objects = model.objects.bulk_create(objects)
+        ids = model.objects.order_by('-pk').values_list('pk', flat=True)
+        for obj, pk in zip(objects, list(ids[:len(objects)])[::-1]):
+            obj.pk = pk
+        return objects
+    for obj in objects:
+        obj.save(force_insert=True)
+    return objects
+
+
+def check_connections(**kwargs):
+    """Закрывает сохраненные соединения, которые перестали отвечать.
+
+    Вызывается в начале запроса для баз с CONN_HEALTH_CHECKS, чтобы
+    после перезапуска сервера БД первый запрос не падал на мертвом
+    соединении. Стоит одного SELECT 1 на открытое соединение.
+    """
+    for conn in connections.all():
+        if (conn.connection is not None
+                and conn.settings_dict.get('CONN_HEALTH_CHECKS')
+                and not conn.in_atomic_block
+                and not conn.is_usable()):
+            conn.close()
+
+
+def record_queries(execute, sql, params, many, context):
+    for recorder in _query_recorders.get():
+        execute = partial(recorder, execute)
+    return execute(sql, params, many, context)
+
+
+def install_query_recorder(connection, **kwargs):
+    """Ставит record_queries на соединение, в том числе на каждое
+    новое по сигналу connection_created."""
+    if record_queries not in connection.execute_wrappers:
+        # В начало списка: connection.execute_wrapper() снимает
+        # последнюю обертку.
+        connection.execute_wrappers.insert(0, record_queries)
+
+
+@contextmanager
+def capture_queries(recorder):
+    """Передает recorder(execute, sql, params, many, context) запросы
+    к БД текущего контекста из всех потоков.
+
+    CaptureQueriesContext и connection.execute_wrapper видят только
+    соединение своего потока, а ContextVar со счетчиками переходит и в
+    потоки run_in_pool и sync_to_async.
+    """
+    for conn in connections.all():
+        install_query_recorder(conn)
+    token = _query_recorders.set((*_query_recorders.get(), recorder))
+    try:
+        yield recorder
+    finally:
+        _query_recorders.reset(token)
+
+
+class VendorRunSQL(migrations.RunSQL):
+    """RunSQL, который выполняется только на базе с указанным vendor."""
+    vendor = None
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_forwards(app_label, schema_editor, from_state,
+                                      to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor == self.vendor:
+            super().database_backwards(app_label, schema_editor,
+                                       from_state, to_state)
+
+
+class PostgreSQLRunSQL(VendorRunSQL):
+    """RunSQL, который выполняется только на PostgreSQL.
+
+    Для индексов с классами операторов и по выражениям, которые нельзя
+    описать в Meta.indexes на Django 3.2 и которых нет в SQLite.
+    """
+    vendor = 'postgresql'
+
+
+class SQLiteRunSQL(VendorRunSQL):
+    """RunSQL, который выполняется только на SQLite."""
+    vendor = 'sqlite'
@@ -0,0 +1,195 @@
+import binascii
+import hashlib
+import logging
+import os
+from base64 import b64decode
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from food_recipies.models import Recipies
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .cache import RECIPE_LIST_VERSION, bump_version
+from .tasks import task
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = 'food_pictures'
+RENDITIONS_DIR = 'food_pictures/renditions'
+# Имя: (ширина, высота). Картинка обрезается по центру до пропорций.
+RENDITIONS = {
+        'thumbnail': (160, 160),
+        'card': (480, 360),
+}
+FORMATS = {
+        'webp': ('WEBP', {'quality': 80, 'method': 4}),
+        'jpeg': ('JPEG', {'quality': 85, 'optimize': True,
+                          'progressive': True}),
+}
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+_executors = {}
+_executors_lock = Lock()
+_in_progress = set()
+_in_progress_lock = Lock()
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def get_executor(name='images'):
+    """Пул потоков name: images - уменьшенные копии без очереди задач,
+    uploads - проверка загруженных картинок.
+
+    Pillow отпускает GIL при декодировании и ресайзе, а размер пула
+    ограничивает число одновременно обрабатываемых картинок в процессе.
+    У загрузок свой пул, чтобы они не ждали за фоновыми копиями.
+    """
+    with _executors_lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_WORKERS,
+                    thread_name_prefix=name)
+        return _executors[name]
+
+
+def decode_upload(payload):
+    """base64 (в том числе data URI) -> (байты, расширение, sha256)."""
+    if ';base64,' in payload:
+        payload = payload.split(';base64,', 1)[1]
+    if len(payload) * 3 // 4 > settings.IMAGE_MAX_UPLOAD_SIZE:
+        raise InvalidImage('Файл слишком большой.')
+    try:
+        content = b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        raise InvalidImage('Некорректная строка base64.')
+    try:
+        with Image.open(BytesIO(content)) as image:
+            image_format = image.format
+            image.verify()
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        raise InvalidImage('Загрузите корректное изображение.')
+    if image_format not in EXTENSIONS:
+        raise InvalidImage(f'Формат {image_format} не поддерживается.')
+    return content, EXTENSIONS[image_format], hashlib.sha256(
+            content).hexdigest()
+
+
+def prepare_upload(payload):
+    """Проверяет картинку и дает ей имя по хэшу, ничего не сохраняя.
+
+    Файл записывается в хранилище только в save_upload, после того как
+    прошли проверки остальных полей.
+    """
+    content, extension, digest = decode_upload(payload)
+    return ContentFile(content,
+                       name=f'{UPLOAD_DIR}/{digest[:2]}/{digest}.{extension}')
+
+
+def submit_upload(payload):
+    """Запускает prepare_upload в пуле uploads, возвращает Future.
+
+    Пока картинка декодируется и проверяется, запрос проверяет остальные
+    поля (запросы к базе), результат забирается в validate().
+    """
+    return get_executor('uploads').submit(prepare_upload, payload)
+
+
+def save_upload(upload):
+    """Сохраняет картинку из prepare_upload, возвращает имя в хранилище.
+
+    Одинаковые файлы получают одно имя и сохраняются один раз.
+    """
+    if not default_storage.exists(upload.name):
+        save_once(upload.name, upload.read())
+    return upload.name
+
+
+def save_once(name, content):
+    """Сохраняет файл под точным именем name.
+
+    Если параллельный запрос успел записать тот же файл, хранилище
+    выдаст другое имя - такая копия не нужна и удаляется.
+    """
+    saved = default_storage.save(name, ContentFile(content))
+    if saved != name:
+        default_storage.delete(saved)
+
+
+def rendition_name(name, rendition, file_format):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f'{RENDITIONS_DIR}/{stem}_{rendition}.{file_format}'
+
+
+def fallback_urls(name):
+    """Исходная картинка вместо всех копий, пока они не готовы."""
+    extension = os.path.splitext(name)[1].lstrip('.')
+    url = default_storage.url(name)
+    return {rendition: {extension: url} for rendition in RENDITIONS}
+
+
+def rendition_urls(name):
+    return {
+            rendition: {
+                    file_format: default_storage.url(
+                            rendition_name(name, rendition, file_format))
+                    for file_format in FORMATS
+            }
+            for rendition in RENDITIONS
+    }
+
+
+@task()
+def build_renditions(name):
+    """Создает недостающие уменьшенные копии картинки name и отмечает
+    рецепты с ней как готовые."""
+    missing = [
+            (rendition, file_format)
+            for rendition in RENDITIONS for file_format in FORMATS
+            if not default_storage.exists(
+                    rendition_name(name, rendition, file_format))
+    ]
+    if missing:
+        save_renditions(name, missing)
+    # update() не шлет сигналов, списки со старыми ссылками сбрасываются
+    # здесь, карточки рецептов - по renditions_ready в ключе.
+    if Recipies.objects.filter(picture=name, renditions_ready=False).update(
+            renditions_ready=True):
+        bump_version(RECIPE_LIST_VERSION)
+
+
+def save_renditions(name, missing):
+    with default_storage.open(name) as file:
+        image = Image.open(file)
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    for rendition, file_format in missing:
+        resized = ImageOps.fit(image, RENDITIONS[rendition],
+                               Image.LANCZOS)
+        buffer = BytesIO()
+        pil_format, options = FORMATS[file_format]
+        resized.save(buffer, pil_format, **options)
+        save_once(rendition_name(name, rendition, file_format),
+                  buffer.getvalue())
+
+
+def schedule_renditions(name):
+    """Ставит создание уменьшенных копий в фоновый пул."""
+    with _in_progress_lock:
+        if name in _in_progress:
+            return
+        _in_progress.add(name)
+
+    def run():
+        try:
+            build_renditions(name)
+        except Exception:
+            logger.exception('Не удалось создать копии %s', name)
+        finally:
+            with _in_progress_lock:
+                _in_progress.discard(name)
+    get_executor().submit(run)
@@ -0,0 +1,21 @@
+import argparse
+
+from core.tasks import enqueue, run_command
+from django.core.management import get_commands
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Ставит management-команду в очередь фоновых задач, например '
+            'enqueue_command import_csv --path data/ingredients.csv.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('command_name')
+        parser.add_argument('arguments', nargs=argparse.REMAINDER)
+
+    def handle(self, *args, **options):
+        name = options['command_name']
+        if name not in get_commands():
+            raise CommandError(f'Неизвестная команда {name}.')
+        queued = enqueue(run_command, [name, *options['arguments']])
+        self.stdout.write(f'Задача {queued.pk} поставлена в очередь.')
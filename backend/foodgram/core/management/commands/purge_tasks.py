@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from core.models import Task
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Удаляет завершенные задачи и файлы их выгрузок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+                '--hours', type=int, default=settings.TASK_RESULT_TTL,
+                help='Сколько часов хранить завершенные задачи.')
+
+    def handle(self, *args, **options):
+        finished = Task.objects.filter(
+                status__in=(Task.DONE, Task.FAILED),
+                finished__lt=timezone.now() - timedelta(
+                        hours=options['hours']))
+        files = 0
+        for result in finished.filter(result__isnull=False).values_list(
+                'result', flat=True).iterator():
+            if isinstance(result, dict) and result.get('file'):
+                default_storage.delete(result['file'])
+                files += 1
+        deleted, _ = finished.delete()
+        self.stdout.write(f'Удалено задач: {deleted}, файлов: {files}.')
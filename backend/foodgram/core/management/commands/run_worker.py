@@ -0,0 +1,77 @@
+import logging
+import os
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from core.tasks import claim, execute, release_stale
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+RELEASE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = ('Выполняет фоновые задачи из очереди в БД. Можно запускать '
+            'несколько воркеров, каждая задача достанется одному.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+                '--concurrency', type=int, default=settings.TASK_WORKERS,
+                help='Сколько задач выполнять одновременно.')
+        parser.add_argument(
+                '--poll', type=float, default=settings.TASK_POLL_INTERVAL,
+                help='Пауза в секундах, когда очередь пуста.')
+        parser.add_argument(
+                '--once', action='store_true',
+                help='Выйти, когда очередь опустеет.')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        if concurrency < 1:
+            raise CommandError('--concurrency должен быть больше нуля.')
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        self.stdout.write(f'Воркер {worker}, потоков: {concurrency}.')
+        running = set()
+        processed = 0
+        released_at = 0
+        with ThreadPoolExecutor(max_workers=concurrency,
+                                thread_name_prefix='tasks') as executor:
+            while not self.stopping:
+                close_old_connections()
+                if time.monotonic() - released_at > RELEASE_INTERVAL:
+                    released_at = time.monotonic()
+                    release_stale()
+                claimed = []
+                if len(running) < concurrency:
+                    claimed = claim(worker, concurrency - len(running))
+                running.update(executor.submit(execute, pk)
+                               for pk in claimed)
+                processed += len(claimed)
+                if not claimed and not running and options['once']:
+                    break
+                if running and (not claimed or len(running) == concurrency):
+                    done, running = wait(running, timeout=options['poll'],
+                                         return_when=FIRST_COMPLETED)
+                    self.log_errors(done)
+                elif not claimed:
+                    time.sleep(options['poll'])
+            # Начатые задачи дорабатывают, новые не берутся.
+            self.log_errors(wait(running).done)
+        self.stdout.write(f'Выполнено задач: {processed}.')
+
+    def stop(self, signum, frame):
+        self.stopping = True
+
+    @staticmethod
+    def log_errors(futures):
+        for future in futures:
+            if future.exception() is not None:
+                logger.error('Ошибка воркера', exc_info=future.exception())
@@ -0,0 +1,83 @@
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from food_recipies.models import Favorites, ShoppingCart
+from users.models import Followers
+
+from .cache import is_shared_cache
+
+# Модель: (поле пользователя, поле с id, который попадает в набор).
+SOURCES = {
+        Favorites: ('user', 'recipie_id'),
+        ShoppingCart: ('user', 'recipie_id'),
+        Followers: ('follower', 'followed_id'),
+}
+
+
+class UserMembership:
+    """Наборы id избранного, корзины и подписок пользователя.
+
+    Набор загружается одним запросом при первом обращении за запрос,
+    поэтому сериализаторы отвечают на флаги без запроса на объект.
+    Если кэш общий для воркеров, набор хранится в нем
+    MEMBERSHIP_CACHE_TIMEOUT секунд, иначе живет только в запросе:
+    локальный кэш других воркеров не узнал бы об изменениях.
+    Эндпоинты, которые меняют избранное, корзину и подписки, вызывают
+    add() и discard() в своей транзакции. Набор в кэше после коммита
+    удаляется, а не перезаписывается, чтобы параллельные запросы
+    не затирали изменения друг друга.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._sets = {}
+
+    def ids(self, model):
+        if model not in self._sets:
+            self._sets[model] = self._load(model)
+        return self._sets[model]
+
+    def contains(self, model, pk):
+        return self.user.is_authenticated and pk in self.ids(model)
+
+    def add(self, model, pk):
+        if model in self._sets:
+            self._sets[model].add(pk)
+        self._invalidate(model)
+
+    def discard(self, model, pk):
+        if model in self._sets:
+            self._sets[model].discard(pk)
+        self._invalidate(model)
+
+    def _key(self, model):
+        return f'membership:{model._meta.label_lower}:{self.user.pk}'
+
+    def _load(self, model):
+        if not self.user.is_authenticated:
+            return set()
+        shared = is_shared_cache()
+        ids = cache.get(self._key(model)) if shared else None
+        if ids is None:
+            user_field, value_field = SOURCES[model]
+            ids = set(model.objects.filter(**{user_field: self.user})
+                      .values_list(value_field, flat=True))
+            if shared:
+                cache.set(self._key(model), ids,
+                          settings.MEMBERSHIP_CACHE_TIMEOUT)
+        return ids
+
+    def _invalidate(self, model):
+        if is_shared_cache():
+            transaction.on_commit(partial(cache.delete, self._key(model)))
+
+
+def get_membership(request):
+    """UserMembership, общий для всех сериализаторов одного запроса."""
+    membership = getattr(request, '_membership', None)
+    if membership is None:
+        membership = UserMembership(request.user)
+        request._membership = membership
+    return membership
@@ -0,0 +1,41 @@
+import asyncio
+
+
+class AsyncCapableMiddleware:
+    """Основа middleware, которые работают и под WSGI, и под ASGI.
+
+    Под ASGI Django переводит синхронный middleware в поток через
+    sync_to_async, и вся цепочка ниже него, включая асинхронные
+    представления ASYNC_READ_VIEWS, тоже становится синхронной.
+    Наследник реализует sync_call для синхронной цепочки и корутину
+    async_call для асинхронной, экземпляр вызывает нужный.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Как MiddlewareMixin в Django 3.2: по этой отметке
+            # обработчик ждет от экземпляра корутину.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.async_call(request)
+        return self.sync_call(request)
+
+    def sync_call(self, request):
+        raise NotImplementedError
+
+    async def async_call(self, request):
+        raise NotImplementedError
+
+
+def as_coroutine(method):
+    """Хук process_view и подобные для асинхронной цепочки: синхронный
+    хук Django вызвал бы через sync_to_async в общем потоке."""
+    async def wrapper(*args, **kwargs):
+        return method(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,65 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+from threading import Lock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .db import check_connections
+
+_executors = {}
+_executors_lock = Lock()
+
+
+def get_executor():
+    """Пул потоков для синхронной работы асинхронных представлений.
+
+    У каждого потока свое соединение с БД, поэтому размер пула
+    ограничивает и число соединений процесса.
+    """
+    with _executors_lock:
+        if 'views' not in _executors:
+            _executors['views'] = ThreadPoolExecutor(
+                    max_workers=settings.ASYNC_READ_WORKERS,
+                    thread_name_prefix='views')
+        return _executors['views']
+
+
+def render_view(view, request, *args, **kwargs):
+    close_old_connections()
+    check_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+async def run_in_pool(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    # run_in_executor не переносит contextvars, например выбор реплики.
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+            get_executor(), partial(context.run, func, *args, **kwargs))
+
+
+def async_read_view(view):
+    """Асинхронная обертка над синхронным представлением DRF.
+
+    Безопасные запросы выполняются в ограниченном пуле потоков и не
+    блокируют цикл событий ASGI-сервера, пока ждут БД. Изменяющие
+    запросы идут обычным путем Django для синхронных представлений.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await run_in_pool(render_view, view, request,
+                                     *args, **kwargs)
+        return await sync_to_async(view)(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,209 @@
+import hashlib
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import (EmptyResultSet, FieldDoesNotExist,
+                                    ValidationError)
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework import exceptions
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .cache import RECIPE_LIST_VERSION, get_version
+
+
+def cached_count(queryset, version_name):
+    """COUNT(*) из кэша, пока не изменилась версия version_name."""
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    digest = hashlib.md5(repr((sql, params)).encode()).hexdigest()
+    key = f'count:{version_name}:{get_version(version_name)}:{digest}'
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class CachedCountPaginator(Paginator):
+    def __init__(self, *args, count_version=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_version = count_version
+
+    @cached_property
+    def count(self):
+        if self.count_version is None:
+            return super().count
+        return cached_count(self.object_list, self.count_version)
+
+
+class CustomPagination(PageNumberPagination):
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    count_version = None
+
+    @property
+    def django_paginator_class(self):
+        return partial(CachedCountPaginator, count_version=self.count_version)
+
+
+class RecipePagination(CustomPagination):
+    """Постраничная выдача рецептов.
+
+    По умолчанию работает как CustomPagination (page и limit).
+    С параметром cursor включается пагинация по ключу - значениям полей
+    текущего порядка (ordering) у последнего рецепта страницы:
+    следующая страница выбирается условием по индексу, а не OFFSET,
+    поэтому глубокие страницы стоят столько же, сколько первая.
+    Пустой cursor означает начало ленты. Порядок по вычисляемым
+    значениям, например по релевантности поиска, с cursor не работает.
+    """
+    cursor_query_param = 'cursor'
+    count_version = RECIPE_LIST_VERSION
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            self.cursor_mode = False
+            return super().paginate_queryset(queryset, request, view)
+
+        self.cursor_mode = True
+        self.request = request
+        self.ordering = self.get_ordering(queryset)
+        page_size = self.get_page_size(request)
+        self.count = cached_count(queryset, self.count_version)
+        cursor = self.decode_cursor(
+                request.query_params[self.cursor_query_param])
+        queryset = queryset.order_by(*self.ordering)
+        if cursor is not None:
+            queryset = queryset.filter(self.after(cursor))
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        self.page = results[:page_size]
+        return self.page
+
+    def get_ordering(self, queryset):
+        """Порядок выборки, если по нему можно строить ключ."""
+        ordering = tuple(queryset.query.order_by
+                         or queryset.model._meta.ordering)
+        self.fields = []
+        for name in ordering:
+            try:
+                field = queryset.model._meta.get_field(name.lstrip('-'))
+            except (FieldDoesNotExist, AttributeError):
+                field = None
+            if field is None or field.is_relation:
+                raise exceptions.ValidationError(
+                        {self.cursor_query_param: (
+                                'cursor нельзя сочетать с этим порядком '
+                                'выдачи, используйте page.')})
+            self.fields.append(field)
+        if not self.fields or not self.fields[-1].primary_key:
+            raise exceptions.ValidationError(
+                    {self.cursor_query_param: (
+                            'Порядок выдачи должен заканчиваться id.')})
+        return ordering
+
+    def after(self, values):
+        """Условие "строка идет после values" в порядке self.ordering."""
+        condition = Q()
+        equal = {}
+        for name, field, value in zip(self.ordering, self.fields, values):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{field.name}__{lookup}': value})
+            equal[field.name] = value
+        return condition
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+                'count': self.count,
+                'next': self.get_next_cursor_link(),
+                'previous': None,
+                'results': data,
+        })
+
+    def get_next_cursor_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        url = remove_query_param(self.request.build_absolute_uri(),
+                                 self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param,
+                                   self.encode_cursor(last))
+
+    def encode_cursor(self, recipie):
+        # value_to_string сохраняет микросекунды pub_date.
+        value = json.dumps([field.value_to_string(recipie)
+                            for field in self.fields])
+        return urlsafe_b64encode(value.encode()).decode()
+
+    def decode_cursor(self, value):
+        if not value:
+            return None
+        try:
+            values = json.loads(urlsafe_b64decode(value.encode()).decode())
+            if (not isinstance(values, list)
+                    or len(values) != len(self.fields)):
+                raise ValueError
+            values = [field.to_python(value)
+                      for field, value in zip(self.fields, values)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound('Неверный cursor.')
+        if None in values:
+            raise NotFound('Неверный cursor.')
+        return values
+
+
+class FeedPagination(CustomPagination):
+    """Пагинация ленты по ключу - id последнего показанного рецепта.
+
+    Страницу собирает функция fetch(before, limit), которая возвращает
+    id по убыванию. Общее количество не считается.
+    """
+    cursor_query_param = 'cursor'
+
+    def paginate_ids(self, fetch, request):
+        self.request = request
+        page_size = self.get_page_size(request)
+        before = self.decode_cursor(
+                request.query_params.get(self.cursor_query_param))
+        ids = fetch(before, page_size + 1)
+        self.next_id = ids[page_size - 1] if len(ids) > page_size else None
+        return ids[:page_size]
+
+    def get_paginated_response(self, data):
+        next_link = None
+        if self.next_id is not None:
+            next_link = replace_query_param(
+                    self.request.build_absolute_uri(),
+                    self.cursor_query_param,
+                    self.encode_cursor(self.next_id))
+        return Response({
+                'next': next_link,
+                'previous': None,
+                'results': data,
+        })
+
+    @staticmethod
+    def encode_cursor(pk):
+        return urlsafe_b64encode(str(pk).encode()).decode()
+
+    @staticmethod
+    def decode_cursor(value):
+        if not value:
+            return None
+        try:
+            return int(urlsafe_b64decode(value.encode()).decode())
+        except (TypeError, ValueError):
+            raise NotFound('Неверный cursor.')
@@ -0,0 +1,50 @@
+from threading import Lock
+
+import psycopg2.extras
+from django.db.backends.postgresql import base
+from psycopg2.pool import ThreadedConnectionPool
+
+_pools = {}
+_pools_lock = Lock()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с пулом соединений внутри процесса.
+
+    Закрытие соединения возвращает его в пул, поэтому при CONN_MAX_AGE=0
+    запрос не платит за новое подключение. Размер задают POOL_MIN_SIZE и
+    POOL_MAX_SIZE в настройках базы. При исчерпании пула psycopg2 сразу
+    выдает PoolError, поэтому потоков с доступом к БД в процессе должно
+    быть не больше POOL_MAX_SIZE.
+    """
+
+    def get_pool(self, conn_params):
+        with _pools_lock:
+            if self.alias not in _pools:
+                _pools[self.alias] = ThreadedConnectionPool(
+                        self.settings_dict.get('POOL_MIN_SIZE', 1),
+                        self.settings_dict['POOL_MAX_SIZE'],
+                        **conn_params)
+            return _pools[self.alias]
+
+    def get_new_connection(self, conn_params):
+        connection = self.get_pool(conn_params).getconn()
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(conn_or_curs=connection,
+                                               loads=lambda x: x)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                _pools[self.alias].putconn(
+                        self.connection,
+                        close=bool(self.connection.closed
+                                   or self.errors_occurred))
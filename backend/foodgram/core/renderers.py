@@ -0,0 +1,44 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Как в JSONRenderer: U+2028 и U+2029 экранируются для совместимости с JS.
+LINE_SEPARATORS = (
+        (b'\xe2\x80\xa8', b'\\u2028'),
+        (b'\xe2\x80\xa9', b'\\u2029'),
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson, если он установлен.
+
+    orjson сам сериализует dict, list, str и числа, остальное (Decimal,
+    даты, ленивые строки) отдается JSONEncoder из DRF, поэтому ответ
+    совпадает с обычным JSONRenderer. С отступами, ensure_ascii и без
+    orjson работает стандартный JSONRenderer.
+    """
+    default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii
+                or not self.compact or self.get_indent(
+                        accepted_media_type, renderer_context or {})):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        try:
+            content = orjson.dumps(
+                    data, default=self.default,
+                    option=orjson.OPT_PASSTHROUGH_DATETIME
+                    | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            # Например, целые больше 64 бит.
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in content:
+                content = content.replace(separator, escaped)
+        return content
@@ -0,0 +1,94 @@
+import hashlib
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .middleware import AsyncCapableMiddleware
+
+PIN_KEY = 'replica_pin:{}'
+
+# База для чтения в текущем запросе. Вне HTTP-запросов (команды,
+# фоновые задачи) все читается с основной базы.
+_read_db = ContextVar('read_db', default=DEFAULT_DB_ALIAS)
+
+
+class ReplicaRouter:
+    """Чтение в безопасных запросах - с реплики, остальное - с основной.
+
+    Реплику выбирает ReplicaMiddleware один раз на запрос, поэтому все
+    чтения запроса видят одно и то же состояние данных.
+    """
+
+    def db_for_read(self, model, **hints):
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return _read_db.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def pin_key(request):
+    """Ключ закрепления клиента за основной базой или None."""
+    identity = (request.META.get('HTTP_AUTHORIZATION')
+                or request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+    if not identity:
+        return None
+    return PIN_KEY.format(hashlib.sha256(identity.encode()).hexdigest())
+
+
+def choose_read_db(safe, pinned):
+    if not safe or pinned:
+        return DEFAULT_DB_ALIAS
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+class ReplicaMiddleware(AsyncCapableMiddleware):
+    """Выбирает базу для чтения на время запроса.
+
+    Изменяющие запросы читают с основной базы. После успешной записи
+    клиент на REPLICA_PIN_SECONDS закрепляется за основной базой, чтобы
+    увидеть свои изменения, пока реплики догоняют. Клиент определяется
+    по заголовку Authorization или cookie сессии. Кэш должен быть общим
+    для всех процессов, под ASGI он опрашивается вне цикла событий.
+    """
+
+    def sync_call(self, request):
+        key = pin_key(request)
+        safe = request.method in SAFE_METHODS
+        pinned = safe and key is not None and cache.get(key)
+        token = _read_db.set(choose_read_db(safe, pinned))
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_db.reset(token)
+        if not safe and key and response.status_code < 400:
+            cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+    async def async_call(self, request):
+        key = pin_key(request)
+        safe = request.method in SAFE_METHODS
+        pinned = safe and key is not None and await sync_to_async(
+                cache.get, thread_sensitive=False)(key)
+        # Контекст с выбранной базой переходит в потоки run_in_pool.
+        token = _read_db.set(choose_read_db(safe, pinned))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_db.reset(token)
+        if not safe and key and response.status_code < 400:
+            await sync_to_async(cache.set, thread_sensitive=False)(
+                    key, True, settings.REPLICA_PIN_SECONDS)
+        return response
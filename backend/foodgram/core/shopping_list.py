@@ -0,0 +1,232 @@
+import csv
+import logging
+from abc import ABC, abstractmethod
+from io import BytesIO
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Sum
+from django.http import StreamingHttpResponse
+from food_recipies.models import IngredientAndItsQuantity
+from rest_framework import renderers
+
+from .tasks import task
+from .units import base_amount, base_unit, display_amount
+
+TITLE = 'Список покупок'
+FILENAME = 'shopping_list'
+EXPORT_DIR = 'exports'
+
+logger = logging.getLogger(__name__)
+
+
+def shopping_list_rows(user):
+    """Суммы ингредиентов из корзины пользователя.
+
+    Количества переводятся в базовые единицы (кг -> г, ст. л. -> ч. л.)
+    и суммируются одним запросом в базе, так что 1 кг и 300 г одного
+    продукта дают одну строку. Затем сумма выводится в крупной единице.
+    """
+    rows = (IngredientAndItsQuantity.objects
+            .filter(recipies__shopping_list_recipes__user=user)
+            .annotate(unit=base_unit('ingredient__measurement_unit'))
+            .values('ingredient__name', 'unit')
+            .annotate(amount=Sum(base_amount(
+                    'ingredient__measurement_unit', 'quantity')))
+            .order_by('ingredient__name', 'unit'))
+    for row in rows.iterator():
+        amount, unit = display_amount(row['amount'], row['unit'])
+        yield {
+                'ingredient__name': row['ingredient__name'],
+                'ingredient__measurement_unit': unit,
+                'amount': amount,
+        }
+
+
+def format_row(row):
+    return (f'{row["ingredient__name"]} '
+            f'({row["ingredient__measurement_unit"]}) — {row["amount"]}')
+
+
+def error_lines(data):
+    if isinstance(data, dict):
+        return [f'{key}: {value}' for key, value in data.items()]
+    return [str(data)]
+
+
+class ShoppingListRenderer(ABC, renderers.BaseRenderer):
+    """Базовый класс форматов выгрузки списка покупок.
+
+    stream() отдает файл по частям и используется для StreamingHttpResponse,
+    render() нужен DRF для ответов с ошибками в выбранном формате.
+    """
+    charset = 'utf-8'
+
+    def prepare(self):
+        """Проверки до начала ответа: после первой части статус уже 200."""
+
+    @abstractmethod
+    def stream(self, rows):
+        """Части файла со строками rows."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b''.join(self.write_lines(error_lines(data)))
+
+    @abstractmethod
+    def write_lines(self, lines):
+        """Части файла, в которых каждая строка lines - отдельная строка."""
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, rows):
+        yield f'{TITLE}\n\n'.encode(self.charset)
+        yield from self.write_lines(format_row(row) for row in rows)
+
+    def write_lines(self, lines):
+        for line in lines:
+            yield f'{line}\n'.encode(self.charset)
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    header = ('name', 'measurement_unit', 'amount')
+
+    def stream(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.header).encode(self.charset)
+        for row in rows:
+            yield writer.writerow((
+                    row['ingredient__name'],
+                    row['ingredient__measurement_unit'],
+                    row['amount'],
+            )).encode(self.charset)
+
+    def write_lines(self, lines):
+        writer = csv.writer(Echo())
+        for line in lines:
+            yield writer.writerow((line,)).encode(self.charset)
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    """PDF через reportlab.
+
+    reportlab собирает документ целиком, но строк в выгрузке не больше,
+    чем ингредиентов в справочнике, поэтому размер документа не зависит
+    от количества рецептов в корзине.
+    """
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    font_name = 'ShoppingListFont'
+    font_size = 12
+    margin = 50
+
+    def prepare(self):
+        self.get_font()
+
+    def stream(self, rows):
+        lines = (format_row(row) for row in rows)
+        yield from self.write_lines(lines, title=TITLE)
+
+    def write_lines(self, lines, title=None):
+        from reportlab.lib.pagesizes import A4
+        from reportlab.pdfgen import canvas
+
+        buffer = BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A4, pageCompression=1)
+        font = self.get_font()
+        width, height = A4
+        step = self.font_size * 1.5
+        y = height - self.margin
+        if title:
+            pdf.setFont(font, self.font_size + 4)
+            pdf.drawString(self.margin, y, title)
+            y -= step * 2
+        pdf.setFont(font, self.font_size)
+        for line in lines:
+            if y < self.margin:
+                pdf.showPage()
+                pdf.setFont(font, self.font_size)
+                y = height - self.margin
+            pdf.drawString(self.margin, y, line)
+            y -= step
+        pdf.save()
+        yield buffer.getvalue()
+
+    def get_font(self):
+        """Шрифт с кириллицей из SHOPPING_LIST_FONT.
+
+        Встроенные шрифты PDF кириллицу не содержат, поэтому без файла
+        шрифта выгрузка не строится вовсе, а не выходит нечитаемой.
+        """
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFError, TTFont
+
+        if self.font_name in pdfmetrics.getRegisteredFontNames():
+            return self.font_name
+        try:
+            pdfmetrics.registerFont(
+                    TTFont(self.font_name, settings.SHOPPING_LIST_FONT))
+        except (OSError, TTFError) as error:
+            logger.error('Не удалось загрузить шрифт %s: %s',
+                         settings.SHOPPING_LIST_FONT, error)
+            raise ImproperlyConfigured(
+                    f'SHOPPING_LIST_FONT: {error}') from error
+        return self.font_name
+
+
+SHOPPING_LIST_RENDERERS = (
+        TextShoppingListRenderer,
+        CSVShoppingListRenderer,
+        PDFShoppingListRenderer,
+)
+
+
+def content_type(renderer):
+    if renderer.charset:
+        return f'{renderer.media_type}; charset={renderer.charset}'
+    return renderer.media_type
+
+
+def shopping_list_response(user, renderer):
+    """Потоковый ответ со списком покупок в формате выбранного рендерера."""
+    renderer.prepare()
+    response = StreamingHttpResponse(
+            renderer.stream(shopping_list_rows(user)),
+            content_type=content_type(renderer),
+    )
+    response['Content-Disposition'] = (
+            f'attachment; filename="{FILENAME}.{renderer.format}"')
+    return response
+
+
+@task()
+def export_shopping_list(user_id, file_format):
+    """Сохраняет список покупок в хранилище для скачивания через API.
+
+    Выполняется воркером, чтобы долгий PDF не занимал воркер gunicorn.
+    """
+    renderer = {renderer.format: renderer
+                for renderer in SHOPPING_LIST_RENDERERS}[file_format]()
+    content = b''.join(renderer.stream(
+            shopping_list_rows(user_id)))
+    name = default_storage.save(
+            f'{EXPORT_DIR}/{uuid4().hex}.{renderer.format}',
+            ContentFile(content))
+    return {
+            'file': name,
+            'filename': f'{FILENAME}.{renderer.format}',
+            'content_type': content_type(renderer),
+    }
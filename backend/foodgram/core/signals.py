@@ -0,0 +1,25 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def user_saved(instance, update_fields=None, **kwargs):
+    """Пользователь кэшируется вместе с токеном: смена пароля, профиля
+    и деактивация сбрасывают запись."""
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    transaction.on_commit(partial(token_cache.invalidate_user, instance.pk))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    transaction.on_commit(partial(token_cache.invalidate, instance.key))
@@ -0,0 +1,156 @@
+import logging
+import traceback
+from datetime import timedelta
+from functools import partial
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def task(max_attempts=None):
+    """Помечает функцию как задачу, которую можно поставить в очередь.
+
+    Аргументы и результат задачи хранятся в БД в JSON, поэтому
+    передавать нужно id, а не объекты моделей.
+    """
+    def decorator(func):
+        func.task_name = f'{func.__module__}.{func.__qualname__}'
+        func.task_max_attempts = max_attempts
+        return func
+    return decorator
+
+
+def get_task_function(name):
+    func = import_string(name)
+    if getattr(func, 'task_name', None) != name:
+        raise ImportError(f'{name} не помечена как задача.')
+    return func
+
+
+def enqueue(func, args=(), kwargs=None, user=None):
+    """Ставит задачу в очередь и возвращает ее строку.
+
+    Строка создается в текущей транзакции, воркер увидит ее после
+    коммита. Без TASK_QUEUE_ENABLED воркера нет, и задача выполняется
+    в этом процессе сразу после коммита.
+    """
+    queued = Task.objects.create(
+            name=func.task_name, args=list(args), kwargs=kwargs or {},
+            user=user,
+            max_attempts=func.task_max_attempts or settings.TASK_MAX_ATTEMPTS)
+    if not settings.TASK_QUEUE_ENABLED:
+        transaction.on_commit(partial(run_inline, queued.pk))
+    return queued
+
+
+def defer(func, args=(), fallback=None):
+    """Выполняет func после коммита текущей транзакции.
+
+    При TASK_QUEUE_ENABLED задача уходит воркеру, иначе после коммита
+    вызывается fallback (по умолчанию сама func) в этом процессе.
+    """
+    if settings.TASK_QUEUE_ENABLED:
+        return enqueue(func, args)
+    transaction.on_commit(partial(fallback or func, *args))
+    return None
+
+
+def claim(worker, limit):
+    """Забирает до limit готовых к запуску задач, возвращает их id.
+
+    Задача переходит в running условным UPDATE, поэтому из нескольких
+    воркеров ее получает ровно один и без SELECT ... FOR UPDATE.
+    """
+    now = timezone.now()
+    candidates = (Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+                  .order_by('run_at', 'pk')
+                  .values_list('pk', flat=True)[:limit * 2])
+    claimed = []
+    for pk in candidates:
+        if len(claimed) == limit:
+            break
+        if lock(pk, worker, now):
+            claimed.append(pk)
+    return claimed
+
+
+def lock(pk, worker, now):
+    return Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+            status=Task.RUNNING, locked_at=now, worker=worker,
+            attempts=F('attempts') + 1)
+
+
+def execute(pk, retry=True):
+    """Выполняет захваченную задачу и записывает результат.
+
+    При ошибке задача возвращается в очередь с экспоненциальной
+    задержкой, пока не кончатся попытки.
+    """
+    close_old_connections()
+    try:
+        current = Task.objects.get(pk=pk)
+        # Если аренда истекла и задачу забрал другой воркер,
+        # результат этого запуска не записывается.
+        mine = Task.objects.filter(pk=pk, status=Task.RUNNING,
+                                   locked_at=current.locked_at)
+        try:
+            result = get_task_function(current.name)(
+                    *current.args, **current.kwargs)
+        except Exception:
+            logger.exception('Задача %s завершилась с ошибкой', current)
+            error = traceback.format_exc()
+            if retry and current.attempts < current.max_attempts:
+                delay = settings.TASK_RETRY_DELAY * 2 ** (
+                        current.attempts - 1)
+                mine.update(status=Task.QUEUED, locked_at=None, error=error,
+                            run_at=timezone.now() + timedelta(seconds=delay))
+            else:
+                mine.update(status=Task.FAILED, error=error,
+                            finished=timezone.now())
+        else:
+            mine.update(status=Task.DONE, result=result, error='',
+                        finished=timezone.now())
+    finally:
+        close_old_connections()
+
+
+def run_inline(pk):
+    if lock(pk, 'inline', timezone.now()):
+        execute(pk, retry=False)
+
+
+def release_stale():
+    """Возвращает в очередь задачи, которые выполняются дольше
+    TASK_LEASE секунд: их воркер, скорее всего, был остановлен.
+    """
+    now = timezone.now()
+    stale = Task.objects.filter(
+            status=Task.RUNNING,
+            locked_at__lt=now - timedelta(seconds=settings.TASK_LEASE))
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+            status=Task.FAILED, finished=now,
+            error='Воркер не завершил задачу.')
+    return failed + stale.update(status=Task.QUEUED, locked_at=None)
+
+
+@task()
+def run_command(name, *args, **options):
+    """Management-команда в воркере, например import_csv или
+    rebuild_counters. Результат - ее вывод."""
+    stdout = StringIO()
+    try:
+        call_command(name, *args, stdout=stdout, **options)
+    except SystemExit as error:
+        raise RuntimeError(
+                f'{name} завершилась с кодом {error.code}:\n'
+                f'{stdout.getvalue()}')
+    return stdout.getvalue()
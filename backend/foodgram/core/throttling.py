@@ -0,0 +1,134 @@
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+WINDOW_KEY = 'throttle:{}:{}'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """'30/min' -> (30, 60), как в SimpleRateThrottle."""
+    number, period = rate.split('/')
+    return int(number), PERIODS[period[0]]
+
+
+class BoundedDict(OrderedDict):
+    """Словарь с вытеснением самых старых ключей сверх size."""
+
+    def __init__(self, size):
+        super().__init__()
+        self.size = size
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.size:
+            self.popitem(last=False)
+
+
+class LocalBuckets:
+    """Token bucket в памяти процесса, без обращений к кэшу.
+
+    Ведро вмещает limit запросов и пополняется со скоростью
+    limit / period. Процесс видит только свою долю запросов клиента,
+    поэтому пустое ведро здесь значит, что лимит превышен и в целом.
+    """
+
+    def __init__(self):
+        self._buckets = BoundedDict(settings.THROTTLE_LOCAL_SIZE)
+        self._lock = Lock()
+
+    def take(self, key, limit, period, now):
+        """Берет токен, возвращает 0 или сколько секунд ждать."""
+        rate = limit / period
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (limit, now))
+            tokens = min(limit, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0
+            self._buckets[key] = (tokens, now)
+        return (1 - tokens) / rate
+
+
+class SharedWindows:
+    """Скользящее окно по счетчикам в общем кэше для нескольких воркеров.
+
+    На запрос приходится один атомарный incr счетчика текущего окна.
+    Счетчик прошлого окна больше не меняется, поэтому читается из кэша
+    один раз и запоминается в процессе.
+    """
+
+    def __init__(self):
+        self._previous = BoundedDict(settings.THROTTLE_LOCAL_SIZE)
+        self._lock = Lock()
+
+    def hit(self, key, limit, period, now):
+        """Учитывает запрос, возвращает 0 или сколько секунд ждать."""
+        window, offset = divmod(now, period)
+        window = int(window)
+        current = WINDOW_KEY.format(key, window)
+        try:
+            count = cache.incr(current)
+        except ValueError:
+            cache.add(current, 0, period * 2)
+            count = cache.incr(current)
+        previous = self.previous(key, window)
+        elapsed = offset / period
+        if previous * (1 - elapsed) + count <= limit:
+            return 0
+        if count < limit:
+            # Ждем, пока вклад прошлого окна не уменьшится.
+            return period * (1 - (limit - count) / previous - elapsed)
+        return period * (2 - elapsed - (limit - 1) / count)
+
+    def previous(self, key, window):
+        with self._lock:
+            value = self._previous.get((key, window))
+        if value is None:
+            value = cache.get(WINDOW_KEY.format(key, window - 1), 0)
+            with self._lock:
+                self._previous[key, window] = value
+        return value
+
+
+class ScopedBucketThrottle(BaseThrottle):
+    """Ограничение частоты для вьюх и действий с throttle_scope.
+
+    Лимиты задаются в REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] по
+    scope, отдельно для каждого пользователя (анонимов - по IP).
+    Сначала проверяется ведро процесса, и при превышении запрос
+    отклоняется без обращения к кэшу. С THROTTLE_SHARED_CACHE запрос,
+    прошедший ведро, учитывается еще и в общем окне всех воркеров.
+    """
+
+    def allow_request(self, request, view):
+        self.wait_time = None
+        scope = getattr(view, 'throttle_scope', None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+        limit, period = parse_rate(rate)
+        if request.user.is_authenticated:
+            key = f'{scope}:{request.user.pk}'
+        else:
+            key = f'{scope}:{self.get_ident(request)}'
+        wait = local_buckets.take(key, limit, period, time.monotonic())
+        if not wait and settings.THROTTLE_SHARED_CACHE:
+            wait = shared_windows.hit(key, limit, period, time.time())
+        self.wait_time = wait or None
+        return not wait
+
+    def wait(self):
+        return self.wait_time
+
+
+local_buckets = LocalBuckets()
+shared_windows = SharedWindows()
@@ -0,0 +1,50 @@
+from decimal import Decimal
+
+from django.db.models import Case, CharField, F, IntegerField, Value, When
+
+# Единица из data/ingredients.csv: (базовая единица, сколько в ней базовых).
+# Множители целые, поэтому суммы в базе считаются точно. Единицы без
+# записи (шт., по вкусу, горсть...) складываются как есть.
+CONVERSIONS = {
+        'г': ('г', 1),
+        'кг': ('г', 1000),
+        'мл': ('мл', 1),
+        'л': ('мл', 1000),
+        'стакан': ('мл', 250),
+        'ч. л.': ('ч. л.', 1),
+        'ст. л.': ('ч. л.', 3),
+}
+# Крупные единицы для вывода, от большей к меньшей.
+DISPLAY_UNITS = {
+        'г': (('кг', 1000),),
+        'мл': (('л', 1000),),
+        'ч. л.': (('ст. л.', 3),),
+}
+
+
+def base_unit(field):
+    """SQL-выражение: базовая единица для единицы из поля field."""
+    return Case(
+            *[When(**{field: unit}, then=Value(base))
+              for unit, (base, _) in CONVERSIONS.items()],
+            default=F(field), output_field=CharField())
+
+
+def base_amount(field, amount_field):
+    """SQL-выражение: количество amount_field в базовой единице."""
+    return F(amount_field) * Case(
+            *[When(**{field: unit}, then=Value(factor))
+              for unit, (_, factor) in CONVERSIONS.items() if factor != 1],
+            default=Value(1), output_field=IntegerField())
+
+
+def display_amount(amount, unit):
+    """Переводит сумму в базовой единице в самую крупную подходящую:
+    1500 г -> 1.5 кг, 6 ч. л. -> 2 ст. л."""
+    for display_unit, factor in DISPLAY_UNITS.get(unit, ()):
+        if amount >= factor:
+            value = Decimal(amount) / factor
+            if value == value.to_integral_value():
+                return int(value), display_unit
+            return value.quantize(Decimal('0.01')).normalize(), display_unit
+    return amount, unit
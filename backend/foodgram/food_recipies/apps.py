@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FoodRecipiesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'food_recipies'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,36 @@
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from users.models import Followers, User
+
+from .models import Favorites, Recipies, ShoppingCart
+
+# (модель, поле-счетчик, модель связи, поле связи на модель).
+COUNTERS = (
+        (Recipies, 'favorites_count', Favorites, 'recipie'),
+        (Recipies, 'shopping_cart_count', ShoppingCart, 'recipie'),
+        (User, 'recipes_count', Recipies, 'author'),
+        (User, 'followers_count', Followers, 'followed'),
+)
+
+# Счетчик рецепта, который меняется при добавлении в избранное/корзину.
+RECIPE_COUNTERS = {
+        Favorites: 'favorites_count',
+        ShoppingCart: 'shopping_cart_count',
+}
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно меняет счетчик одним UPDATE ... SET field = field + delta."""
+    model.objects.filter(pk=pk).update(
+            **{field: Greatest(F(field) + delta, Value(0))})
+
+
+def actual_count(related_model, related_field):
+    """Подзапрос с реальным количеством связанных строк."""
+    counts = (related_model.objects
+              .filter(**{related_field: OuterRef('pk')})
+              .order_by()
+              .values(related_field)
+              .annotate(count=Count('pk'))
+              .values('count'))
+    return Coalesce(Subquery(counts), Value(0))
@@ -0,0 +1,102 @@
+from itertools import islice
+
+from core.tasks import defer, task
+from django.conf import settings
+from users.models import Followers, User
+
+from .models import FeedEntry, Recipies
+
+
+def is_fanned_out(followers_count):
+    """Рецепты авторов с огромным числом подписчиков не раскладываются
+    по лентам, а подмешиваются при чтении."""
+    return followers_count <= settings.FEED_FANOUT_LIMIT
+
+
+def insert_entries(entries):
+    entries = iter(entries)
+    batch = list(islice(entries, settings.FEED_BATCH_SIZE))
+    while batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(entries, settings.FEED_BATCH_SIZE))
+
+
+@task()
+def fan_out_recipe(recipe_id):
+    """Добавляет опубликованный рецепт в ленты подписчиков автора."""
+    row = (Recipies.objects.filter(pk=recipe_id)
+           .values_list('author_id', 'author__followers_count').first())
+    if row is None or not is_fanned_out(row[1]):
+        return
+    author_id = row[0]
+    followers = (Followers.objects.filter(followed_id=author_id)
+                 .values_list('follower_id', flat=True).iterator())
+    insert_entries(
+            FeedEntry(user_id=user_id, recipie_id=recipe_id,
+                      author_id=author_id)
+            for user_id in followers)
+
+
+def recent_recipe_ids(author_id):
+    return list(Recipies.objects.filter(author_id=author_id)
+                .order_by('-id')
+                .values_list('id', flat=True)[:settings.FEED_BACKFILL])
+
+
+def follow_author(user_id, author_id, followers_count):
+    """Переносит в ленту последние рецепты нового автора."""
+    if not is_fanned_out(followers_count):
+        return
+    insert_entries(
+            FeedEntry(user_id=user_id, recipie_id=recipe_id,
+                      author_id=author_id)
+            for recipe_id in recent_recipe_ids(author_id))
+
+
+def unfollow_author(user_id, author_id):
+    """Убирает автора из ленты, вызывается после уменьшения счетчика.
+
+    Если подписчиков осталось ровно FEED_FANOUT_LIMIT, рецепты автора
+    больше не подмешиваются при чтении, а вышедшие до этого не были
+    разложены: их переносит в ленты backfill_author.
+    """
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    # Счетчик читается заново: строка заблокирована UPDATE этой
+    # транзакции, и границу пересекает ровно одна отписка.
+    followers_count = (User.objects.filter(pk=author_id)
+                       .values_list('followers_count', flat=True).first())
+    if followers_count == settings.FEED_FANOUT_LIMIT:
+        defer(backfill_author, [author_id])
+
+
+@task()
+def backfill_author(author_id):
+    """Переносит последние рецепты автора в ленты всех подписчиков."""
+    recipe_ids = recent_recipe_ids(author_id)
+    followers = (Followers.objects.filter(followed_id=author_id)
+                 .values_list('follower_id', flat=True).iterator())
+    insert_entries(
+            FeedEntry(user_id=user_id, recipie_id=recipe_id,
+                      author_id=author_id)
+            for user_id in followers for recipe_id in recipe_ids)
+
+
+def feed_ids(user, before, limit):
+    """id рецептов ленты по убыванию, меньшие before.
+
+    Объединяет сохраненную ленту и свежие рецепты авторов, которые
+    не раскладываются при публикации. Два запроса по индексам
+    (user, recipie) и (author, -id).
+    """
+    entries = FeedEntry.objects.filter(user=user)
+    pulled = Recipies.objects.filter(author__in=Followers.objects.filter(
+            follower=user,
+            followed__followers_count__gt=settings.FEED_FANOUT_LIMIT,
+    ).values('followed_id'))
+    if before is not None:
+        entries = entries.filter(recipie_id__lt=before)
+        pulled = pulled.filter(id__lt=before)
+    ids = set(entries.order_by('-recipie_id')
+              .values_list('recipie_id', flat=True)[:limit])
+    ids.update(pulled.order_by('-id').values_list('id', flat=True)[:limit])
+    return sorted(ids, reverse=True)[:limit]
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from food_recipies.feed import insert_entries
+from food_recipies.models import FeedEntry, Recipies
+from users.models import Followers
+
+
+class Command(BaseCommand):
+    help = 'Заполняет ленты подписок последними рецептами авторов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+                '--user', type=int,
+                help='id пользователя, по умолчанию - все.')
+        parser.add_argument(
+                '--limit', type=int, default=settings.FEED_BACKFILL,
+                help='Сколько последних рецептов автора перенести.')
+
+    def handle(self, *args, **options):
+        follows = Followers.objects.filter(
+                followed__followers_count__lte=settings.FEED_FANOUT_LIMIT)
+        if options['user']:
+            follows = follows.filter(follower_id=options['user'])
+        recent = {}
+        created = FeedEntry.objects.count()
+
+        def entries():
+            for user_id, author_id in follows.values_list(
+                    'follower_id', 'followed_id').iterator():
+                if author_id not in recent:
+                    recent[author_id] = list(
+                            Recipies.objects.filter(author_id=author_id)
+                            .order_by('-id')
+                            .values_list('id', flat=True)[:options['limit']])
+                for recipe_id in recent[author_id]:
+                    yield FeedEntry(user_id=user_id, recipie_id=recipe_id,
+                                    author_id=author_id)
+
+        insert_entries(entries())
+        self.stdout.write(
+                f'Добавлено записей: {FeedEntry.objects.count() - created}.')
@@ -0,0 +1,20 @@
+from core.images import build_renditions
+from django.core.management.base import BaseCommand
+from food_recipies.models import Recipies
+
+
+class Command(BaseCommand):
+    help = 'Создает недостающие уменьшенные копии картинок рецептов.'
+
+    def handle(self, *args, **options):
+        names = (Recipies.objects.exclude(picture='')
+                 .values_list('picture', flat=True).distinct())
+        count = 0
+        for name in names.iterator():
+            try:
+                build_renditions(name)
+            except OSError as error:
+                self.stderr.write(f'{name}: {error}')
+                continue
+            count += 1
+        self.stdout.write(f'Обработано картинок: {count}')
@@ -1,52 +1,181 @@
 import csv
+import json
 import os
+import time
 
+from core.cache import INGREDIENTS_VERSION, bump_version
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from food_recipies.models import Ingredients
 
+INSERT = 'insert'
+SKIP = 'skip'
+UPSERT = 'upsert'
 
-class Command(BaseCommand):
-    help = 'Import data from CSV files to Django.'
 
-    path = os.path.join(settings.STATICFILES_DIRS[0], 'data')
+class Command(BaseCommand):
+    help = 'Import data from CSV/JSON files to Django.'
 
+    # Имя файла: (модель, порядок полей в CSV без заголовка,
+    # поля, по которым строка считается дублем).
     assignments = {
-        'ingredients': Ingredients,
+        'ingredients': (Ingredients,
+                        ('name', 'measurement_unit'),
+                        ('name', 'measurement_unit')),
     }
+    # bulk_create не отправляет сигналы, версии кэшей сбрасываются вручную.
+    versions = (INGREDIENTS_VERSION,)
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+                '--path', default=settings.DATA_DIR,
+                help='Каталог с файлами данных.')
+        parser.add_argument(
+                '--format', choices=('csv', 'json'), default='csv',
+                help='Формат файлов данных.')
+        parser.add_argument(
+                '--batch-size', type=int, default=1000,
+                help='Количество объектов в одном INSERT.')
+        parser.add_argument(
+                '--mode', choices=(INSERT, SKIP, UPSERT), default=SKIP,
+                help='insert - вставить все строки, skip - пропустить '
+                     'существующие, upsert - обновить существующие.')
 
     def handle(self, *args, **options):
-        for name in self.assignments:
-            count = 0
-            model = self.assignments[name]
-            file_path = os.path.join(self.path, f'{name}.csv')
-
-            with open(file_path, 'r') as file:
-                reader = csv.reader(file)
-                headers = next(reader)
-                for row in reader:
-                    count += 1
-                    dict = {}
-                    for i, key in enumerate(headers):
-                        value = row[i]
-                        if value:
-                            field = model._meta.get_field(key)
-                            if field.is_relation:
-                                related_model = field.related_model
-                                value = related_model.objects.get(id=value)
-                            dict[field.name] = value
-                    object = model(**dict)
-                    object.save()
-
-                if count == 0:
-                    message = 'нет обновленных объектов!'
-                elif count % 10 == 1 and count % 100:
-                    message = f'обновлен {count} объект!'
-                elif 2 <= count % 10 <= 4 and (
-                    count % 100 < 10 or count % 100 >= 20
-                ):
-                    message = f'обновлено {count} объекта!'
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        with transaction.atomic():
+            for name, (model, fields, unique_fields) in (
+                    self.assignments.items()):
+                file_path = os.path.join(
+                        options['path'], f'{name}.{options["format"]}')
+                start = time.perf_counter()
+                rows = self.read_rows(file_path, options['format'], fields)
+                self.validate_rows(file_path, rows, fields)
+                objects = self.build_objects(model, rows)
+                count = self.save_objects(model, objects, unique_fields,
+                                          options['mode'],
+                                          options['batch_size'])
+                elapsed = time.perf_counter() - start
+                rate = len(objects) / elapsed if elapsed else len(objects)
+                self.stdout.write(
+                        f'{file_path} - {model.__name__} - '
+                        f'{self.message(count)} '
+                        f'({len(objects)} строк за {elapsed:.2f} с, '
+                        f'{rate:.0f} строк/с)')
+        for version in self.versions:
+            bump_version(version)
+
+    def read_rows(self, file_path, file_format, fields):
+        try:
+            file = open(file_path, 'r', encoding='utf-8')
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть {file_path}: {error}')
+        with file:
+            if file_format == 'json':
+                try:
+                    return json.load(file)
+                except ValueError as error:
+                    raise CommandError(f'{file_path}: неверный JSON: {error}')
+            reader = csv.reader(file)
+            first = next(reader, None)
+            if first is None:
+                return []
+            if set(first) <= set(fields):
+                headers = first
+                rows = []
+            else:
+                headers = fields
+                rows = [dict(zip(headers, first))]
+            rows.extend(dict(zip(headers, row)) for row in reader)
+            return rows
+
+    @staticmethod
+    def validate_rows(file_path, rows, fields):
+        """Все строки - объекты только с известными полями."""
+        if not isinstance(rows, list):
+            raise CommandError(f'{file_path}: ожидается список объектов.')
+        for number, row in enumerate(rows, start=1):
+            if not isinstance(row, dict):
+                raise CommandError(
+                        f'{file_path}: строка {number} не объект.')
+            for key in row:
+                if key not in fields:
+                    raise CommandError(
+                            f'{file_path}: строка {number}: неизвестное '
+                            f'поле "{key}", допустимы: {", ".join(fields)}.')
+
+    def build_objects(self, model, rows):
+        id_maps = {}
+        objects = []
+        for row in rows:
+            values = {}
+            for key, value in row.items():
+                if value in ('', None):
+                    continue
+                field = model._meta.get_field(key)
+                if field.is_relation:
+                    related_model = field.related_model
+                    if related_model not in id_maps:
+                        id_maps[related_model] = {
+                                str(pk): pk for pk in related_model.objects
+                                .values_list('pk', flat=True)
+                        }
+                    try:
+                        value = id_maps[related_model][str(value)]
+                    except KeyError:
+                        raise CommandError(
+                                f'{related_model.__name__} с id={value} '
+                                f'не найден.')
+                    values[field.attname] = value
                 else:
-                    message = f'обновлено {count} объектов!'
+                    values[field.name] = value.strip()
+            objects.append(model(**values))
+        return objects
+
+    def save_objects(self, model, objects, unique_fields, mode, batch_size):
+        if mode == INSERT:
+            model.objects.bulk_create(objects, batch_size=batch_size)
+            return len(objects)
+
+        def key(obj):
+            return tuple(getattr(obj, field) for field in unique_fields)
+
+        existing = {
+                tuple(values[:len(unique_fields)]): values[-1]
+                for values in model.objects.values_list(*unique_fields, 'pk')
+        }
+        new_objects = {}
+        updated_objects = []
+        for obj in objects:
+            obj_key = key(obj)
+            if obj_key in existing:
+                if mode == UPSERT:
+                    obj.pk = existing[obj_key]
+                    updated_objects.append(obj)
+                continue
+            new_objects.setdefault(obj_key, obj)
+        model.objects.bulk_create(new_objects.values(),
+                                  batch_size=batch_size)
+        update_fields = [
+                field.attname for field in model._meta.concrete_fields
+                if not field.primary_key and field.name not in unique_fields
+        ]
+        if updated_objects and update_fields:
+            model.objects.bulk_update(updated_objects, update_fields,
+                                      batch_size=batch_size)
+            return len(new_objects) + len(updated_objects)
+        return len(new_objects)
 
-                self.stdout.write(f'{file_path} - {model} - {message}')
+    @staticmethod
+    def message(count):
+        if count == 0:
+            return 'нет обновленных объектов!'
+        if count % 10 == 1 and count % 100 != 11:
+            return f'обновлен {count} объект!'
+        if 2 <= count % 10 <= 4 and (
+            count % 100 < 10 or count % 100 >= 20
+        ):
+            return f'обновлено {count} объекта!'
+        return f'обновлено {count} объектов!'
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from food_recipies.counters import COUNTERS, actual_count
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики избранного, корзин, подписчиков и рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+                '--verify', action='store_true',
+                help='Только проверить счетчики, ничего не меняя.')
+
+    def handle(self, *args, **options):
+        mismatched = 0
+        with transaction.atomic():
+            for model, field, related_model, related_field in COUNTERS:
+                actual = actual_count(related_model, related_field)
+                wrong = (model.objects.annotate(actual=actual)
+                         .exclude(**{field: F('actual')}))
+                count = wrong.count()
+                mismatched += count
+                self.stdout.write(
+                        f'{model.__name__}.{field}: расхождений {count}')
+                if options['verify']:
+                    for pk, stored, real in wrong.values_list(
+                            'pk', field, 'actual')[:10]:
+                        self.stdout.write(f'  id={pk}: {stored} != {real}')
+                elif count:
+                    model.objects.update(**{field: actual})
+        if options['verify'] and mismatched:
+            raise CommandError(f'Неверных счетчиков: {mismatched}.')
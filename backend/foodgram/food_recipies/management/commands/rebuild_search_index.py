@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from food_recipies.search import recipe_search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс рецептов.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recipe_search.rebuild()
+        self.stdout.write(
+                f'Индекс перестроен ({type(recipe_search).__name__}).')
@@ -0,0 +1,171 @@
+import random
+from io import BytesIO
+
+from core.cache import (INGREDIENTS_VERSION, RECIPE_LIST_VERSION,
+                        RECIPES_VERSION, TAGS_VERSION, bump_version)
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from food_recipies.models import (Favorites, IngredientAndItsQuantity,
+                                  Ingredients, RecipeTags, Recipies,
+                                  ShoppingCart, Tags)
+from PIL import Image
+from users.models import Followers, User
+
+PREFIX = 'seed_'
+PICTURE = 'food_pictures/seed.jpg'
+TAGS = (
+        ('Завтрак', '#E26C2D', 'breakfast'),
+        ('Обед', '#49B64E', 'lunch'),
+        ('Ужин', '#8775D2', 'dinner'),
+)
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими данными для нагрузочных тестов. '
+            'При одном и том же --seed данные одинаковые.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument(
+                '--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument(
+                '--follows', type=int, default=10,
+                help='Подписок на одного пользователя.')
+        parser.add_argument(
+                '--favorites', type=int, default=20,
+                help='Рецептов в избранном у одного пользователя.')
+        parser.add_argument(
+                '--carts', type=int, default=5,
+                help='Рецептов в корзине у одного пользователя.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+                '--clear', action='store_true',
+                help='Удалить созданные ранее синтетические данные.')
+
+    def handle(self, *args, **options):
+        seed_users = User.objects.filter(username__startswith=PREFIX)
+        if seed_users.exists():
+            if not options['clear']:
+                raise CommandError(
+                        'Синтетические данные уже есть, добавьте --clear.')
+            seed_users.delete()
+            IngredientAndItsQuantity.objects.filter(
+                    recipies=None).delete()
+        if options['users'] < 2 or options['recipes'] < 1:
+            raise CommandError('Нужно минимум 2 пользователя и 1 рецепт.')
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        if not Ingredients.objects.exists():
+            call_command('import_csv', stdout=self.stdout)
+        self.save_picture()
+        with transaction.atomic():
+            tag_ids = self.create_tags()
+            user_ids = self.create_users(options['users'])
+            recipe_ids = self.create_recipes(
+                    user_ids, tag_ids, options['recipes'],
+                    options['ingredients_per_recipe'])
+            self.create_follows(user_ids, options['follows'])
+            self.create_relations(Favorites, user_ids, recipe_ids,
+                                  options['favorites'])
+            self.create_relations(ShoppingCart, user_ids, recipe_ids,
+                                  options['carts'])
+            call_command('rebuild_counters', stdout=self.stdout)
+            call_command('rebuild_search_index', stdout=self.stdout)
+            call_command('backfill_feeds', stdout=self.stdout)
+        for version in (INGREDIENTS_VERSION, RECIPE_LIST_VERSION,
+                        RECIPES_VERSION, TAGS_VERSION):
+            bump_version(version)
+        self.stdout.write(
+                f'Создано: пользователей {len(user_ids)}, '
+                f'рецептов {len(recipe_ids)}.')
+
+    def insert(self, model, objects):
+        """bulk_create, возвращает id новых строк в порядке вставки."""
+        last = (model.objects.order_by('-pk')
+                .values_list('pk', flat=True).first() or 0)
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+        return list(model.objects.filter(pk__gt=last).order_by('pk')
+                    .values_list('pk', flat=True))
+
+    def save_picture(self):
+        if default_storage.exists(PICTURE):
+            return
+        buffer = BytesIO()
+        Image.new('RGB', (640, 480), '#E26C2D').save(buffer, 'JPEG')
+        default_storage.save(PICTURE, ContentFile(buffer.getvalue()))
+
+    def create_tags(self):
+        for name, color, slug in TAGS:
+            Tags.objects.get_or_create(
+                    slug=slug, defaults={'name': name, 'color': color})
+        return list(Tags.objects.order_by('pk').values_list('pk', flat=True))
+
+    def create_users(self, count):
+        password = make_password(None)
+        return self.insert(User, [
+                User(username=f'{PREFIX}{number}',
+                     email=f'{PREFIX}{number}@example.com',
+                     first_name='Тест', last_name=str(number),
+                     password=password)
+                for number in range(count)
+        ])
+
+    def create_recipes(self, user_ids, tag_ids, count, ingredients):
+        ingredient_ids = list(Ingredients.objects.order_by('pk')
+                              .values_list('pk', flat=True))
+        ingredients = min(ingredients, len(ingredient_ids))
+        recipe_ids = self.insert(Recipies, [
+                Recipies(author_id=self.random.choice(user_ids),
+                         name=f'Рецепт {number}', picture=PICTURE,
+                         description='Синтетический рецепт.',
+                         timing=self.random.randint(5, 120))
+                for number in range(count)
+        ])
+        amount_ids = self.insert(IngredientAndItsQuantity, [
+                IngredientAndItsQuantity(
+                        ingredient_id=ingredient_id,
+                        quantity=self.random.randint(1, 500))
+                for _ in recipe_ids
+                for ingredient_id in self.random.sample(
+                        ingredient_ids, ingredients)
+        ])
+        through = Recipies.ingredients.through
+        through.objects.bulk_create([
+                through(recipies_id=recipe_id,
+                        ingredientanditsquantity_id=amount_id)
+                for number, recipe_id in enumerate(recipe_ids)
+                for amount_id in amount_ids[
+                        number * ingredients:(number + 1) * ingredients]
+        ], batch_size=self.batch_size)
+        RecipeTags.objects.bulk_create([
+                RecipeTags(recipie_id=recipe_id, tag_id=tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in self.random.sample(
+                        tag_ids, self.random.randint(1, len(tag_ids)))
+        ], batch_size=self.batch_size)
+        return recipe_ids
+
+    def create_follows(self, user_ids, count):
+        count = min(count, len(user_ids) - 1)
+        Followers.objects.bulk_create([
+                Followers(follower_id=user_id, followed_id=followed_id)
+                for user_id in user_ids
+                for followed_id in [
+                        pk for pk in self.random.sample(user_ids, count + 1)
+                        if pk != user_id
+                ][:count]
+        ], batch_size=self.batch_size)
+
+    def create_relations(self, model, user_ids, recipe_ids, count):
+        count = min(count, len(recipe_ids))
+        model.objects.bulk_create([
+                model(user_id=user_id, recipie_id=recipe_id)
+                for user_id in user_ids
+                for recipe_id in self.random.sample(recipe_ids, count)
+        ], batch_size=self.batch_size)
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from food_recipies.models import FeedEntry
+
+
+class Command(BaseCommand):
+    help = 'Оставляет в каждой ленте подписок только последние записи.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+                '--size', type=int, default=settings.FEED_TIMELINE_SIZE,
+                help='Сколько записей оставить в ленте.')
+
+    def handle(self, *args, **options):
+        size = options['size']
+        if size < 1:
+            raise CommandError('--size должен быть больше нуля.')
+        deleted = 0
+        users = (FeedEntry.objects.values('user')
+                 .annotate(total=Count('id'))
+                 .filter(total__gt=size)
+                 .values_list('user', flat=True))
+        for user_id in list(users):
+            entries = FeedEntry.objects.filter(user_id=user_id)
+            oldest_kept = (entries.order_by('-recipie_id')
+                           .values_list('recipie_id', flat=True)[size - 1])
+            count, _ = entries.filter(recipie_id__lt=oldest_kept).delete()
+            deleted += count
+        self.stdout.write(f'Удалено записей: {deleted}.')
@@ -0,0 +1,53 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('food_recipies', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='recipies',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='recipies',
+            name='ingredients',
+            field=models.ManyToManyField(to='food_recipies.IngredientAndItsQuantity'),
+        ),
+        migrations.AddField(
+            model_name='recipies',
+            name='tag',
+            field=models.ManyToManyField(to='food_recipies.Tags'),
+        ),
+        migrations.AddField(
+            model_name='ingredientanditsquantity',
+            name='ingredient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='food_recipies.ingredients'),
+        ),
+        migrations.AddField(
+            model_name='favorites',
+            name='recipie',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='food_recipies.recipies'),
+        ),
+        migrations.AddField(
+            model_name='favorites',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_recipies', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='favorites',
+            name='recipie',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorite_recipes', to='food_recipies.recipies'),
+        ),
+        migrations.AlterField(
+            model_name='shoppingcart',
+            name='recipie',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_recipes', to='food_recipies.recipies'),
+        ),
+    ]
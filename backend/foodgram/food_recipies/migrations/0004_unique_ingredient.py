@@ -0,0 +1,17 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_recipies', '0003_favorite_cart_related_names'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='ingredients',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from core.db import PostgreSQLRunSQL
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_recipies', '0004_unique_ingredient'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        # Поиск по началу без учета регистра:
+        # LOWER(name) LIKE 'соль%', в ORM - Lower('name') + startswith.
+        PostgreSQLRunSQL(
+            sql='CREATE INDEX ingredient_name_lower_idx '
+                'ON food_recipies_ingredients '
+                '(LOWER(name) varchar_pattern_ops)',
+            reverse_sql='DROP INDEX ingredient_name_lower_idx',
+        ),
+        # Поиск по вхождению: name ILIKE '%соль%'.
+        PostgreSQLRunSQL(
+            sql='CREATE INDEX ingredient_name_trgm_idx '
+                'ON food_recipies_ingredients USING gin '
+                '(name gin_trgm_ops)',
+            reverse_sql='DROP INDEX ingredient_name_trgm_idx',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_recipies', '0005_ingredient_name_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='recipies',
+            options={'ordering': ['-pub_date', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='recipies',
+            index=models.Index(fields=['-pub_date', '-id'], name='recipe_pub_date_id_idx'),
+        ),
+    ]
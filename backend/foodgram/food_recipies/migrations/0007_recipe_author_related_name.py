@@ -0,0 +1,21 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:50
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('food_recipies', '0006_recipe_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipies',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipes', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_tags(apps, schema_editor):
+    """Переносит связи из автоматической таблицы M2M в RecipeTags."""
+    Recipies = apps.get_model('food_recipies', 'Recipies')
+    RecipeTags = apps.get_model('food_recipies', 'RecipeTags')
+    links = Recipies.tag.through.objects.using(
+            schema_editor.connection.alias).values_list('recipies_id',
+                                                        'tags_id')
+    RecipeTags.objects.using(schema_editor.connection.alias).bulk_create(
+            RecipeTags(recipie_id=recipie_id, tag_id=tag_id)
+            for recipie_id, tag_id in links.iterator())
+
+
+def copy_tags_back(apps, schema_editor):
+    Recipies = apps.get_model('food_recipies', 'Recipies')
+    RecipeTags = apps.get_model('food_recipies', 'RecipeTags')
+    links = RecipeTags.objects.using(
+            schema_editor.connection.alias).values_list('recipie_id',
+                                                        'tag_id')
+    Through = Recipies.tag.through
+    Through.objects.using(schema_editor.connection.alias).bulk_create(
+            Through(recipies_id=recipie_id, tags_id=tag_id)
+            for recipie_id, tag_id in links.iterator())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_recipies', '0007_recipe_author_related_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeTags',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='food_recipies.recipies')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='food_recipies.tags')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='recipetags',
+            index=models.Index(fields=['tag', 'recipie'], name='recipe_tag_tag_recipe_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipetags',
+            constraint=models.UniqueConstraint(fields=('recipie', 'tag'), name='unique_recipe_tag'),
+        ),
+        # Django не меняет M2M на M2M с through: связи копируются в
+        # RecipeTags, после чего старое поле с его таблицей удаляется.
+        migrations.RunPython(copy_tags, copy_tags_back),
+        migrations.RemoveField(
+            model_name='recipies',
+            name='tag',
+        ),
+        migrations.AddField(
+            model_name='recipies',
+            name='tag',
+            field=models.ManyToManyField(through='food_recipies.RecipeTags', to='food_recipies.Tags'),
+        ),
+        migrations.AddConstraint(
+            model_name='favorites',
+            constraint=models.UniqueConstraint(fields=('user', 'recipie'), name='unique_favorite'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipie'), name='unique_shopping_cart'),
+        ),
+    ]
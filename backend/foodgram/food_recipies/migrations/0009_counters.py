@@ -0,0 +1,28 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_recipies', '0008_recipe_tags'),
+    ]
+
+    # Значения для существующих строк заполняет manage.py rebuild_counters.
+    operations = [
+        migrations.AddField(
+            model_name='recipies',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='recipies',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='recipies',
+            index=models.Index(fields=['-favorites_count', '-pub_date', '-id'], name='recipe_favorites_count_idx'),
+        ),
+    ]
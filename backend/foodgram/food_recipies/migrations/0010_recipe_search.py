@@ -0,0 +1,46 @@
+import django.contrib.postgres.search
+from core.db import PostgreSQLRunSQL, SQLiteRunSQL
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_recipies', '0009_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipies',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # На PostgreSQL вектор заполняет команда rebuild_search_index.
+        PostgreSQLRunSQL(
+            sql='CREATE INDEX recipe_search_vector_idx '
+                'ON food_recipies_recipies USING gin (search_vector)',
+            reverse_sql='DROP INDEX recipe_search_vector_idx',
+        ),
+        # На SQLite поиск идет по виртуальной таблице FTS5 с rowid = id
+        # рецепта, см. food_recipies.search.SQLiteRecipeSearch.
+        SQLiteRunSQL(
+            sql=[
+                'CREATE VIRTUAL TABLE food_recipies_recipe_search '
+                'USING fts5(name, ingredients, description, '
+                'tokenize="unicode61 remove_diacritics 2")',
+                'INSERT INTO food_recipies_recipe_search '
+                '(rowid, name, ingredients, description) '
+                'SELECT recipe.id, recipe.name, '
+                '(SELECT group_concat(ingredient.name, \' \') '
+                'FROM food_recipies_recipies_ingredients link '
+                'JOIN food_recipies_ingredientanditsquantity amount '
+                'ON amount.id = link.ingredientanditsquantity_id '
+                'JOIN food_recipies_ingredients ingredient '
+                'ON ingredient.id = amount.ingredient_id '
+                'WHERE link.recipies_id = recipe.id), '
+                'recipe.description '
+                'FROM food_recipies_recipies recipe',
+            ],
+            reverse_sql='DROP TABLE food_recipies_recipe_search',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.3 on 2026-10-18 21:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_recipies', '0011_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipies',
+            name='renditions_ready',
+            field=models.BooleanField(default=False),
+        ),
+    ]
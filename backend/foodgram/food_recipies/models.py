@@ -1,4 +1,6 @@
+from colorfield.fields import ColorField
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 
@@ -9,6 +11,14 @@ class Ingredients(models.Model):
     name = models.CharField(max_length=200)
     measurement_unit = models.CharField(max_length=200)
 
+    class Meta:
+        constraints = [
+                models.UniqueConstraint(fields=['name', 'measurement_unit'],
+                                        name='unique_ingredient'),
+        ]
+        # Индексы для поиска по названию есть только в PostgreSQL
+        # и создаются в миграции 0005_ingredient_name_indexes.
+
 
 class IngredientAndItsQuantity(models.Model):
     ingredient = models.ForeignKey(Ingredients, on_delete=models.CASCADE)
@@ -17,29 +27,110 @@ class IngredientAndItsQuantity(models.Model):
 
 class Tags(models.Model):
     name = models.CharField(max_length=200)
-    color = models.ColorField()
+    color = ColorField()
     slug = models.SlugField(unique=True)
 
 
 class Recipies(models.Model):
-    author = models.ForeignKey(User, on_delete=models.CASCADE)
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name='recipes')
     name = models.CharField(max_length=200)
     picture = models.ImageField(upload_to='food_pictures/')
     description = models.TextField()
     ingredients = models.ManyToManyField(IngredientAndItsQuantity)
-    tag = models.ManyToManyField(Tags)
+    tag = models.ManyToManyField(Tags, through='RecipeTags')
     timing = models.PositiveIntegerField(validators=[MinValueValidator(1)])
     pub_date = models.DateTimeField(auto_now=True)
+    favorites_count = models.PositiveIntegerField(default=0)
+    shopping_cart_count = models.PositiveIntegerField(default=0)
+    # Готовы ли уменьшенные копии picture, см. core.images.build_renditions.
+    renditions_ready = models.BooleanField(default=False)
+    # Заполняет food_recipies.search.recipe_search, используется только
+    # на PostgreSQL. GIN-индекс создается в миграции 0010_recipe_search.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        ordering = ['-pub_date', '-id']
+        indexes = [
+                models.Index(fields=['-pub_date', '-id'],
+                             name='recipe_pub_date_id_idx'),
+                models.Index(fields=['-favorites_count', '-pub_date', '-id'],
+                             name='recipe_favorites_count_idx'),
+                models.Index(fields=['author', '-id'],
+                             name='recipe_author_id_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает имя картинки из базы для picture_changed()."""
+        instance = super().from_db(db, field_names, values)
+        if 'picture' in field_names:
+            instance._loaded_picture = values[field_names.index('picture')]
+        return instance
+
+    def picture_changed(self):
+        """Сменилась ли картинка с загрузки. Новый объект - сменилась."""
+        return self.picture.name != getattr(self, '_loaded_picture', None)
+
+
+class RecipeTags(models.Model):
+    recipie = models.ForeignKey(Recipies, on_delete=models.CASCADE)
+    tag = models.ForeignKey(Tags, on_delete=models.CASCADE)
 
     class Meta:
-        ordering = ['-pub_date']
+        constraints = [
+                models.UniqueConstraint(fields=['recipie', 'tag'],
+                                        name='unique_recipe_tag'),
+        ]
+        indexes = [
+                models.Index(fields=['tag', 'recipie'],
+                             name='recipe_tag_tag_recipe_idx'),
+        ]
 
 
 class Favorites(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    recipie = models.ForeignKey(Recipies, on_delete=models.CASCADE)
+    recipie = models.ForeignKey(Recipies, on_delete=models.CASCADE,
+                                related_name='favorite_recipes')
+
+    class Meta:
+        constraints = [
+                models.UniqueConstraint(fields=['user', 'recipie'],
+                                        name='unique_favorite'),
+        ]
 
 
 class ShoppingCart(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    recipie = models.ForeignKey(Recipies, on_delete=models.CASCADE)
+    recipie = models.ForeignKey(Recipies, on_delete=models.CASCADE,
+                                related_name='shopping_list_recipes')
+
+    class Meta:
+        constraints = [
+                models.UniqueConstraint(fields=['user', 'recipie'],
+                                        name='unique_shopping_cart'),
+        ]
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписок пользователя.
+
+    Строки создаются при публикации рецепта (food_recipies.feed), лента
+    упорядочена по id рецепта, то есть по времени публикации.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='feed')
+    recipie = models.ForeignKey(Recipies, on_delete=models.CASCADE,
+                                related_name='feed_entries')
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name='+')
+
+    class Meta:
+        constraints = [
+                models.UniqueConstraint(fields=['user', 'recipie'],
+                                        name='unique_feed_entry'),
+        ]
+        indexes = [
+                models.Index(fields=['user', 'author'],
+                             name='feed_user_author_idx'),
+        ]
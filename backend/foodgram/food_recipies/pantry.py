@@ -0,0 +1,158 @@
+from collections import Counter, defaultdict
+from collections.abc import Sequence
+from datetime import timedelta
+from itertools import chain
+from threading import Lock
+
+from core.cache import RECIPES_VERSION, local_version
+
+from .models import Recipies
+
+
+class PantryResults(Sequence):
+    """Отсортированные оценки, которые разворачиваются только при
+    обращении, чтобы постраничная выдача не трогала весь список."""
+
+    def __init__(self, scored):
+        self._scored = scored
+
+    def __len__(self):
+        return len(self._scored)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._convert(item) for item in self._scored[index]]
+        return self._convert(self._scored[index])
+
+    @staticmethod
+    def _convert(item):
+        coverage, missing, recipe_id = item
+        return -coverage, missing, -recipe_id
+
+
+class PantryIndex:
+    """Разреженная матрица рецепт-ингредиент в памяти процесса.
+
+    Для каждого ингредиента хранится кортеж рецептов, в которых он есть.
+    Оценка - это произведение вектора продуктов пользователя на матрицу:
+    число совпадений считается только по рецептам из списков выбранных
+    ингредиентов, без обхода всего каталога.
+
+    При смене RECIPES_VERSION индекс обновляется по рецептам, у которых
+    pub_date не раньше последнего учтенного (auto_now меняет его при
+    каждом сохранении); slack покрывает транзакции, закоммиченные позже
+    соседних. Ингредиенты перечитываются только у рецептов, чей pub_date
+    изменился. Удаленные рецепты находятся по расхождению количества.
+    Без общего кэша синхронизация идет еще и раз в LOCAL_DATA_TTL секунд.
+    """
+    slack = timedelta(minutes=1)
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._synced_until = None
+        self._dates = {}
+        self._recipes = {}
+        self._postings = {}
+
+    def recommend(self, ingredient_ids, max_missing=None):
+        """[(доля покрытых ингредиентов, сколько не хватает, id рецепта)].
+
+        Отсортировано по убыванию покрытия, затем по числу недостающих
+        ингредиентов и по новизне рецепта.
+        """
+        self._load()
+        recipes = self._recipes
+        postings = self._postings
+        hits = Counter(chain.from_iterable(
+                postings.get(ingredient_id, ())
+                for ingredient_id in set(ingredient_ids)))
+        scored = []
+        for recipe_id, count in hits.items():
+            total = len(recipes.get(recipe_id, ()))
+            if total and (max_missing is None
+                          or total - count <= max_missing):
+                scored.append((-count / total, total - count, -recipe_id))
+        scored.sort()
+        return PantryResults(scored)
+
+    def _load(self):
+        version = local_version(RECIPES_VERSION)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._sync()
+                    self._version = version
+
+    def _sync(self):
+        if self._synced_until is None:
+            self._build()
+            return
+        recent = dict(Recipies.objects.filter(
+                pub_date__gte=self._synced_until - self.slack,
+        ).values_list('id', 'pub_date'))
+        changed = {
+                recipe_id: pub_date for recipe_id, pub_date in recent.items()
+                if self._dates.get(recipe_id) != pub_date
+        }
+        ingredients = self._ingredients(list(changed))
+        for recipe_id in changed:
+            self._set(recipe_id, frozenset(ingredients[recipe_id]))
+        self._dates.update(changed)
+        self._synced_until = max([self._synced_until, *changed.values()])
+        if Recipies.objects.count() != len(self._recipes):
+            existing = set(Recipies.objects.values_list('id', flat=True))
+            for recipe_id in self._recipes.keys() - existing:
+                self._set(recipe_id, None)
+
+    def _build(self):
+        dates = dict(Recipies.objects.values_list('id', 'pub_date'))
+        ingredients = self._ingredients(None)
+        recipes = {
+                recipe_id: frozenset(ingredients[recipe_id])
+                for recipe_id in dates
+        }
+        postings = defaultdict(list)
+        for recipe_id, ingredient_ids in recipes.items():
+            for ingredient_id in ingredient_ids:
+                postings[ingredient_id].append(recipe_id)
+        self._dates = dates
+        self._recipes = recipes
+        self._postings = {
+                ingredient_id: tuple(recipe_ids)
+                for ingredient_id, recipe_ids in postings.items()
+        }
+        self._synced_until = max(dates.values(), default=None)
+
+    @staticmethod
+    def _ingredients(recipe_ids):
+        links = Recipies.ingredients.through.objects.values_list(
+                'recipies_id', 'ingredientanditsquantity__ingredient_id')
+        if recipe_ids is not None:
+            links = links.filter(recipies_id__in=recipe_ids)
+        ingredients = defaultdict(set)
+        for recipe_id, ingredient_id in links:
+            ingredients[recipe_id].add(ingredient_id)
+        return ingredients
+
+    def _set(self, recipe_id, ingredient_ids):
+        """Заменяет строку матрицы, None удаляет рецепт. Списки
+        заменяются целиком, поэтому читающие потоки не видят их
+        в промежуточном состоянии."""
+        old = self._recipes.get(recipe_id, frozenset())
+        new = ingredient_ids or frozenset()
+        for ingredient_id in old - new:
+            self._postings[ingredient_id] = tuple(
+                    pk for pk in self._postings[ingredient_id]
+                    if pk != recipe_id)
+        for ingredient_id in new - old:
+            self._postings[ingredient_id] = self._postings.get(
+                    ingredient_id, ()) + (recipe_id,)
+        if ingredient_ids is None:
+            self._dates.pop(recipe_id, None)
+            self._recipes.pop(recipe_id, None)
+        else:
+            self._recipes[recipe_id] = ingredient_ids
+
+
+pantry_index = PantryIndex()
@@ -0,0 +1,210 @@
+import re
+from bisect import bisect_left, bisect_right
+from functools import reduce
+from operator import add, or_
+from threading import Lock
+
+from core.cache import INGREDIENTS_VERSION, local_version
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import IngredientAndItsQuantity, Ingredients, Recipies
+
+
+class IngredientPrefixIndex:
+    """Отсортированный по имени список ингредиентов в памяти процесса.
+
+    Справочник маленький и меняется редко, поэтому поиск по началу
+    названия делается бинарным поиском без обращения к базе.
+    Индекс перестраивается, когда меняется версия INGREDIENTS_VERSION,
+    а без общего кэша еще и раз в LOCAL_DATA_TTL секунд.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._keys = []
+        self._items = []
+
+    def search(self, query):
+        """Сначала ингредиенты, начинающиеся с query, затем содержащие его."""
+        keys, items = self._load()
+        query = query.strip().lower()
+        if not query:
+            return list(items)
+        start = bisect_left(keys, query)
+        end = bisect_right(keys, query + '\U0010ffff', start)
+        prefix = items[start:end]
+        contains = [
+                item for index, (key, item) in enumerate(zip(keys, items))
+                if (index < start or index >= end) and query in key
+        ]
+        return prefix + contains
+
+    def _load(self):
+        version = local_version(INGREDIENTS_VERSION)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._build(version)
+        return self._keys, self._items
+
+    def _build(self, version):
+        rows = sorted(
+                Ingredients.objects.values('id', 'name', 'measurement_unit'),
+                key=lambda row: (row['name'].lower(), row['id']),
+        )
+        self._keys = [row['name'].lower() for row in rows]
+        self._items = rows
+        self._version = version
+
+
+ingredient_index = IngredientPrefixIndex()
+
+
+def search_terms(query):
+    """Слова запроса в нижнем регистре, без знаков препинания."""
+    return re.findall(r'\w+', query.lower())
+
+
+class RecipeSearch:
+    """Поиск рецептов по названию, описанию и ингредиентам.
+
+    Базовая версия для баз без полнотекстового поиска: все слова
+    должны встречаться в названии или описании, без ранжирования.
+    """
+
+    def search(self, queryset, query):
+        for term in search_terms(query):
+            queryset = queryset.filter(
+                    Q(name__icontains=term) | Q(description__icontains=term))
+        return queryset
+
+    def update(self, recipe_ids):
+        pass
+
+    def remove(self, recipe_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class PostgresRecipeSearch(RecipeSearch):
+    """Столбец search_vector с GIN-индексом.
+
+    Вектор строится по русской и английской конфигурациям, веса:
+    название - A, ингредиенты - B, описание - C. Каждое слово запроса
+    ищется как префикс, чтобы поиск работал по мере ввода.
+    """
+    configs = ('russian', 'english')
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return queryset
+        raw = ' & '.join(f'{term}:*' for term in terms)
+        search_query = reduce(or_, (
+                SearchQuery(raw, search_type='raw', config=config)
+                for config in self.configs))
+        return queryset.filter(search_vector=search_query).annotate(
+                search_rank=SearchRank(F('search_vector'), search_query),
+        ).order_by('-search_rank', '-id')
+
+    def update(self, recipe_ids):
+        names = (IngredientAndItsQuantity.objects
+                 .filter(recipies=OuterRef('pk'))
+                 .order_by()
+                 .values('recipies')
+                 .annotate(names=StringAgg('ingredient__name', ' '))
+                 .values('names'))
+        vector = reduce(add, (
+                SearchVector('name', weight='A', config=config)
+                + SearchVector(Coalesce(Subquery(names), Value('')),
+                               weight='B', config=config)
+                + SearchVector('description', weight='C', config=config)
+                for config in self.configs))
+        queryset = Recipies.objects.all()
+        if recipe_ids is not None:
+            queryset = queryset.filter(pk__in=recipe_ids)
+        queryset.update(search_vector=vector)
+
+    def rebuild(self):
+        self.update(None)
+
+
+class SQLiteRecipeSearch(RecipeSearch):
+    """Виртуальная таблица FTS5 с rowid = id рецепта.
+
+    Таблица создается и заполняется в миграции 0010_recipe_search.
+    Ранжирование - bm25 с весами столбцов: название, ингредиенты, описание.
+    """
+    table = 'food_recipies_recipe_search'
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return queryset
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.extra(
+                tables=[self.table],
+                where=[f'{self.table}.rowid = {Recipies._meta.db_table}.id',
+                       f'{self.table} MATCH %s'],
+                params=[match],
+                select={'search_rank':
+                        f'bm25({self.table}, 10.0, 5.0, 1.0)'},
+        ).order_by('search_rank', '-id')
+
+    def update(self, recipe_ids):
+        if not recipe_ids:
+            return
+        self.remove(recipe_ids)
+        self._insert('WHERE recipe.id IN ({})'.format(
+                ', '.join('%s' for _ in recipe_ids)), recipe_ids)
+
+    def remove(self, recipe_ids):
+        if not recipe_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                    f'DELETE FROM {self.table} WHERE rowid IN ({{}})'.format(
+                            ', '.join('%s' for _ in recipe_ids)),
+                    list(recipe_ids))
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+        self._insert('', [])
+
+    def _insert(self, where, params):
+        through = Recipies.ingredients.through._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                    f'INSERT INTO {self.table} '
+                    f'(rowid, name, ingredients, description) '
+                    f'SELECT recipe.id, recipe.name, '
+                    f'(SELECT group_concat(ingredient.name, \' \') '
+                    f'FROM {through} link '
+                    f'JOIN {IngredientAndItsQuantity._meta.db_table} amount '
+                    f'ON amount.id = link.ingredientanditsquantity_id '
+                    f'JOIN {Ingredients._meta.db_table} ingredient '
+                    f'ON ingredient.id = amount.ingredient_id '
+                    f'WHERE link.recipies_id = recipe.id), '
+                    f'recipe.description '
+                    f'FROM {Recipies._meta.db_table} recipe {where}',
+                    list(params))
+
+
+def get_recipe_search():
+    if connection.vendor == 'postgresql':
+        return PostgresRecipeSearch()
+    if connection.vendor == 'sqlite':
+        return SQLiteRecipeSearch()
+    return RecipeSearch()
+
+
+recipe_search = get_recipe_search()
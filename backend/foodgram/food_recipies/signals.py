@@ -0,0 +1,81 @@
+from functools import partial
+
+from core.cache import (AUTHOR_VERSION, INGREDIENTS_VERSION,
+                        RECIPE_DETAILS_VERSION, RECIPE_LIST_VERSION,
+                        RECIPES_VERSION, TAGS_VERSION, bump_version)
+from core.images import build_renditions, schedule_renditions
+from core.tasks import defer
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from users.models import User
+
+from .models import (Favorites, Ingredients, RecipeTags, Recipies,
+                     ShoppingCart, Tags)
+from .search import recipe_search
+
+
+@receiver(post_save, sender=Ingredients)
+@receiver(post_delete, sender=Ingredients)
+def ingredients_changed(**kwargs):
+    transaction.on_commit(partial(bump_version, INGREDIENTS_VERSION))
+    transaction.on_commit(partial(bump_version, RECIPE_DETAILS_VERSION))
+
+
+@receiver(post_save, sender=Tags)
+@receiver(post_delete, sender=Tags)
+def tags_changed(**kwargs):
+    transaction.on_commit(partial(bump_version, TAGS_VERSION))
+    transaction.on_commit(partial(bump_version, RECIPE_DETAILS_VERSION))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def author_changed(instance, update_fields=None, **kwargs):
+    """Профиль автора входит в карточки его рецептов, вход в систему -
+    нет. Карточки других авторов остаются в кэше."""
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    transaction.on_commit(partial(bump_version,
+                                  AUTHOR_VERSION.format(instance.pk)))
+
+
+@receiver(post_save, sender=Recipies)
+@receiver(post_delete, sender=Recipies)
+@receiver(post_save, sender=Favorites)
+@receiver(post_delete, sender=Favorites)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=RecipeTags)
+@receiver(post_delete, sender=RecipeTags)
+def recipe_list_changed(**kwargs):
+    transaction.on_commit(partial(bump_version, RECIPE_LIST_VERSION))
+
+
+@receiver(post_save, sender=Recipies)
+@receiver(post_delete, sender=Recipies)
+def recipes_changed(**kwargs):
+    transaction.on_commit(partial(bump_version, RECIPES_VERSION))
+
+
+@receiver(pre_save, sender=Recipies)
+def recipe_picture_changed(instance, **kwargs):
+    """Копии новой картинки еще не построены."""
+    if instance.picture_changed():
+        instance.renditions_ready = False
+
+
+@receiver(post_save, sender=Recipies)
+def recipe_picture_saved(instance, **kwargs):
+    """Копии строятся только для новой картинки, а не на каждое save()."""
+    if not instance.picture_changed():
+        return
+    instance._loaded_picture = instance.picture.name
+    if instance.picture:
+        defer(build_renditions, [instance.picture.name],
+              fallback=schedule_renditions)
+
+
+@receiver(post_delete, sender=Recipies)
+def recipe_deleted(instance, **kwargs):
+    recipe_search.remove([instance.pk])
@@ -0,0 +1,153 @@
+import json
+import logging
+import math
+import random
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from core.db import capture_queries
+from core.middleware import AsyncCapableMiddleware, as_coroutine
+from django.conf import settings
+
+logger = logging.getLogger('foodgram.profiling')
+
+
+class QueryRecorder:
+    """Обертка над курсором: копит время и шаблоны SQL-запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.signatures = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            # Параметры в sql не подставлены, шаблон и есть сигнатура.
+            self.signatures[sql] += 1
+
+    def duplicates(self):
+        return [{'sql': sql, 'count': count}
+                for sql, count in self.signatures.most_common()
+                if count > 1]
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга, values отсортирован."""
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def endpoint_name(request, view_func):
+    """Имя вида RecipeViewSet.list для вьюсетов и Класс.метод для APIView."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__name__', request.path)
+    method = request.method.lower()
+    actions = getattr(view_func, 'actions', None) or {}
+    return f'{cls.__name__}.{actions.get(method, method)}'
+
+
+def get_logger():
+    if not logger.handlers:
+        handler = RotatingFileHandler(
+                settings.PROFILING_LOG,
+                maxBytes=settings.PROFILING_LOG_MAX_BYTES,
+                backupCount=settings.PROFILING_LOG_BACKUPS,
+                encoding='utf-8',
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+class ProfilingMiddleware(AsyncCapableMiddleware):
+    """Считает запросы к БД, время SQL, представления и рендера.
+
+    Для доли запросов PROFILING_SAMPLE_RATE добавляет заголовок
+    Server-Timing и пишет строку JSON в PROFILING_LOG. Повторяющиеся
+    шаблоны SQL в одном запросе - признак N+1. Время app - это время
+    представления без SQL, то есть в основном работа сериализаторов.
+    У потоковых ответов учитывается только время до первого байта.
+    Запросы из пула асинхронных представлений тоже учитываются.
+    Отчет строит команда profiling_report.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if self.is_async:
+            self.process_view = as_coroutine(self.process_view)
+            self.process_template_response = as_coroutine(
+                    self.process_template_response)
+
+    def sync_call(self, request):
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        request._profile = {'endpoint': request.path}
+        start = time.perf_counter()
+        with capture_queries(recorder):
+            response = self.get_response(request)
+        return self.record(request, response, recorder, start)
+
+    async def async_call(self, request):
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return await self.get_response(request)
+        recorder = QueryRecorder()
+        request._profile = {'endpoint': request.path}
+        start = time.perf_counter()
+        with capture_queries(recorder):
+            response = await self.get_response(request)
+        return self.record(request, response, recorder, start)
+
+    @staticmethod
+    def record(request, response, recorder, start):
+        end = time.perf_counter()
+        profile = request._profile
+        view_start = profile.get('view_start', start)
+        view_end = profile.get('view_end', end)
+        timings = {
+                'total_ms': (end - start) * 1000,
+                'view_ms': (view_end - view_start) * 1000,
+                'sql_ms': recorder.duration * 1000,
+                'render_ms': (end - view_end) * 1000,
+        }
+        timings['app_ms'] = max(timings['view_ms'] - timings['sql_ms'], 0)
+        response['Server-Timing'] = ', '.join((
+                f'db;dur={timings["sql_ms"]:.1f};'
+                f'desc="{recorder.count} queries"',
+                f'app;dur={timings["app_ms"]:.1f}',
+                f'render;dur={timings["render_ms"]:.1f}',
+                f'total;dur={timings["total_ms"]:.1f}',
+        ))
+        record = {
+                'time': datetime.now(timezone.utc).isoformat(),
+                'endpoint': profile['endpoint'],
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': recorder.count,
+                'duplicates': recorder.duplicates(),
+        }
+        record.update(
+                (key, round(value, 3)) for key, value in timings.items())
+        get_logger().info(json.dumps(record, ensure_ascii=False))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, '_profile'):
+            request._profile['endpoint'] = endpoint_name(request, view_func)
+            request._profile['view_start'] = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        if hasattr(request, '_profile'):
+            request._profile['view_end'] = time.perf_counter()
+        return response
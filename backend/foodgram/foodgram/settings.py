@@ -14,7 +14,8 @@ ALLOWED_HOSTS = os.getenv('ALLOWED_HOST',
                           default='127.0.0.1, localhost').split(', ')
 
 INSTALLED_APPS = [
-        'food.apps.FoodRecipiesConfig',
+        'core.apps.CoreConfig',
+        'food_recipies.apps.FoodRecipiesConfig',
         'api.apps.ApiConfig',
         'users.apps.UsersConfig',
         'django.contrib.admin',
@@ -25,6 +26,7 @@ INSTALLED_APPS = [
         'django.contrib.staticfiles',
         'rest_framework',
         'django_filters',
+        'colorfield',
         'rest_framework.authtoken',
         'djoser'
 ]
@@ -39,7 +41,28 @@ MIDDLEWARE = [
         'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'backend.urls'
+# Сжатие ответов: Brotli, если установлен пакет brotli, иначе gzip.
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED',
+                                default='True') == 'True'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', default=1024))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY',
+                                           default=5))
+if COMPRESSION_ENABLED:
+    MIDDLEWARE.insert(1, 'core.compression.CompressionMiddleware')
+
+# Профилирование запросов: заголовок Server-Timing и журнал JSONL,
+# отчет - python manage.py profiling_report.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', default='False') == 'True'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', default=1))
+PROFILING_LOG = os.getenv('PROFILING_LOG',
+                          default=BASE_DIR / 'profiling.jsonl')
+PROFILING_LOG_MAX_BYTES = int(os.getenv('PROFILING_LOG_MAX_BYTES',
+                                        default=10 * 1024 * 1024))
+PROFILING_LOG_BACKUPS = int(os.getenv('PROFILING_LOG_BACKUPS', default=5))
+if PROFILING_ENABLED:
+    MIDDLEWARE.insert(0, 'foodgram.profiling.ProfilingMiddleware')
+
+ROOT_URLCONF = 'foodgram.urls'
 
 TEMPLATES = [
         {
@@ -58,19 +81,104 @@ TEMPLATES = [
         },
 ]
 
-WSGI_APPLICATION = 'backend.wsgi.application'
+WSGI_APPLICATION = 'foodgram.wsgi.application'
 
 DATABASES = {
         'default': {
-                'ENGINE': os.getenv('DB_ENGINE'),
-                'NAME': os.getenv('DB_NAME'),
+                'ENGINE': os.getenv('DB_ENGINE',
+                                    default='django.db.backends.sqlite3'),
+                'NAME': os.getenv('DB_NAME', default=BASE_DIR / 'db.sqlite3'),
                 'USER': os.getenv('POSTGRES_USER'),
                 'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
                 'HOST': os.getenv('DB_HOST'),
-                'PORT': os.getenv('DB_PORT')
+                'PORT': os.getenv('DB_PORT'),
+                # Сколько секунд держать соединение между запросами.
+                'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
+                # Проверять сохраненное соединение в начале запроса.
+                'CONN_HEALTH_CHECKS': os.getenv(
+                        'DB_CONN_HEALTH_CHECKS', default='True') == 'True',
+        }
+}
+
+# Пул соединений в процессе для многопоточных и ASGI-воркеров.
+# Закрытие соединения возвращает его в пул, поэтому CONN_MAX_AGE не нужен.
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', default=0))
+if DB_POOL_MAX_SIZE and 'postgresql' in (DATABASES['default']['ENGINE']
+                                         or ''):
+    DATABASES['default'].update(
+            ENGINE='core.postgresql_pool',
+            CONN_MAX_AGE=0,
+            POOL_MIN_SIZE=int(os.getenv('DB_POOL_MIN_SIZE', default=1)),
+            POOL_MAX_SIZE=DB_POOL_MAX_SIZE,
+    )
+
+# Реплики для чтения, хосты через запятую. Безопасные запросы читают
+# с реплик, запись и чтение после записи - с основной базы.
+DATABASE_REPLICAS = []
+for number, host in enumerate(
+        host.strip() for host in os.getenv(
+                'DB_REPLICA_HOSTS', default='').split(',') if host.strip()):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+            **DATABASES['default'],
+            'HOST': host,
+            'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', default=5))
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+    MIDDLEWARE.append('core.replicas.ReplicaMiddleware')
+
+# Для нескольких воркеров нужен общий бэкенд, например
+# django.core.cache.backends.filebased.FileBasedCache или
+# django_redis.cache.RedisCache, иначе версии кэшей у каждого процесса свои.
+CACHES = {
+        'default': {
+                'BACKEND': os.getenv(
+                        'CACHE_BACKEND',
+                        default='django.core.cache.backends.locmem.LocMemCache'
+                ),
+                'LOCATION': os.getenv('CACHE_LOCATION', default=''),
         }
 }
 
+REFERENCE_CACHE_TIMEOUT = int(os.getenv('REFERENCE_CACHE_TIMEOUT',
+                                        default=60 * 60 * 24))
+REFERENCE_CACHE_MAX_AGE = int(os.getenv('REFERENCE_CACHE_MAX_AGE',
+                                        default=0))
+# Индексы в памяти процесса (ингредиенты, кладовая) без общего кэша не
+# узнают об изменениях из других процессов и перечитываются из базы раз
+# в LOCAL_DATA_TTL секунд.
+LOCAL_DATA_TTL = int(os.getenv('LOCAL_DATA_TTL', default=60))
+COUNT_CACHE_TIMEOUT = int(os.getenv('COUNT_CACHE_TIMEOUT', default=60))
+MEMBERSHIP_CACHE_TIMEOUT = int(os.getenv('MEMBERSHIP_CACHE_TIMEOUT',
+                                         default=60 * 5))
+RECIPE_DETAIL_CACHE_TIMEOUT = int(os.getenv('RECIPE_DETAIL_CACHE_TIMEOUT',
+                                            default=60 * 60))
+# Промах кэша пересчитывает один воркер, остальные ждут его результата
+# не дольше SINGLE_FLIGHT_WAIT секунд.
+SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.getenv('SINGLE_FLIGHT_LOCK_TIMEOUT',
+                                           default=10))
+SINGLE_FLIGHT_WAIT = float(os.getenv('SINGLE_FLIGHT_WAIT', default=2))
+# Токены с пользователями: в общем кэше (если он общий, см.
+# core.cache.is_shared_cache) и в LRU каждого процесса. После выхода или
+# смены пароля другие процессы еще до AUTH_TOKEN_LOCAL_TTL секунд могут
+# принимать старый токен.
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT',
+                                         default=60 * 5))
+AUTH_TOKEN_LOCAL_SIZE = int(os.getenv('AUTH_TOKEN_LOCAL_SIZE', default=10000))
+AUTH_TOKEN_LOCAL_TTL = int(os.getenv('AUTH_TOKEN_LOCAL_TTL', default=10))
+AUTH_TOKEN_STATS_INTERVAL = int(os.getenv('AUTH_TOKEN_STATS_INTERVAL',
+                                          default=10))
+
+# Только под ASGI-сервером, например
+# gunicorn foodgram.asgi:application -k uvicorn.workers.UvicornWorker.
+# Чтение рецептов, тегов и ингредиентов идет в пуле из
+# ASYNC_READ_WORKERS потоков, цикл событий не ждет БД.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', default='False') == 'True'
+ASYNC_READ_WORKERS = int(os.getenv('ASYNC_READ_WORKERS', default=8))
+
 AUTH_PASSWORD_VALIDATORS = [
         {
                 'NAME': 'django.contrib.auth.password_validation'
@@ -105,15 +213,82 @@ AUTH_USER_MODEL = 'users.User'
 STATIC_URL = '/backend_static/'
 STATIC_ROOT = BASE_DIR / 'backend_static'
 
+DATA_DIR = os.getenv('DATA_DIR', default=BASE_DIR.parent.parent / 'data')
+
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', default=2))
+IMAGE_MAX_UPLOAD_SIZE = int(os.getenv('IMAGE_MAX_UPLOAD_SIZE',
+                                      default=10 * 1024 * 1024))
+
+# Лента подписок: рецепты авторов, у которых подписчиков больше
+# FEED_FANOUT_LIMIT, подмешиваются при чтении, а не копируются в ленты.
+FEED_FANOUT_LIMIT = int(os.getenv('FEED_FANOUT_LIMIT', default=10000))
+FEED_TIMELINE_SIZE = int(os.getenv('FEED_TIMELINE_SIZE', default=1000))
+FEED_BACKFILL = int(os.getenv('FEED_BACKFILL', default=20))
+FEED_BATCH_SIZE = int(os.getenv('FEED_BATCH_SIZE', default=1000))
+
+# Очередь фоновых задач в БД, выполняет manage.py run_worker. Без
+# TASK_QUEUE_ENABLED задачи выполняются в процессе, который их создал,
+# сразу после коммита: выгрузка списка покупок и уменьшенные копии
+# картинок строятся внутри запроса к API. Это режим для разработки,
+# в работе нужен воркер, иначе проверка core.W001 напомнит об этом.
+TASK_QUEUE_ENABLED = os.getenv('TASK_QUEUE_ENABLED',
+                               default='False') == 'True'
+TASK_WORKERS = int(os.getenv('TASK_WORKERS', default=2))
+TASK_POLL_INTERVAL = float(os.getenv('TASK_POLL_INTERVAL', default=1))
+TASK_MAX_ATTEMPTS = int(os.getenv('TASK_MAX_ATTEMPTS', default=3))
+TASK_RETRY_DELAY = int(os.getenv('TASK_RETRY_DELAY', default=10))
+# Задача, которая выполняется дольше, считается брошенной воркером.
+TASK_LEASE = int(os.getenv('TASK_LEASE', default=600))
+TASK_RESULT_TTL = int(os.getenv('TASK_RESULT_TTL', default=24))
+
 MEDIA_URL = '/backend_media/'
 MEDIA_ROOT = '/backend_media'
 
 REST_FRAMEWORK = {
         'DEFAULT_AUTHENTICATION_CLASSES': (
-                'rest_framework.authentication.TokenAuthentication',
-        )
+                'core.authentication.CachedTokenAuthentication',
+        ),
+        # orjson, если установлен, иначе стандартный json.
+        'DEFAULT_RENDERER_CLASSES': (
+                'core.renderers.FastJSONRenderer',
+                'rest_framework.renderers.BrowsableAPIRenderer',
+        ),
+        'DEFAULT_PARSER_CLASSES': (
+                'core.parsers.FastJSONParser',
+                'rest_framework.parsers.FormParser',
+                'rest_framework.parsers.MultiPartParser',
+        ),
+        'DEFAULT_THROTTLE_CLASSES': (
+                'core.throttling.ScopedBucketThrottle',
+        ),
+        # Лимиты на пользователя для вьюх и действий с throttle_scope.
+        'DEFAULT_THROTTLE_RATES': {
+                'favorite': os.getenv('THROTTLE_FAVORITE', default='60/min'),
+                'shopping_cart': os.getenv('THROTTLE_SHOPPING_CART',
+                                           default='60/min'),
+                'subscribe': os.getenv('THROTTLE_SUBSCRIBE', default='30/min'),
+                'shopping_list': os.getenv('THROTTLE_SHOPPING_LIST',
+                                           default='20/min'),
+                'shopping_list_export': os.getenv(
+                        'THROTTLE_SHOPPING_LIST_EXPORT', default='5/min'),
+        },
 }
+# Учитывать запросы в общем кэше, чтобы лимит был общим для всех
+# воркеров. Нужен бэкенд с атомарным incr: memcached или redis. По
+# умолчанию включено, если кэш не в памяти процесса, иначе каждый из N
+# воркеров пропускал бы свой лимит (проверка core.E002).
+THROTTLE_SHARED_CACHE = os.getenv(
+        'THROTTLE_SHARED_CACHE',
+        default=str(CACHES['default']['BACKEND'] not in (
+                'django.core.cache.backends.locmem.LocMemCache',
+                'django.core.cache.backends.dummy.DummyCache'))) == 'True'
+THROTTLE_LOCAL_SIZE = int(os.getenv('THROTTLE_LOCAL_SIZE', default=10000))
 
 DJOSER = {
         'LOGIN_FIELD': 'email'
 }
+
+SHOPPING_LIST_FONT = os.getenv(
+        'SHOPPING_LIST_FONT',
+        default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
@@ -0,0 +1,106 @@
+import time
+from base64 import b64encode
+from io import BytesIO
+
+import pytest
+from core.authentication import token_cache
+from core.throttling import local_buckets
+from django.core.cache import cache
+from food_recipies.models import (IngredientAndItsQuantity, Ingredients,
+                                  Recipies, Tags)
+from PIL import Image
+from rest_framework.test import APIClient
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(settings, tmp_path):
+    """Кэш и лимиты в памяти процесса не переходят между тестами."""
+    settings.MEDIA_ROOT = tmp_path
+    cache.clear()
+    local_buckets._buckets.clear()
+    token_cache._entries.clear()
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+            username='cook', email='cook@example.com',
+            password='Cook-pass-123')
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create_user(
+            username='chef', email='chef@example.com',
+            password='Chef-pass-123')
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def tags():
+    return [Tags.objects.create(name=f'Тег {number}', color='#E26C2D',
+                                slug=f'tag-{number}')
+            for number in range(3)]
+
+
+@pytest.fixture
+def ingredients():
+    return [Ingredients.objects.create(name=f'Ингредиент {number}',
+                                       measurement_unit='г')
+            for number in range(10)]
+
+
+@pytest.fixture
+def make_recipes(author, tags, ingredients):
+    """Создает count рецептов author с тегами и ингредиентами."""
+    def make(count, ingredients_per_recipe=3):
+        recipes = []
+        for number in range(count):
+            recipe = Recipies.objects.create(
+                    author=author, name=f'Рецепт {number}',
+                    picture='food_pictures/recipe.jpg',
+                    description='Описание', timing=10)
+            recipe.tag.set(tags[:number % len(tags) + 1])
+            recipe.ingredients.set([
+                    IngredientAndItsQuantity.objects.create(
+                            ingredient=ingredients[
+                                    (number + offset) % len(ingredients)],
+                            quantity=offset + 1)
+                    for offset in range(ingredients_per_recipe)
+            ])
+            recipes.append(recipe)
+        return recipes
+    return make
+
+
+@pytest.fixture
+def image():
+    """Картинка PNG в base64, как ее присылает фронтенд."""
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8), 'red').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + b64encode(buffer.getvalue()).decode()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.time(), которое тест двигает вручную, например на
+    LOCAL_DATA_TTL."""
+    now = [1_000_000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def shared_cache(settings, tmp_path):
+    """Кэш, общий для процессов, как в развертывании с несколькими
+    воркерами."""
+    settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path / 'cache'),
+    }}
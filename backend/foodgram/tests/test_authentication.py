@@ -0,0 +1,81 @@
+import pytest
+from core.authentication import TOKEN_KEY, TokenCache, token_cache
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def token(user):
+    return Token.objects.create(user=user)
+
+
+@pytest.fixture
+def token_client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+@pytest.fixture
+def other_worker(settings, token):
+    """Кэш токенов другого процесса, который уже видел token.
+
+    С AUTH_TOKEN_LOCAL_TTL = 0 запись в его LRU сразу устаревает, как
+    через AUTH_TOKEN_LOCAL_TTL секунд после запроса.
+    """
+    settings.AUTH_TOKEN_LOCAL_TTL = 0
+    worker = TokenCache()
+    worker.set(token)
+    return worker
+
+
+def cached(token):
+    return cache.get(TOKEN_KEY.format(TokenCache._digest(token.key)))
+
+
+@pytest.mark.django_db
+def test_process_cache_is_not_used_as_second_level(token, token_client):
+    assert token_client.get('/api/users/me/').status_code == 200
+    assert cached(token) is None
+    assert token_cache.get(token.key) is not None
+
+
+@pytest.mark.django_db
+def test_shared_cache_is_used_as_second_level(shared_cache, token,
+                                              other_worker):
+    assert cached(token) is not None
+    assert other_worker.get(token.key).user == token.user
+
+
+@pytest.mark.django_db
+def test_logout_invalidates_other_workers(
+        shared_cache, token, token_client, other_worker,
+        django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        response = token_client.post('/api/auth/token/logout/')
+    assert response.status_code == 204
+    assert other_worker.get(token.key) is None
+    assert token_client.get('/api/users/me/').status_code == 401
+
+
+@pytest.mark.django_db
+def test_set_password_invalidates_other_workers(
+        shared_cache, user, token, other_worker,
+        django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        user.set_password('Cook-pass-456')
+        user.save()
+    assert other_worker.get(token.key) is None
+
+
+@pytest.mark.django_db
+def test_deactivation_invalidates_other_workers(
+        shared_cache, user, token, token_client, other_worker,
+        django_capture_on_commit_callbacks):
+    assert token_client.get('/api/users/me/').status_code == 200
+    with django_capture_on_commit_callbacks(execute=True):
+        user.is_active = False
+        user.save()
+    assert other_worker.get(token.key) is None
+    assert token_client.get('/api/users/me/').status_code == 401
@@ -0,0 +1,48 @@
+import pytest
+from core.cache import (AUTHOR_VERSION, RECIPE_DETAILS_VERSION, get_version,
+                        single_flight)
+from django.core.cache import cache
+
+
+def test_single_flight_releases_its_lock():
+    assert single_flight('key', lambda: 'value', 60) == 'value'
+    assert cache.get('lock:key') is None
+    assert single_flight('key', lambda: 'other', 60) == 'value'
+
+
+def test_single_flight_keeps_lock_taken_by_another_worker():
+    def build():
+        # Блокировка истекла, пока шла сборка, и ее взял другой воркер.
+        cache.delete('lock:key')
+        cache.add('lock:key', 'other-worker', 60)
+        return 'value'
+
+    assert single_flight('key', build, 60) == 'value'
+    assert cache.get('lock:key') == 'other-worker'
+
+
+@pytest.mark.django_db
+def test_user_save_bumps_only_own_author_version(
+        user, author, django_capture_on_commit_callbacks):
+    details = get_version(RECIPE_DETAILS_VERSION)
+    author_version = get_version(AUTHOR_VERSION.format(author.pk))
+    user_version = get_version(AUTHOR_VERSION.format(user.pk))
+    with django_capture_on_commit_callbacks(execute=True):
+        user.first_name = 'Повар'
+        user.save()
+    assert get_version(RECIPE_DETAILS_VERSION) == details
+    assert get_version(AUTHOR_VERSION.format(author.pk)) == author_version
+    assert get_version(AUTHOR_VERSION.format(user.pk)) != user_version
+
+
+@pytest.mark.django_db
+def test_recipe_detail_shows_new_author_profile(
+        author, user_client, make_recipes,
+        django_capture_on_commit_callbacks):
+    recipe, = make_recipes(1)
+    url = f'/api/recipes/{recipe.id}/'
+    assert user_client.get(url).data['author']['first_name'] == ''
+    with django_capture_on_commit_callbacks(execute=True):
+        author.first_name = 'Шеф'
+        author.save()
+    assert user_client.get(url).data['author']['first_name'] == 'Шеф'
@@ -0,0 +1,124 @@
+import asyncio
+import gzip
+from types import SimpleNamespace
+
+import pytest
+from asgiref.sync import async_to_sync
+from core import compression
+from core.compression import (CompressionMiddleware, accepted_encodings,
+                              choose_encoding)
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+
+BODY = b'{"results": [' + b'{"name": "recipe"},' * 200 + b'{}]}'
+
+
+@pytest.fixture
+def fake_brotli(monkeypatch):
+    """brotli здесь не установлен: для выбора кодировки хватает модуля
+    с compress и MODE_TEXT."""
+    module = SimpleNamespace(
+            MODE_TEXT=1,
+            compress=lambda content, mode, quality: b'br:' + content[:10])
+    monkeypatch.setattr(compression, 'brotli', module)
+
+
+@pytest.fixture
+def min_size(settings):
+    settings.COMPRESSION_MIN_SIZE = 1024
+    return settings.COMPRESSION_MIN_SIZE
+
+
+def respond(body=BODY, accept='gzip, deflate, br',
+            content_type='application/json', response=None):
+    def view(request):
+        return response or HttpResponse(body, content_type=content_type)
+    request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept)
+    return CompressionMiddleware(view)(request)
+
+
+def test_accepted_encodings_parses_quality():
+    assert accepted_encodings('gzip, br;q=0.8, identity;q=x, ') == {
+            'gzip': 1.0, 'br': 0.8, 'identity': 0.0}
+
+
+@pytest.mark.parametrize('header, expected', [
+        ('gzip, br', 'br'),
+        ('gzip;q=1, br;q=0.5', 'gzip'),
+        ('br;q=0', None),
+        ('*', 'br'),
+        ('*, br;q=0', 'gzip'),
+        ('identity', None),
+        ('', None),
+])
+def test_choose_encoding_with_brotli(fake_brotli, header, expected):
+    assert choose_encoding(header) == expected
+
+
+@pytest.mark.parametrize('header, expected', [
+        ('gzip, br', 'gzip'),
+        ('br', None),
+        ('gzip;q=0', None),
+])
+def test_choose_encoding_without_brotli(monkeypatch, header, expected):
+    monkeypatch.setattr(compression, 'brotli', None)
+    assert choose_encoding(header) == expected
+
+
+def test_gzip_response(monkeypatch, min_size):
+    monkeypatch.setattr(compression, 'brotli', None)
+    response = respond()
+    assert response['Content-Encoding'] == 'gzip'
+    assert response['Content-Length'] == str(len(response.content))
+    assert response['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(response.content) == BODY
+
+
+def test_brotli_preferred(fake_brotli, min_size):
+    assert respond()['Content-Encoding'] == 'br'
+
+
+def test_identity_keeps_body_and_varies(min_size):
+    response = respond(accept='identity')
+    assert not response.has_header('Content-Encoding')
+    assert response.content == BODY
+    assert response['Vary'] == 'Accept-Encoding'
+
+
+def test_small_response_is_not_compressed(min_size):
+    response = respond(body=BODY[:min_size - 1])
+    assert not response.has_header('Content-Encoding')
+    assert not response.has_header('Vary')
+
+
+def test_binary_response_is_not_compressed(min_size):
+    response = respond(content_type='application/pdf')
+    assert not response.has_header('Content-Encoding')
+
+
+def test_streaming_response_is_skipped(min_size):
+    streaming = StreamingHttpResponse(iter([BODY]),
+                                      content_type='text/plain')
+    response = respond(response=streaming)
+    assert not response.has_header('Content-Encoding')
+    assert b''.join(response.streaming_content) == BODY
+
+
+def test_etag_becomes_weak(monkeypatch, min_size):
+    monkeypatch.setattr(compression, 'brotli', None)
+    tagged = HttpResponse(BODY, content_type='application/json')
+    tagged['ETag'] = '"abc"'
+    assert respond(response=tagged)['ETag'] == 'W/"abc"'
+
+
+def test_async_chain(monkeypatch, min_size):
+    monkeypatch.setattr(compression, 'brotli', None)
+
+    async def view(request):
+        return HttpResponse(BODY, content_type='application/json')
+
+    middleware = CompressionMiddleware(view)
+    assert asyncio.iscoroutinefunction(middleware)
+    response = async_to_sync(middleware)(
+            RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip'))
+    assert gzip.decompress(response.content) == BODY
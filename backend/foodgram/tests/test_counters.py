@@ -0,0 +1,53 @@
+import pytest
+from django.core.management import CommandError, call_command
+from django.db.models.query import QuerySet
+from food_recipies.models import Favorites, Recipies, ShoppingCart
+from users.models import Followers
+
+
+@pytest.fixture
+def raced(monkeypatch):
+    """Проверка на дубль в представлении не видит строку, вставленную
+    параллельным запросом."""
+    monkeypatch.setattr(QuerySet, 'exists', lambda self: False)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('model, url', [
+        (Favorites, 'favorite'),
+        (ShoppingCart, 'shopping_cart'),
+])
+def test_concurrent_duplicate_recipe_relation(user, user_client,
+                                              make_recipes, raced,
+                                              model, url):
+    recipe, = make_recipes(1)
+    model.objects.create(user=user, recipie=recipe)
+    response = user_client.post(f'/api/recipes/{recipe.id}/{url}/')
+    assert response.status_code == 400
+    assert response.data == ['Object exists.']
+    assert model.objects.count() == 1
+    recipe.refresh_from_db()
+    assert recipe.favorites_count == recipe.shopping_cart_count == 0
+
+
+@pytest.mark.django_db
+def test_concurrent_duplicate_subscription(user, author, user_client,
+                                           raced):
+    Followers.objects.create(follower=user, followed=author)
+    response = user_client.post(f'/api/users/{author.id}/subscribe/')
+    assert response.status_code == 400
+    assert response.data == {
+            'non_field_errors': ['This author is followed.']}
+    author.refresh_from_db()
+    assert author.followers_count == 0
+
+
+@pytest.mark.django_db
+def test_rebuild_counters(user, make_recipes):
+    recipe, = make_recipes(1)
+    Favorites.objects.create(user=user, recipie=recipe)
+    with pytest.raises(CommandError):
+        call_command('rebuild_counters', verify=True)
+    call_command('rebuild_counters')
+    call_command('rebuild_counters', verify=True)
+    assert Recipies.objects.get().favorites_count == 1
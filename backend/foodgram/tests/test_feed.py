@@ -0,0 +1,160 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from food_recipies.models import FeedEntry, Recipies
+from rest_framework.test import APIClient
+
+FEED_URL = '/api/recipes/feed/'
+
+
+@pytest.fixture
+def feed_settings(settings):
+    settings.FEED_FANOUT_LIMIT = 1
+    settings.FEED_BACKFILL = 2
+    settings.TASK_QUEUE_ENABLED = False
+
+
+@pytest.fixture
+def author_client(author):
+    client = APIClient()
+    client.force_authenticate(author)
+    return client
+
+
+@pytest.fixture
+def reader(django_user_model):
+    user = django_user_model.objects.create_user(
+            username='reader', email='reader@example.com',
+            password='Reader-pass-123')
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def publish(author_client, image, tags, ingredients,
+            django_capture_on_commit_callbacks):
+    def publish(name):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = author_client.post('/api/recipes/', {
+                    'tags': [tags[0].id],
+                    'ingredients': [{'id': ingredients[0].id, 'amount': 1}],
+                    'name': name,
+                    'image': image,
+                    'text': 'Сварить.',
+                    'cooking_time': 5,
+            }, format='json')
+        assert response.status_code == 201, response.data
+        return response.data['id']
+    return publish
+
+
+@pytest.fixture
+def follow(author, django_capture_on_commit_callbacks):
+    def follow(client, method='post'):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = getattr(client, method)(
+                    f'/api/users/{author.id}/subscribe/')
+        assert response.status_code in (201, 204), response.data
+    return follow
+
+
+def feed(client, **params):
+    return [recipe['id']
+            for recipe in client.get(FEED_URL, params).data['results']]
+
+
+@pytest.mark.django_db
+def test_publish_fans_out_to_followers(feed_settings, user_client, follow,
+                                       publish):
+    follow(user_client)
+    recipe_id = publish('Суп')
+    assert FeedEntry.objects.filter(recipie_id=recipe_id).count() == 1
+    assert feed(user_client) == [recipe_id]
+
+
+@pytest.mark.django_db
+def test_popular_author_is_pulled_on_read(feed_settings, user_client, reader,
+                                          follow, publish):
+    follow(user_client)
+    follow(reader)
+    recipe_id = publish('Суп')
+    assert not FeedEntry.objects.exists()
+    assert feed(user_client) == feed(reader) == [recipe_id]
+
+
+@pytest.mark.django_db
+def test_follow_backfills_recent_recipes(feed_settings, user_client, follow,
+                                         make_recipes):
+    recipes = make_recipes(3)
+    follow(user_client)
+    assert feed(user_client) == [recipes[2].id, recipes[1].id]
+
+
+@pytest.mark.django_db
+def test_unfollow_removes_author(feed_settings, user_client, follow,
+                                 publish):
+    follow(user_client)
+    publish('Суп')
+    follow(user_client, 'delete')
+    assert not FeedEntry.objects.exists()
+    assert feed(user_client) == []
+
+
+@pytest.mark.django_db
+def test_author_back_under_limit_keeps_pulled_recipes(
+        feed_settings, user_client, reader, follow, publish):
+    follow(user_client)
+    follow(reader)
+    recipe_id = publish('Суп')
+    # Подписчиков снова FEED_FANOUT_LIMIT: рецепт больше не подмешивается
+    # при чтении и переносится в ленту.
+    follow(reader, 'delete')
+    assert list(FeedEntry.objects.values_list('recipie_id', flat=True)) == [
+            recipe_id]
+    assert feed(user_client) == [recipe_id]
+    assert feed(reader) == []
+
+
+@pytest.mark.django_db
+def test_cursor_pages(feed_settings, settings, user_client, follow,
+                      make_recipes):
+    settings.FEED_BACKFILL = 5
+    recipes = make_recipes(5)
+    follow(user_client)
+    ids = []
+    response = user_client.get(FEED_URL, {'limit': 2})
+    while True:
+        ids.extend(recipe['id'] for recipe in response.data['results'])
+        if response.data['next'] is None:
+            break
+        response = user_client.get(response.data['next'])
+    assert ids == sorted((recipe.id for recipe in recipes), reverse=True)
+
+
+@pytest.mark.django_db
+def test_cursor_merges_pulled_and_stored(feed_settings, user_client, reader,
+                                         follow, make_recipes):
+    stored = make_recipes(2)
+    follow(user_client)
+    follow(reader)
+    pulled = Recipies.objects.create(
+            author=stored[0].author, name='Новый', description='Описание',
+            picture='food_pictures/recipe.jpg', timing=10)
+    first = user_client.get(FEED_URL, {'limit': 2})
+    assert [recipe['id'] for recipe in first.data['results']] == [
+            pulled.id, stored[1].id]
+    second = user_client.get(first.data['next'])
+    assert [recipe['id'] for recipe in second.data['results']] == [
+            stored[0].id]
+    assert second.data['next'] is None
+
+
+@pytest.mark.django_db
+def test_backfill_feeds_command(feed_settings, user_client, follow,
+                                make_recipes):
+    follow(user_client)
+    recipes = make_recipes(2)
+    call_command('backfill_feeds', stdout=StringIO())
+    assert feed(user_client) == [recipes[1].id, recipes[0].id]
@@ -0,0 +1,51 @@
+import pytest
+from food_recipies.models import Favorites, Recipies, ShoppingCart
+
+URL = '/api/recipes/'
+
+
+def recipe_ids(response):
+    assert response.status_code == 200, response.data
+    ids = [recipe['id'] for recipe in response.data['results']]
+    assert response.data['count'] == len(ids)
+    return ids
+
+
+@pytest.mark.django_db
+def test_tags_are_or_without_duplicates(user_client, make_recipes):
+    # Теги рецептов: [tag-0], [tag-0, tag-1], [tag-0, tag-1, tag-2].
+    first, second, third = make_recipes(3)
+    ids = recipe_ids(user_client.get(URL, {'tags': ['tag-1', 'tag-2']}))
+    assert ids == [third.id, second.id]
+    ids = recipe_ids(user_client.get(URL, {'tags': ['tag-0', 'tag-1']}))
+    assert ids == [third.id, second.id, first.id]
+
+
+@pytest.mark.django_db
+def test_author_filter(user, user_client, make_recipes):
+    recipe, = make_recipes(1)
+    Recipies.objects.create(author=user, name='Чужой',
+                            picture='food_pictures/recipe.jpg',
+                            description='Описание', timing=5)
+    ids = recipe_ids(user_client.get(URL, {'author': recipe.author_id}))
+    assert ids == [recipe.id]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('model, param', [
+        (Favorites, 'is_favorited'),
+        (ShoppingCart, 'is_in_shopping_cart'),
+])
+def test_user_relation_filters(user, user_client, make_recipes, model,
+                               param):
+    chosen, other = make_recipes(2)
+    model.objects.create(user=user, recipie=chosen)
+    assert recipe_ids(user_client.get(URL, {param: 1})) == [chosen.id]
+    assert recipe_ids(user_client.get(URL, {param: 0})) == [other.id]
+
+
+@pytest.mark.django_db
+def test_user_relation_filters_for_anonymous(client, make_recipes):
+    make_recipes(2)
+    assert recipe_ids(client.get(URL, {'is_favorited': 1})) == []
+    assert len(recipe_ids(client.get(URL, {'is_favorited': 0}))) == 2
@@ -0,0 +1,107 @@
+import pytest
+from core.images import build_renditions
+from django.conf import settings
+from django.core.files.storage import default_storage
+from food_recipies import signals
+from food_recipies.models import Recipies
+
+
+@pytest.fixture
+def deferred(monkeypatch):
+    calls = []
+    monkeypatch.setattr(signals, 'defer',
+                        lambda func, args, **kwargs: calls.append(args))
+    return calls
+
+
+@pytest.fixture
+def payload(image, tags, ingredients):
+    return {
+            'tags': [tags[0].id],
+            'ingredients': [{'id': ingredients[0].id, 'amount': 10}],
+            'name': 'Суп',
+            'image': image,
+            'text': 'Сварить.',
+            'cooking_time': 20,
+    }
+
+
+def stored_pictures():
+    if not default_storage.exists('food_pictures'):
+        return []
+    directories, _ = default_storage.listdir('food_pictures')
+    return [name for directory in directories
+            for name in default_storage.listdir(
+                    f'food_pictures/{directory}')[1]]
+
+
+@pytest.mark.django_db
+def test_create_saves_content_addressed_picture(user_client, payload,
+                                                deferred):
+    response = user_client.post('/api/recipes/', payload, format='json')
+    assert response.status_code == 201, response.data
+    name = Recipies.objects.get().picture.name
+    assert default_storage.exists(name)
+    assert deferred == [[name]]
+
+
+@pytest.mark.django_db
+def test_invalid_recipe_does_not_store_picture(user_client, payload):
+    response = user_client.post('/api/recipes/',
+                                {**payload, 'cooking_time': 0},
+                                format='json')
+    assert response.status_code == 400
+    assert stored_pictures() == []
+
+
+@pytest.mark.django_db
+def test_renditions_only_for_new_picture(make_recipes, deferred):
+    recipe, = make_recipes(1)
+    deferred.clear()
+    recipe = Recipies.objects.get(pk=recipe.pk)
+    recipe.name = 'Новое название'
+    recipe.save()
+    assert deferred == []
+    recipe.picture = 'food_pictures/other.jpg'
+    recipe.save()
+    assert deferred == [['food_pictures/other.jpg']]
+    recipe.save()
+    assert deferred == [['food_pictures/other.jpg']]
+
+
+@pytest.mark.django_db
+def test_invalid_picture_is_rejected(user_client, payload):
+    response = user_client.post('/api/recipes/',
+                                {**payload, 'image': 'data:image/png;base64,'
+                                 'bm90IGFuIGltYWdl'},
+                                format='json')
+    assert response.status_code == 400
+    assert 'image' in response.data
+    assert not Recipies.objects.exists()
+    assert stored_pictures() == []
+
+
+@pytest.mark.django_db
+def test_images_fall_back_to_original_until_renditions_are_built(
+        user_client, payload, deferred):
+    response = user_client.post('/api/recipes/', payload, format='json')
+    recipe = Recipies.objects.get()
+    assert not recipe.renditions_ready
+    images = user_client.get(f'/api/recipes/{recipe.pk}/').data['images']
+    assert images['thumbnail'] == {'png': response.data['image']}
+    assert images['card'] == {'png': response.data['image']}
+
+    build_renditions(recipe.picture.name)
+    recipe.refresh_from_db()
+    assert recipe.renditions_ready
+    images = user_client.get(f'/api/recipes/{recipe.pk}/').data['images']
+    assert set(images['thumbnail']) == {'webp', 'jpeg'}
+    for url in images['thumbnail'].values():
+        assert default_storage.exists(
+                url.split(settings.MEDIA_URL, 1)[1])
+    listed, = user_client.get('/api/recipes/').data['results']
+    assert listed['images'] == images
+
+    recipe.picture = 'food_pictures/other.jpg'
+    recipe.save()
+    assert not recipe.renditions_ready
@@ -0,0 +1,35 @@
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+from food_recipies.models import Ingredients
+
+
+def write_json(path, rows):
+    (path / 'ingredients.json').write_text(json.dumps(rows),
+                                           encoding='utf-8')
+
+
+@pytest.mark.django_db
+def test_import_json(tmp_path):
+    write_json(tmp_path, [{'name': 'соль', 'measurement_unit': 'г'},
+                          {'name': 'соль', 'measurement_unit': 'г'}])
+    call_command('import_csv', path=tmp_path, format='json')
+    assert list(Ingredients.objects.values_list(
+            'name', 'measurement_unit')) == [('соль', 'г')]
+
+
+@pytest.mark.django_db
+def test_import_json_unknown_key(tmp_path):
+    write_json(tmp_path, [{'name': 'соль', 'measurement_unit': 'г'},
+                          {'name': 'перец', 'unit': 'г'}])
+    with pytest.raises(CommandError, match='строка 2.*"unit"'):
+        call_command('import_csv', path=tmp_path, format='json')
+    assert not Ingredients.objects.exists()
+
+
+@pytest.mark.django_db
+def test_import_json_not_a_list(tmp_path):
+    write_json(tmp_path, {'name': 'соль'})
+    with pytest.raises(CommandError, match='список'):
+        call_command('import_csv', path=tmp_path, format='json')
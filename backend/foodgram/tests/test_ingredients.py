@@ -0,0 +1,41 @@
+import core.cache as cache_module
+import pytest
+from food_recipies.models import Ingredients
+
+
+@pytest.mark.django_db
+def test_ingredient_search_prefix_first(client):
+    for name in ('Морская соль', 'соль', 'Сольный сыр', 'сахар'):
+        Ingredients.objects.create(name=name, measurement_unit='г')
+    response = client.get('/api/ingredients/', {'name': 'Соль'})
+    assert response.status_code == 200
+    assert [item['name'] for item in response.json()] == [
+            'соль', 'Сольный сыр', 'Морская соль']
+
+
+@pytest.mark.django_db
+def test_ingredient_search_sees_new_ingredients(
+        client, django_capture_on_commit_callbacks):
+    Ingredients.objects.create(name='соль', measurement_unit='г')
+    assert len(client.get('/api/ingredients/', {'name': 'со'}).json()) == 1
+    with django_capture_on_commit_callbacks(execute=True):
+        Ingredients.objects.create(name='соус', measurement_unit='мл')
+    assert len(client.get('/api/ingredients/', {'name': 'со'}).json()) == 2
+
+
+@pytest.mark.django_db
+def test_ingredient_index_refreshes_after_ttl_with_process_cache(
+        client, settings, clock):
+    Ingredients.objects.create(name='соль', measurement_unit='г')
+    assert len(client.get('/api/ingredients/', {'name': 'со'}).json()) == 1
+    # Ингредиент добавлен другим процессом: версия в этом не меняется.
+    Ingredients.objects.bulk_create([
+            Ingredients(name='соус', measurement_unit='мл')])
+    assert len(client.get('/api/ingredients/', {'name': 'со'}).json()) == 1
+    clock[0] += settings.LOCAL_DATA_TTL
+    assert len(client.get('/api/ingredients/', {'name': 'со'}).json()) == 2
+
+
+def test_local_version_with_shared_cache_is_plain_version(shared_cache):
+    assert cache_module.local_version('name') == cache_module.get_version(
+            'name')
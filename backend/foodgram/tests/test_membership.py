@@ -0,0 +1,50 @@
+import pytest
+from core.membership import UserMembership
+from django.core.cache import cache
+from food_recipies.models import Favorites
+
+
+def flags(client):
+    return {recipe['id']: recipe['is_favorited']
+            for recipe in client.get('/api/recipes/').data['results']}
+
+
+@pytest.mark.django_db
+def test_sets_are_request_scoped_with_local_cache(user, user_client,
+                                                  make_recipes):
+    recipe, = make_recipes(1)
+    assert flags(user_client) == {recipe.id: False}
+    assert cache.get(UserMembership(user)._key(Favorites)) is None
+    Favorites.objects.create(user=user, recipie=recipe)
+    assert flags(user_client) == {recipe.id: True}
+
+
+@pytest.mark.django_db
+def test_write_drops_shared_set(shared_cache, user, user_client,
+                                make_recipes,
+                                django_capture_on_commit_callbacks):
+    recipe, = make_recipes(1)
+    assert flags(user_client) == {recipe.id: False}
+    key = UserMembership(user)._key(Favorites)
+    assert cache.get(key) == set()
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.post(f'/api/recipes/{recipe.id}/favorite/')
+    assert response.status_code == 201
+    assert cache.get(key) is None
+    assert flags(user_client) == {recipe.id: True}
+
+
+@pytest.mark.django_db
+def test_concurrent_writes_are_not_lost(shared_cache, user, make_recipes,
+                                        django_capture_on_commit_callbacks):
+    first, second = make_recipes(2)
+    # Два запроса прочитали набор до того, как оба что-то добавили.
+    one, other = UserMembership(user), UserMembership(user)
+    one.ids(Favorites), other.ids(Favorites)
+    with django_capture_on_commit_callbacks(execute=True):
+        Favorites.objects.create(user=user, recipie=first)
+        one.add(Favorites, first.id)
+    with django_capture_on_commit_callbacks(execute=True):
+        Favorites.objects.create(user=user, recipie=second)
+        other.add(Favorites, second.id)
+    assert UserMembership(user).ids(Favorites) == {first.id, second.id}
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+from api.routers import AsyncReadRouter
+from api.views import RecipeViewSet
+from asgiref.sync import async_to_sync
+from core.db import capture_queries
+from core.offload import async_read_view
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from foodgram import profiling
+from foodgram.profiling import ProfilingMiddleware, QueryRecorder
+
+
+def async_routes(settings, enabled):
+    settings.ASYNC_READ_VIEWS = enabled
+    router = AsyncReadRouter()
+    router.register('recipes', RecipeViewSet, basename='recipes')
+    return {url.name for url in router.get_urls()
+            if asyncio.iscoroutinefunction(url.callback)}
+
+
+def test_router_wraps_only_read_actions(settings):
+    assert async_routes(settings, True) == {'recipes-list', 'recipes-detail'}
+
+
+def test_router_without_async_read_views(settings):
+    assert async_routes(settings, False) == set()
+
+
+def thread_view(threads):
+    def view(request):
+        threads.append(threading.current_thread().name)
+        return HttpResponse()
+    return view
+
+
+@pytest.mark.django_db
+def test_safe_requests_run_in_pool():
+    threads = []
+    view = async_read_view(thread_view(threads))
+    async_to_sync(view)(RequestFactory().get('/'))
+    assert threads[0].startswith('views')
+
+
+def test_unsafe_requests_skip_pool():
+    threads = []
+    view = async_read_view(thread_view(threads))
+    async_to_sync(view)(RequestFactory().post('/'))
+    assert not threads[0].startswith('views')
+
+
+def select_view(request):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    return HttpResponse()
+
+
+@pytest.mark.django_db
+def test_capture_queries_sees_pool_threads():
+    view = async_read_view(select_view)
+    with CaptureQueriesContext(connection) as context:
+        with capture_queries(QueryRecorder()) as recorder:
+            async_to_sync(view)(RequestFactory().get('/'))
+    assert len(context) == 0
+    assert recorder.count == 1
+
+
+@pytest.mark.django_db
+def test_async_profiling_counts_pool_queries(settings, monkeypatch):
+    settings.PROFILING_SAMPLE_RATE = 1
+    records = []
+    monkeypatch.setattr(profiling, 'get_logger',
+                        lambda: SimpleNamespace(info=records.append))
+    middleware = ProfilingMiddleware(async_read_view(select_view))
+    assert asyncio.iscoroutinefunction(middleware)
+    assert asyncio.iscoroutinefunction(middleware.process_view)
+    response = async_to_sync(middleware)(RequestFactory().get('/'))
+    assert 'desc="1 queries"' in response['Server-Timing']
+    assert json.loads(records[0])['queries'] == 1
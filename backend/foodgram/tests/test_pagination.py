@@ -0,0 +1,50 @@
+import pytest
+from food_recipies.models import Recipies
+
+
+def walk(client, params):
+    """Все страницы выдачи по cursor, id рецептов по порядку."""
+    response = client.get('/api/recipes/', {**params, 'cursor': ''})
+    ids = []
+    while True:
+        assert response.status_code == 200, response.data
+        ids.extend(recipe['id'] for recipe in response.data['results'])
+        if response.data['next'] is None:
+            return ids
+        response = client.get(response.data['next'])
+
+
+@pytest.mark.django_db
+def test_cursor_follows_default_ordering(user_client, make_recipes):
+    make_recipes(7)
+    expected = list(Recipies.objects.values_list('id', flat=True))
+    assert walk(user_client, {'limit': 2}) == expected
+
+
+@pytest.mark.django_db
+def test_cursor_follows_requested_ordering(user_client, make_recipes):
+    recipes = make_recipes(7)
+    for number, recipe in enumerate(recipes):
+        Recipies.objects.filter(pk=recipe.pk).update(
+                favorites_count=number % 3)
+    expected = list(Recipies.objects.order_by(
+            '-favorites_count', '-pub_date', '-id').values_list(
+            'id', flat=True))
+    assert walk(user_client, {'limit': 2,
+                              'ordering': '-favorites_count'}) == expected
+
+
+@pytest.mark.django_db
+def test_cursor_with_search_is_rejected(user_client, make_recipes):
+    make_recipes(2)
+    response = user_client.get('/api/recipes/',
+                               {'search': 'Рецепт', 'cursor': ''})
+    assert response.status_code == 400
+    assert 'cursor' in response.data
+
+
+@pytest.mark.django_db
+def test_invalid_cursor(user_client, make_recipes):
+    make_recipes(1)
+    response = user_client.get('/api/recipes/', {'cursor': 'broken'})
+    assert response.status_code == 404
@@ -0,0 +1,91 @@
+import pytest
+from api import views
+from food_recipies.models import IngredientAndItsQuantity, Recipies
+from food_recipies.pantry import PantryIndex
+
+URL = '/api/recipes/pantry/'
+
+
+@pytest.fixture(autouse=True)
+def pantry_index(monkeypatch):
+    """Свой индекс на тест: id рецептов повторяются после отката."""
+    index = PantryIndex()
+    monkeypatch.setattr(views, 'pantry_index', index)
+    return index
+
+
+@pytest.fixture
+def make_recipe(author, ingredients):
+    def make(*numbers):
+        recipe = Recipies.objects.create(
+                author=author, name=f'Рецепт {numbers}',
+                picture='food_pictures/recipe.jpg',
+                description='Описание', timing=10)
+        recipe.ingredients.set([
+                IngredientAndItsQuantity.objects.create(
+                        ingredient=ingredients[number], quantity=1)
+                for number in numbers])
+        return recipe
+    return make
+
+
+def pantry(client, ingredients, *numbers, **params):
+    response = client.get(URL, {
+            'ingredients': [ingredients[number].id for number in numbers],
+            **params})
+    assert response.status_code == 200
+    return [(recipe['id'], recipe['coverage'], recipe['missing'])
+            for recipe in response.data['results']]
+
+
+@pytest.mark.django_db
+def test_pantry_ranks_by_coverage(user_client, ingredients, make_recipe):
+    full = make_recipe(0, 1)
+    partial = make_recipe(0, 1, 2, 3)
+    make_recipe(4, 5)
+    assert pantry(user_client, ingredients, 0, 1, 2) == [
+            (full.id, 1.0, 0), (partial.id, 0.75, 1)]
+
+
+@pytest.mark.django_db
+def test_pantry_max_missing(user_client, ingredients, make_recipe):
+    full = make_recipe(0, 1)
+    make_recipe(0, 1, 2, 3)
+    assert pantry(user_client, ingredients, 0, 1, max_missing=0) == [
+            (full.id, 1.0, 0)]
+
+
+@pytest.mark.django_db
+def test_pantry_requires_ingredients(user_client):
+    response = user_client.get(URL)
+    assert response.status_code == 400
+    assert 'ingredients' in response.data
+
+
+@pytest.mark.django_db
+def test_pantry_follows_recipe_edit_and_delete(
+        user_client, ingredients, make_recipe,
+        django_capture_on_commit_callbacks):
+    edited = make_recipe(0, 1, 2, 3)
+    deleted = make_recipe(0)
+    assert pantry(user_client, ingredients, 0, 1) == [
+            (deleted.id, 1.0, 0), (edited.id, 0.5, 2)]
+    with django_capture_on_commit_callbacks(execute=True):
+        edited.ingredients.set(edited.ingredients.filter(
+                ingredient__in=ingredients[:2]))
+        edited.save()
+        deleted.delete()
+    assert pantry(user_client, ingredients, 0, 1) == [(edited.id, 1.0, 0)]
+
+
+@pytest.mark.django_db
+def test_pantry_refreshes_after_ttl_with_process_cache(
+        user_client, ingredients, make_recipe, settings, clock):
+    make_recipe(0)
+    assert len(pantry(user_client, ingredients, 0)) == 1
+    # Версия RECIPES_VERSION меняется в on_commit, которого здесь нет,
+    # как если бы рецепт добавил другой процесс.
+    make_recipe(0, 1)
+    assert len(pantry(user_client, ingredients, 0)) == 1
+    clock[0] += settings.LOCAL_DATA_TTL
+    assert len(pantry(user_client, ingredients, 0)) == 2
@@ -0,0 +1,87 @@
+import pytest
+from core.postgresql_pool import base
+from psycopg2.pool import PoolError
+
+
+class FakeConnection:
+    isolation_level = 1
+
+    def __init__(self):
+        self.closed = False
+
+    def set_session(self, isolation_level):
+        self.isolation_level = isolation_level
+
+
+class FakePool:
+    """ThreadedConnectionPool без сервера PostgreSQL."""
+
+    def __init__(self, minconn, maxconn, **conn_params):
+        self.maxconn = maxconn
+        self.free = []
+        self.used = []
+        self.returned = []
+
+    def getconn(self):
+        if len(self.used) >= self.maxconn:
+            raise PoolError('connection pool exhausted')
+        connection = self.free.pop() if self.free else FakeConnection()
+        self.used.append(connection)
+        return connection
+
+    def putconn(self, connection, close=False):
+        self.used.remove(connection)
+        self.returned.append((connection, close))
+        if not close:
+            self.free.append(connection)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(base, 'ThreadedConnectionPool', FakePool)
+    monkeypatch.setattr(base.psycopg2.extras, 'register_default_jsonb',
+                        lambda **kwargs: None)
+    monkeypatch.setattr(base, '_pools', {})
+    return base._pools
+
+
+def wrapper():
+    return base.DatabaseWrapper({
+            'NAME': 'foodgram', 'OPTIONS': {}, 'POOL_MIN_SIZE': 1,
+            'POOL_MAX_SIZE': 2, 'AUTOCOMMIT': True, 'TIME_ZONE': None,
+            'CONN_MAX_AGE': 0, 'ATOMIC_REQUESTS': False,
+    }, alias='pooled')
+
+
+def connect(database):
+    database.connection = database.get_new_connection({})
+    return database.connection
+
+
+def test_close_returns_connection_to_pool(pool):
+    database = wrapper()
+    connection = connect(database)
+    database.close()
+    assert database.connection is None
+    assert pool['pooled'].returned == [(connection, False)]
+    assert connect(wrapper()) is connection
+
+
+def test_broken_connection_is_discarded(pool):
+    database = wrapper()
+    connection = connect(database)
+    database.errors_occurred = True
+    database.close()
+    assert pool['pooled'].returned == [(connection, True)]
+    assert connect(wrapper()) is not connection
+
+
+def test_pool_is_shared_and_bounded(pool):
+    first, second = wrapper(), wrapper()
+    connect(first)
+    connect(second)
+    assert len(pool) == 1
+    with pytest.raises(PoolError):
+        connect(wrapper())
+    first.close()
+    connect(wrapper())
@@ -0,0 +1,75 @@
+import pytest
+from food_recipies.models import Favorites, Ingredients, ShoppingCart
+
+# COUNT, рецепты с авторами, теги, ингредиенты и наборы id избранного,
+# корзины и подписок пользователя.
+RECIPE_LIST_QUERIES = 7
+# Создание и изменение рецепта вместе с ответом, на SQLite.
+RECIPE_CREATE_QUERIES = 19
+RECIPE_UPDATE_QUERIES = 20
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('limit', [1, 6])
+def test_recipe_list_queries_do_not_depend_on_page_size(
+        user_client, make_recipes, django_assert_num_queries, limit):
+    make_recipes(6)
+    with django_assert_num_queries(RECIPE_LIST_QUERIES):
+        response = user_client.get('/api/recipes/', {'limit': limit})
+    assert response.status_code == 200
+    assert len(response.data['results']) == limit
+
+
+@pytest.mark.django_db
+def test_recipe_list_user_flags(user, user_client, make_recipes):
+    favorite, in_cart, other = make_recipes(3)
+    Favorites.objects.create(user=user, recipie=favorite)
+    ShoppingCart.objects.create(user=user, recipie=in_cart)
+    response = user_client.get('/api/recipes/')
+    flags = {recipe['id']: (recipe['is_favorited'],
+                            recipe['is_in_shopping_cart'])
+             for recipe in response.data['results']}
+    assert flags == {favorite.id: (True, False),
+                     in_cart.id: (False, True),
+                     other.id: (False, False)}
+
+
+@pytest.fixture
+def recipe_payload(image, tags, ingredients):
+    def payload(count):
+        more = [Ingredients(name=f'Добавка {number}', measurement_unit='г')
+                for number in range(len(ingredients), count)]
+        Ingredients.objects.bulk_create(more)
+        chosen = Ingredients.objects.order_by('id')[:count]
+        return {
+                'tags': [tag.id for tag in tags],
+                'ingredients': [{'id': ingredient.id, 'amount': 10}
+                                for ingredient in chosen],
+                'name': 'Суп',
+                'image': image,
+                'text': 'Сварить.',
+                'cooking_time': 20,
+        }
+    return payload
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('count', [2, 30])
+def test_recipe_write_queries_do_not_depend_on_ingredients(
+        user_client, recipe_payload, django_assert_num_queries, count):
+    payload = recipe_payload(count)
+    with django_assert_num_queries(RECIPE_CREATE_QUERIES):
+        response = user_client.post('/api/recipes/', payload, format='json')
+    assert response.status_code == 201, response.data
+    assert len(response.data['ingredients']) == count
+    # Один ингредиент удален, у остальных изменено количество.
+    changed = {**payload, 'ingredients': [
+            {**ingredient, 'amount': 20}
+            for ingredient in payload['ingredients'][1:]]}
+    with django_assert_num_queries(RECIPE_UPDATE_QUERIES):
+        response = user_client.patch(f'/api/recipes/{response.data["id"]}/',
+                                     changed, format='json')
+    assert response.status_code == 200, response.data
+    assert [ingredient['amount']
+            for ingredient in response.data['ingredients']] == [20] * (
+                    count - 1)
@@ -0,0 +1,51 @@
+import pytest
+from food_recipies.models import Tags
+
+URL = '/api/tags/'
+
+
+@pytest.mark.django_db
+def test_tags_not_modified_by_etag_and_date(client, tags):
+    response = client.get(URL)
+    assert response.status_code == 200
+    etag = response['ETag']
+    response = client.get(URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+    response = client.get(
+            URL, HTTP_IF_MODIFIED_SINCE=client.get(URL)['Last-Modified'])
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+def test_tag_change_gives_new_etag(client, tags,
+                                   django_capture_on_commit_callbacks):
+    etag = client.get(URL)['ETag']
+    with django_capture_on_commit_callbacks(execute=True):
+        Tags.objects.create(name='Новый', color='#000000', slug='new')
+    response = client.get(URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert len(response.json()) == len(tags) + 1
+
+
+@pytest.mark.django_db
+def test_change_from_other_process_gives_new_etag(client, tags, settings,
+                                                  clock):
+    etag = client.get(URL)['ETag']
+    # Версия TAGS_VERSION меняется в on_commit, которого здесь нет,
+    # как если бы тег добавил другой процесс.
+    Tags.objects.create(name='Новый', color='#000000', slug='new')
+    assert client.get(URL, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    clock[0] += settings.LOCAL_DATA_TTL
+    response = client.get(URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_rebuilt_entry_with_same_content_keeps_etag(client, tags, settings,
+                                                    clock):
+    etag = client.get(URL)['ETag']
+    clock[0] += settings.LOCAL_DATA_TTL
+    assert client.get(URL, HTTP_IF_NONE_MATCH=etag).status_code == 304
@@ -0,0 +1,72 @@
+import datetime
+import json
+from decimal import Decimal
+from io import BytesIO
+
+import pytest
+from core import parsers, renderers
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+from django.utils.functional import lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+DATA = {
+        'name': 'Щи\u2029',
+        'amount': Decimal('1.50'),
+        'created': datetime.datetime(2024, 1, 2, 3, 4, 5),
+        'label': lazy(lambda: 'ленивая', str)(),
+        'items': [1, 2.5, None, True],
+        1: 'ключ-число',
+}
+
+
+@pytest.fixture(params=['orjson', 'fallback'])
+def backend(request, monkeypatch):
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(renderers, 'orjson', None)
+        monkeypatch.setattr(parsers, 'orjson', None)
+    return request.param
+
+
+def test_renderer_matches_drf(backend):
+    assert FastJSONRenderer().render(DATA) == JSONRenderer().render(DATA)
+
+
+def test_renderer_escapes_line_separators(backend):
+    assert b'\\u2028' in FastJSONRenderer().render({'name': 'a\u2028b'})
+
+
+def test_renderer_falls_back_for_big_integers(backend):
+    data = {'big': 2 ** 70}
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_renderer_keeps_indent(backend):
+    content = FastJSONRenderer().render(
+            {'a': 1}, 'application/json; indent=2')
+    assert content == b'{\n  "a": 1\n}'
+
+
+def test_renderer_none(backend):
+    assert FastJSONRenderer().render(None) == b''
+
+
+def test_parser(backend):
+    content = json.dumps({'name': 'Щи', 'amount': 2}).encode()
+    assert FastJSONParser().parse(BytesIO(content)) == {
+            'name': 'Щи', 'amount': 2}
+
+
+def test_parser_error(backend):
+    with pytest.raises(ParseError):
+        FastJSONParser().parse(BytesIO(b'{"name": '))
+
+
+def test_parser_other_encoding_uses_drf():
+    content = json.dumps({'name': 'Щи'}, ensure_ascii=False).encode('cp1251')
+    parsed = FastJSONParser().parse(BytesIO(content),
+                                    parser_context={'encoding': 'cp1251'})
+    assert parsed == {'name': 'Щи'}
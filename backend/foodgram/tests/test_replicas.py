@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from core.offload import async_read_view
+from core.replicas import ReplicaMiddleware, ReplicaRouter
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory
+from food_recipies.models import Recipies
+
+REPLICAS = ['replica_0', 'replica_1', 'replica_2']
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.DATABASE_REPLICAS = REPLICAS
+    settings.REPLICA_PIN_SECONDS = 5
+
+
+def call(method, status=200, reads=20, **headers):
+    """Запрос через ReplicaMiddleware, возвращает базы его чтений."""
+    router = ReplicaRouter()
+    used = []
+
+    def view(request):
+        used.extend(router.db_for_read(Recipies) for _ in range(reads))
+        return HttpResponse(status=status)
+
+    request = getattr(RequestFactory(), method)('/api/recipes/', **headers)
+    ReplicaMiddleware(view)(request)
+    return set(used)
+
+
+def test_outside_request_reads_primary(replicas):
+    assert ReplicaRouter().db_for_read(Recipies) == DEFAULT_DB_ALIAS
+
+
+def test_one_replica_per_request(replicas):
+    chosen = set()
+    for _ in range(30):
+        used = call('get')
+        assert len(used) == 1
+        chosen.update(used)
+    assert chosen <= set(REPLICAS)
+    assert len(chosen) > 1
+
+
+def test_writes_read_primary(replicas):
+    assert call('post') == {DEFAULT_DB_ALIAS}
+
+
+@pytest.mark.django_db
+def test_atomic_block_reads_primary(replicas):
+    router = ReplicaRouter()
+    used = []
+
+    def view(request):
+        with transaction.atomic():
+            used.append(router.db_for_read(Recipies))
+        return HttpResponse()
+
+    ReplicaMiddleware(view)(RequestFactory().get('/'))
+    assert used == [DEFAULT_DB_ALIAS]
+
+
+def test_read_your_writes_pin(replicas):
+    alice = {'HTTP_AUTHORIZATION': 'Token alice'}
+    bob = {'HTTP_AUTHORIZATION': 'Token bob'}
+    call('post', **alice)
+    assert call('get', **alice) == {DEFAULT_DB_ALIAS}
+    assert call('get', **bob) <= set(REPLICAS)
+
+
+def test_failed_write_does_not_pin(replicas):
+    alice = {'HTTP_AUTHORIZATION': 'Token alice'}
+    call('post', status=400, **alice)
+    assert call('get', **alice) <= set(REPLICAS)
+
+
+@pytest.mark.django_db
+def test_async_middleware_passes_replica_to_pool(replicas):
+    router = ReplicaRouter()
+    used = []
+
+    def view(request):
+        used.append(router.db_for_read(Recipies))
+        return HttpResponse()
+
+    middleware = ReplicaMiddleware(async_read_view(view))
+    assert asyncio.iscoroutinefunction(middleware)
+    async_to_sync(middleware)(RequestFactory().get('/'))
+    assert used[0] in REPLICAS
@@ -0,0 +1,35 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from food_recipies.search import SQLiteRecipeSearch, recipe_search
+
+
+@pytest.mark.django_db
+def test_sqlite_index_table_is_created_by_migrations():
+    assert isinstance(recipe_search, SQLiteRecipeSearch)
+    assert recipe_search.table in connection.introspection.table_names()
+
+
+@pytest.mark.django_db
+def test_search_by_name_and_ingredient(user_client, make_recipes):
+    first, second = make_recipes(2)
+    second.name = 'Борщ'
+    second.save()
+    recipe_search.update([first.pk, second.pk])
+    response = user_client.get('/api/recipes/', {'search': 'бор'})
+    assert [recipe['id'] for recipe in response.data['results']] == [
+            second.id]
+    # Ингредиент 0 есть только в первом рецепте.
+    response = user_client.get('/api/recipes/', {'search': 'ингредиент 0'})
+    assert [recipe['id'] for recipe in response.data['results']] == [
+            first.id]
+
+
+@pytest.mark.django_db
+def test_recipe_list_does_not_load_search_vector(user_client, make_recipes):
+    make_recipes(2)
+    with CaptureQueriesContext(connection) as context:
+        response = user_client.get('/api/recipes/')
+    assert response.status_code == 200
+    assert not any('search_vector' in query['sql']
+                   for query in context.captured_queries)
@@ -0,0 +1,86 @@
+import pytest
+from core.checks import shopping_list_font
+from core.shopping_list import PDFShoppingListRenderer, ShoppingListRenderer
+from django.core.exceptions import ImproperlyConfigured
+from food_recipies.models import (IngredientAndItsQuantity, Ingredients,
+                                  Recipies, ShoppingCart)
+from reportlab.pdfbase import pdfmetrics
+
+
+@pytest.fixture
+def missing_font(settings, tmp_path, monkeypatch):
+    settings.SHOPPING_LIST_FONT = str(tmp_path / 'missing.ttf')
+    # Шрифт регистрируется в reportlab один раз на процесс.
+    monkeypatch.setattr(PDFShoppingListRenderer, 'font_name',
+                        'MissingShoppingListFont')
+    return settings.SHOPPING_LIST_FONT
+
+
+@pytest.mark.django_db
+def test_shopping_list_pdf_uses_cyrillic_font(user, user_client,
+                                              make_recipes):
+    recipe, = make_recipes(1)
+    ShoppingCart.objects.create(user=user, recipie=recipe)
+    response = user_client.get('/api/recipes/download_shopping_cart/',
+                               HTTP_ACCEPT='application/pdf')
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content).startswith(b'%PDF')
+    assert (PDFShoppingListRenderer.font_name
+            in pdfmetrics.getRegisteredFontNames())
+
+
+@pytest.mark.django_db
+def test_shopping_list_pdf_fails_without_font(user_client, missing_font):
+    with pytest.raises(ImproperlyConfigured):
+        user_client.get('/api/recipes/download_shopping_cart/',
+                        HTTP_ACCEPT='application/pdf')
+
+
+def test_font_check(missing_font):
+    errors = shopping_list_font(None)
+    assert [error.id for error in errors] == ['core.E001']
+
+
+def test_renderer_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        ShoppingListRenderer()
+
+
+@pytest.fixture
+def mixed_units_cart(user, author):
+    """Два рецепта в корзине с одними продуктами в разных единицах."""
+    for number, items in enumerate((
+            [('Мука', 'кг', 1), ('Молоко', 'стакан', 2), ('Соль', 'ч. л.', 1),
+             ('Яйца', 'шт.', 2)],
+            [('Мука', 'г', 300), ('Молоко', 'л', 1), ('Соль', 'по вкусу', 1),
+             ('Яйца', 'шт.', 3)])):
+        recipe = Recipies.objects.create(
+                author=author, name=f'Рецепт {number}', description='Описание',
+                picture='food_pictures/recipe.jpg', timing=10)
+        recipe.ingredients.set([
+                IngredientAndItsQuantity.objects.create(
+                        ingredient=Ingredients.objects.get_or_create(
+                                name=name, measurement_unit=unit)[0],
+                        quantity=quantity)
+                for name, unit, quantity in items])
+        ShoppingCart.objects.create(user=user, recipie=recipe)
+
+
+@pytest.mark.django_db
+def test_shopping_list_json_sums_convertible_units(user_client,
+                                                   mixed_units_cart):
+    response = user_client.get('/api/recipes/shopping_list/')
+    assert response.status_code == 200
+    assert response.json() == [
+            {'name': 'Молоко', 'measurement_unit': 'л', 'amount': 1.5},
+            {'name': 'Мука', 'measurement_unit': 'кг', 'amount': 1.3},
+            {'name': 'Соль', 'measurement_unit': 'по вкусу', 'amount': 1},
+            {'name': 'Соль', 'measurement_unit': 'ч. л.', 'amount': 1},
+            {'name': 'Яйца', 'measurement_unit': 'шт.', 'amount': 5},
+    ]
+
+
+@pytest.mark.django_db
+def test_shopping_list_json_requires_authentication(client):
+    response = client.get('/api/recipes/shopping_list/')
+    assert response.status_code == 401
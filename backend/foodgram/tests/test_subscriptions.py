@@ -0,0 +1,52 @@
+import pytest
+from food_recipies.models import Recipies
+from users.models import Followers
+
+URL = '/api/users/subscriptions/'
+
+
+@pytest.fixture
+def follow(user, django_user_model):
+    """Подписывает user на count авторов с тремя рецептами у каждого."""
+    def make(count):
+        authors = []
+        for number in range(count):
+            author = django_user_model.objects.create_user(
+                    username=f'author{number}',
+                    email=f'author{number}@example.com', password='x')
+            Followers.objects.create(follower=user, followed=author)
+            for index in range(3):
+                Recipies.objects.create(
+                        author=author, name=f'Рецепт {number}-{index}',
+                        picture='food_pictures/recipe.jpg',
+                        description='Описание', timing=5)
+            authors.append(author)
+        return authors
+    return make
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('count', [1, 4])
+def test_subscription_queries_do_not_depend_on_authors(
+        user_client, follow, django_assert_num_queries, count):
+    follow(count)
+    with django_assert_num_queries(4):
+        response = user_client.get(URL, {'recipes_limit': 2})
+    assert response.status_code == 200
+    assert len(response.data['results']) == count
+
+
+@pytest.mark.django_db
+def test_subscription_recipes_are_latest_per_author(user_client, follow):
+    authors = follow(2)
+    response = user_client.get(URL, {'recipes_limit': 2})
+    recipes = {item['id']: [recipe['name'] for recipe in item['recipes']]
+               for item in response.data['results']}
+    assert recipes == {
+            author.id: [f'Рецепт {number}-2', f'Рецепт {number}-1']
+            for number, author in enumerate(authors)}
+    response = user_client.get(URL, {'recipes_limit': 0})
+    assert all(item['recipes'] == [] for item in response.data['results'])
+    response = user_client.get(URL)
+    assert all(len(item['recipes']) == 3
+               for item in response.data['results'])
@@ -0,0 +1,184 @@
+from datetime import timedelta
+
+import pytest
+from core import tasks
+from core.checks import task_queue
+from core.models import Task
+from core.shopping_list import export_shopping_list
+from core.tasks import claim, enqueue, execute, release_stale, task
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from food_recipies.models import ShoppingCart
+
+EXPORT_URL = '/api/recipes/export_shopping_cart/'
+
+
+@task(max_attempts=3)
+def add(left, right):
+    return left + right
+
+
+@task(max_attempts=3)
+def broken():
+    raise ValueError('Не получилось.')
+
+
+@pytest.fixture
+def queue(settings):
+    settings.TASK_QUEUE_ENABLED = True
+    settings.TASK_RETRY_DELAY = 10
+
+
+@pytest.mark.django_db
+def test_enqueue_stores_task_for_worker(queue):
+    queued = enqueue(add, [2, 3])
+    queued.refresh_from_db()
+    assert (queued.name, queued.args, queued.status) == (
+            'tests.test_tasks.add', [2, 3], Task.QUEUED)
+    assert queued.max_attempts == 3
+
+
+@pytest.mark.django_db
+def test_enqueue_without_queue_runs_after_commit(
+        settings, django_capture_on_commit_callbacks):
+    settings.TASK_QUEUE_ENABLED = False
+    with django_capture_on_commit_callbacks(execute=True):
+        queued = enqueue(add, [2, 3])
+    queued.refresh_from_db()
+    assert (queued.status, queued.result, queued.worker) == (
+            Task.DONE, 5, 'inline')
+
+
+@pytest.mark.django_db
+def test_claim_takes_ready_tasks_once(queue):
+    ready = enqueue(add, [1, 1])
+    later = enqueue(add, [1, 2])
+    Task.objects.filter(pk=later.pk).update(
+            run_at=timezone.now() + timedelta(minutes=1))
+    assert claim('first', 5) == [ready.pk]
+    assert claim('second', 5) == []
+    ready.refresh_from_db()
+    assert (ready.status, ready.worker, ready.attempts) == (
+            Task.RUNNING, 'first', 1)
+
+
+@pytest.mark.django_db
+def test_claim_respects_limit(queue):
+    for number in range(3):
+        enqueue(add, [number, 0])
+    assert len(claim('worker', 2)) == 2
+    assert len(claim('worker', 2)) == 1
+
+
+@pytest.mark.django_db
+def test_execute_stores_result(queue):
+    queued = enqueue(add, [2, 3])
+    claim('worker', 1)
+    execute(queued.pk)
+    queued.refresh_from_db()
+    assert (queued.status, queued.result) == (Task.DONE, 5)
+    assert queued.finished is not None
+
+
+@pytest.mark.django_db
+def test_failed_task_retries_with_backoff(queue):
+    queued = enqueue(broken)
+    delays = []
+    for _ in range(2):
+        assert claim('worker', 1) == [queued.pk]
+        before = timezone.now()
+        execute(queued.pk)
+        queued.refresh_from_db()
+        assert queued.status == Task.QUEUED
+        assert 'Не получилось.' in queued.error
+        delays.append((queued.run_at - before).total_seconds())
+        Task.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+    assert delays[0] == pytest.approx(10, abs=1)
+    assert delays[1] == pytest.approx(20, abs=1)
+    claim('worker', 1)
+    execute(queued.pk)
+    queued.refresh_from_db()
+    assert (queued.status, queued.attempts) == (Task.FAILED, 3)
+
+
+@pytest.mark.django_db
+def test_release_stale_requeues_or_fails(queue, settings):
+    settings.TASK_LEASE = 60
+    retried = enqueue(broken)
+    exhausted = enqueue(broken)
+    fresh = enqueue(broken)
+    claim('worker', 3)
+    old = timezone.now() - timedelta(seconds=120)
+    Task.objects.filter(pk__in=[retried.pk, exhausted.pk]).update(
+            locked_at=old)
+    Task.objects.filter(pk=exhausted.pk).update(attempts=3)
+    assert release_stale() == 2
+    statuses = dict(Task.objects.values_list('pk', 'status'))
+    assert statuses == {retried.pk: Task.QUEUED, exhausted.pk: Task.FAILED,
+                        fresh.pk: Task.RUNNING}
+
+
+@pytest.fixture
+def cart(user, make_recipes):
+    recipe, = make_recipes(1)
+    ShoppingCart.objects.create(user=user, recipie=recipe)
+
+
+@pytest.mark.django_db
+def test_export_reuses_queued_task(queue, user_client, cart):
+    first = user_client.post(EXPORT_URL, {'format': 'txt'}, format='json')
+    second = user_client.post(EXPORT_URL, {'format': 'txt'}, format='json')
+    other = user_client.post(EXPORT_URL, {'format': 'csv'}, format='json')
+    assert first.status_code == 202
+    assert first.data['id'] == second.data['id'] != other.data['id']
+    assert first['Location'] == first.data['url']
+    assert Task.objects.filter(
+            name=export_shopping_list.task_name).count() == 2
+
+
+@pytest.mark.django_db
+def test_download_before_export_finishes(queue, user_client, cart):
+    response = user_client.post(EXPORT_URL, {'format': 'txt'},
+                                format='json')
+    assert response.data['download_url'] is None
+    download = user_client.get(f'/api/tasks/{response.data["id"]}/download/')
+    assert download.status_code == 409
+
+
+@pytest.mark.django_db
+def test_download_finished_export(settings, user_client, cart,
+                                  django_capture_on_commit_callbacks):
+    settings.TASK_QUEUE_ENABLED = False
+    with django_capture_on_commit_callbacks(execute=True):
+        response = user_client.post(EXPORT_URL, {'format': 'txt'},
+                                    format='json')
+    # Без воркера выгрузка выполнилась после коммита запроса.
+    finished = user_client.get(response.data['url']).data
+    assert finished['status'] == Task.DONE
+    download = user_client.get(finished['download_url'])
+    assert download.status_code == 200
+    assert download['Content-Disposition'].startswith('attachment')
+    assert b''.join(download.streaming_content)
+
+    result = Task.objects.get(pk=finished['id']).result
+    default_storage.delete(result['file'])
+    gone = user_client.get(finished['download_url'])
+    assert gone.status_code == 410
+
+
+@pytest.mark.django_db
+def test_tasks_of_other_users_are_hidden(queue, user_client, author):
+    queued = enqueue(add, [1, 1], user=author)
+    assert user_client.get(f'/api/tasks/{queued.pk}/').status_code == 404
+
+
+def test_only_marked_functions_run():
+    with pytest.raises(ImportError):
+        tasks.get_task_function('os.getcwd')
+
+
+def test_check_warns_about_inline_tasks(settings):
+    settings.TASK_QUEUE_ENABLED = False
+    assert [warning.id for warning in task_queue(None)] == ['core.W001']
+    settings.TASK_QUEUE_ENABLED = True
+    assert task_queue(None) == []
@@ -0,0 +1,64 @@
+import pytest
+from core.checks import throttle_shared_cache
+from core.throttling import LocalBuckets, SharedWindows
+
+
+@pytest.fixture
+def favorite_rate(settings):
+    settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {
+                    **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'],
+                    'favorite': '2/min',
+            },
+    }
+
+
+@pytest.mark.django_db
+def test_throttled_response_has_retry_after(user_client, make_recipes,
+                                            favorite_rate):
+    recipe, = make_recipes(1)
+    url = f'/api/recipes/{recipe.id}/favorite/'
+    assert user_client.post(url).status_code == 201
+    assert user_client.delete(url).status_code == 204
+    response = user_client.post(url)
+    assert response.status_code == 429
+    # Ведро на 2 запроса в минуту пополняется на 1 запрос за 30 секунд.
+    assert 29 <= int(response['Retry-After']) <= 30
+
+
+def test_local_bucket_refills():
+    buckets = LocalBuckets()
+    assert buckets.take('key', 2, 60, now=0) == 0
+    assert buckets.take('key', 2, 60, now=0) == 0
+    assert buckets.take('key', 2, 60, now=0) == 30
+    assert buckets.take('key', 2, 60, now=15) == 15
+    assert buckets.take('key', 2, 60, now=30) == 0
+    assert buckets.take('key', 2, 60, now=30) == 30
+    # Полное ведро не переполняется от долгого простоя.
+    assert buckets.take('key', 2, 60, now=3600) == 0
+    assert buckets.take('key', 2, 60, now=3600) == 0
+    assert buckets.take('key', 2, 60, now=3600) == 30
+
+
+def test_shared_window_is_common_for_workers(shared_cache):
+    first, second = SharedWindows(), SharedWindows()
+    assert first.hit('key', 2, 60, now=0) == 0
+    assert second.hit('key', 2, 60, now=0) == 0
+    assert first.hit('key', 2, 60, now=0) > 0
+    # Через два окна прошлые запросы больше не учитываются.
+    assert second.hit('key', 2, 60, now=120) == 0
+
+
+def test_check_requires_shared_throttling_with_shared_cache(
+        settings, shared_cache):
+    settings.THROTTLE_SHARED_CACHE = False
+    assert [error.id for error in throttle_shared_cache(None)] == [
+            'core.E002']
+    settings.THROTTLE_SHARED_CACHE = True
+    assert throttle_shared_cache(None) == []
+
+
+def test_check_allows_process_cache(settings):
+    settings.THROTTLE_SHARED_CACHE = False
+    assert throttle_shared_cache(None) == []
@@ -0,0 +1,42 @@
+from decimal import Decimal
+
+import pytest
+from core.units import base_amount, base_unit, display_amount
+from food_recipies.models import IngredientAndItsQuantity, Ingredients
+
+
+@pytest.mark.parametrize('amount, unit, expected', [
+        (2000, 'г', (2, 'кг')),
+        (1500, 'г', (Decimal('1.5'), 'кг')),
+        (999, 'г', (999, 'г')),
+        (1250, 'мл', (Decimal('1.25'), 'л')),
+        (6, 'ч. л.', (2, 'ст. л.')),
+        (4, 'ч. л.', (Decimal('1.33'), 'ст. л.')),
+        (2, 'ч. л.', (2, 'ч. л.')),
+        (5, 'шт.', (5, 'шт.')),
+        (1000, 'по вкусу', (1000, 'по вкусу')),
+])
+def test_display_amount(amount, unit, expected):
+    assert display_amount(amount, unit) == expected
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('unit, quantity, expected', [
+        ('кг', 2, ('г', 2000)),
+        ('г', 300, ('г', 300)),
+        ('л', 1, ('мл', 1000)),
+        ('стакан', 2, ('мл', 500)),
+        ('ст. л.', 2, ('ч. л.', 6)),
+        ('шт.', 4, ('шт.', 4)),
+])
+def test_base_unit_and_amount(unit, quantity, expected):
+    ingredient = Ingredients.objects.create(name='Продукт',
+                                            measurement_unit=unit)
+    IngredientAndItsQuantity.objects.create(ingredient=ingredient,
+                                            quantity=quantity)
+    row = (IngredientAndItsQuantity.objects
+           .annotate(unit=base_unit('ingredient__measurement_unit'),
+                     amount=base_amount('ingredient__measurement_unit',
+                                        'quantity'))
+           .values_list('unit', 'amount').get())
+    assert row == expected
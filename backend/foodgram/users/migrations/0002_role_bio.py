@@ -0,0 +1,23 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='bio',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='role',
+            field=models.CharField(choices=[('moderator', 'Moderator'), ('admin', 'Admin'), ('user', 'User')], default='user', max_length=20),
+        ),
+    ]
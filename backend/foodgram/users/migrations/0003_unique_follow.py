@@ -0,0 +1,17 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_role_bio'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='followers',
+            constraint=models.UniqueConstraint(fields=('follower', 'followed'), name='unique_follow'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_unique_follow'),
+    ]
+
+    # Значения для существующих строк заполняет manage.py rebuild_counters.
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
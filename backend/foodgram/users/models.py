@@ -16,6 +16,12 @@ class User(AbstractUser):
             (USER, 'User')
     )
 
+    bio = models.TextField(blank=True)
+    role = models.CharField(max_length=20, choices=ALLOWED_ROLES,
+                            default=USER)
+    recipes_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
@@ -43,3 +49,9 @@ class Followers(models.Model):
                                  related_name='follower')
     followed = models.ForeignKey(User, on_delete=models.CASCADE,
                                  related_name='followed')
+
+    class Meta:
+        constraints = [
+                models.UniqueConstraint(fields=['follower', 'followed'],
+                                        name='unique_follow'),
+        ]